@@ -11,16 +11,17 @@ import os
 
 from channels.routing import ProtocolTypeRouter, URLRouter
 from django.core.asgi import get_asgi_application
-from channels.auth import AuthMiddlewareStack
-import app.routing
 
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 django_asgi_app = get_asgi_application()
 
+from core.ws_auth import TokenAuthMiddlewareStack  # noqa: E402
+import app.routing  # noqa: E402
+
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
-    "websocket": AuthMiddlewareStack(
+    "websocket": TokenAuthMiddlewareStack(
         URLRouter(app.routing.websocket_urlpatterns)
     ),
 })
@@ -1,8 +1,10 @@
 from django.urls import re_path
+from core import consumer as core_consumer
 from project import consumer as project_conusmer
 from file import consumer as file_consumer
 
 websocket_urlpatterns = [
+    re_path(r'ws/stream/', core_consumer.StreamConsumer.as_asgi()),
     re_path(r'ws/project-noti/', project_conusmer.ProjectConsumer.as_asgi()),
     re_path(r'ws/project-manage/', project_conusmer.ProjectManageConsumer.as_asgi()),
     re_path(r'ws/file-noti/', file_consumer.FileNotiConsumer.as_asgi()),
@@ -163,6 +163,47 @@ SPECTACULAR_SETTINGS = {
 
 DATA_UPLOAD_MAX_NUMBER_FILES = 2000000000
 
+# 'db' queues background jobs for the run_jobs worker,
+# 'local' runs them in-process right away
+JOBS_BACKEND = os.environ.get('JOBS_BACKEND', 'db')
+
+# accept the unsigned 'user' cookie on the legacy websocket routes until
+# every client sends the auth token, never for department topics
+WS_LEGACY_COOKIE_AUTH = bool(int(os.environ.get('WS_LEGACY_COOKIE_AUTH', 0)))
+
+# seconds department stats are cached for, 0 disables the cache
+DEPARTMENT_STATS_CACHE_TIMEOUT = int(
+    os.environ.get('DEPARTMENT_STATS_CACHE_TIMEOUT', 0)
+)
+
+# shared cache of the app processes, falls back to local memory
+# when CACHE_REDIS_URL is not set
+if os.environ.get('CACHE_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('CACHE_REDIS_URL'),
+        },
+    }
+
+# suggested chunk size of chunked uploads, below client_max_body_size
+FILE_UPLOAD_CHUNK_SIZE = int(
+    os.environ.get('FILE_UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024)
+)
+
+# seconds an unfinished chunked upload is kept after its last chunk
+FILE_UPLOAD_SESSION_TTL = int(
+    os.environ.get('FILE_UPLOAD_SESSION_TTL', 60 * 60 * 24)
+)
+
+# threads hashing and writing the files of one multipart upload
+FILE_INGEST_WORKERS = int(os.environ.get('FILE_INGEST_WORKERS', 4))
+
+# seconds versioned responses (column endpoints) are kept for
+RESPONSE_CACHE_TIMEOUT = int(
+    os.environ.get('RESPONSE_CACHE_TIMEOUT', 60 * 60 * 24)
+)
+
 CHANNEL_LAYERS = {
     'default': {
         'BACKEND': 'channels_redis.core.RedisChannelLayer',
@@ -37,6 +37,7 @@ urlpatterns = [
     path('api/project/', include('project.urls')),
     path('api/file/', include('file.urls')),
     path('api/department/', include('department.urls')),
+    path('api/search/', include('search.urls')),
 ]
 
 if settings.DEBUG:
@@ -7,6 +7,7 @@ from rest_framework.response import Response
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAdminUser
 from .client_utils import search_client
+from core.cache_utils import cached_response
 from core.models import Client
 from client import serializers
 
@@ -22,6 +23,7 @@ class ClientViewSet(viewsets.ModelViewSet):
         return super().perform_create(serializer)
 
     @action(methods=['GET'], detail=False, url_path='columns')
+    @cached_response('ClientViewSet.columns')
     def client_columns(self, request):
         """Columns for client"""
         columns = ['name', 'email',
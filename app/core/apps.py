@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from core import ws_utils  # noqa: F401 registers outbox relay job
+        from core import cache_utils  # noqa: F401 connects version signals
+        autodiscover_modules('jobs')
@@ -0,0 +1,105 @@
+"""
+Versioned response cache
+
+Column endpoints only change when departments change. Their responses are
+cached under the current departments version together with a strong ETag,
+a request sending that ETag in If-None-Match gets a 304 without touching
+the db. Saving or deleting a Department bumps the version on commit.
+"""
+import functools
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.cache import patch_cache_control
+from rest_framework import status
+from rest_framework.response import Response
+from core.models import Department
+
+
+DEPARTMENTS_VERSION_KEY = 'departments_version'
+RESPONSE_CACHE_PREFIX = 'response'
+RESPONSE_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def initial_version():
+    """Start from the clock so an evicted version never comes back"""
+    return int(time.time() * 1000)
+
+
+def departments_version():
+    version = cache.get(DEPARTMENTS_VERSION_KEY)
+    if version is None:
+        cache.add(DEPARTMENTS_VERSION_KEY, initial_version(), None)
+        version = cache.get(DEPARTMENTS_VERSION_KEY)
+    return version
+
+
+def increment_departments_version():
+    try:
+        cache.incr(DEPARTMENTS_VERSION_KEY)
+    except ValueError:
+        cache.add(DEPARTMENTS_VERSION_KEY, initial_version(), None)
+
+
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+def bump_departments_version(**kwargs):
+    """
+    Invalidate responses depending on departments once the change is
+    committed, a request reading old rows before can not cache them
+    under the new version.
+    """
+    transaction.on_commit(increment_departments_version)
+
+
+def make_etag(data):
+    content = json.dumps(data, sort_keys=True, default=str)
+    return '"%s"' % hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def etag_matches(request, etag):
+    if_none_match = request.headers.get('If-None-Match', '')
+    etags = [value.strip() for value in if_none_match.split(',')]
+    return etag in etags or '*' in etags
+
+
+def cached_response(name):
+    """
+    Cache action response data under the departments version.
+    Answer 304 when If-None-Match holds the ETag of the cached data.
+    """
+    def decorator(view_func):
+        @functools.wraps(view_func)
+        def wrapper(self, request, *args, **kwargs):
+            key = ':'.join(
+                [RESPONSE_CACHE_PREFIX, name, str(departments_version())]
+            )
+            entry = cache.get(key)
+            if entry is None:
+                response = view_func(self, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                entry = (make_etag(response.data), response.data)
+                timeout = getattr(
+                    settings,
+                    'RESPONSE_CACHE_TIMEOUT',
+                    RESPONSE_CACHE_TIMEOUT
+                )
+                cache.set(key, entry, timeout)
+
+            etag, data = entry
+            if etag_matches(request, etag):
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                response = Response(data)
+            response['ETag'] = etag
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
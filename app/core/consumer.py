@@ -0,0 +1,311 @@
+"""
+Websocket consumers
+
+All five message families are served by one multiplexed socket on
+``ws/stream/``. The client manages its streams with frames
+``{"action": "subscribe", "stream": "file-department",
+"params": {"dep_id": 1}}`` and ``{"action": "unsubscribe",
+"stream": "file-department"}`` and receives
+``{"stream": ..., "message": ...}`` frames.
+"""
+import json
+import logging
+import sys
+import time
+import urllib.parse
+import uuid
+from collections import OrderedDict
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+from core.models import Department
+from core.ws_utils import (
+    file_project_group,
+    file_department_group,
+    FILE_PROJECT_BOARD_GROUP,
+    PROJECT_MANAGE_GROUP
+)
+
+
+# stream name -> channel layer event type
+STREAMS = {
+    'project-noti': 'project_noti',
+    'project-manage': 'project_manage',
+    'file-noti': 'task_noti',
+    'file-project': 'task_modify_project',
+    'file-department': 'task_modify_department',
+}
+EVENT_STREAMS = {event: stream for stream, event in STREAMS.items()}
+# streams the unsigned legacy cookie identity may open, department
+# topics are authorized from the identity and need the auth token
+LEGACY_AUTH_STREAMS = {
+    'project-noti',
+    'project-manage',
+    'file-noti',
+    'file-project',
+}
+
+DEDUPE_MAX_SIZE = 1024
+DEDUPE_TTL = 300
+
+logger = logging.getLogger(__name__)
+
+
+class MessageDedupe:
+    """
+    Remember recently seen message ids.
+    Ids expire after ``ttl`` seconds and the least recently seen ids are
+    evicted above ``max_size``, so memory of a long-lived socket is
+    bounded.
+    """
+
+    def __init__(self, max_size=None, ttl=None, clock=time.monotonic):
+        if max_size is None:
+            max_size = getattr(settings, 'WS_DEDUPE_MAX_SIZE', DEDUPE_MAX_SIZE)
+        if ttl is None:
+            ttl = getattr(settings, 'WS_DEDUPE_TTL', DEDUPE_TTL)
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, message_id):
+        expires = self.entries.get(message_id)
+        return expires is not None and expires > self.clock()
+
+    def seen(self, message_id):
+        """Return True if id was seen before, otherwise remember it"""
+        now = self.clock()
+        self.expire(now)
+        if message_id in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(message_id)
+            self.entries[message_id] = now + self.ttl
+            return True
+        self.misses += 1
+        self.entries[message_id] = now + self.ttl
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return False
+
+    def expire(self, now=None):
+        """Drop expired ids, they are ordered by expiry time"""
+        if now is None:
+            now = self.clock()
+        while self.entries:
+            message_id, expires = next(iter(self.entries.items()))
+            if expires > now:
+                break
+            del self.entries[message_id]
+            self.evictions += 1
+
+    def memory_usage(self):
+        """Approximate size of stored ids in bytes"""
+        size = sys.getsizeof(self.entries)
+        for message_id, expires in self.entries.items():
+            size += sys.getsizeof(message_id) + sys.getsizeof(expires)
+        return size
+
+    def metrics(self):
+        return {
+            'size': len(self.entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'memory': self.memory_usage(),
+        }
+
+
+def get_query_params(scope):
+    query_string = scope.get('query_string', b'').decode('utf-8')
+    params = urllib.parse.parse_qs(query_string)
+    return {name: values[0] for name, values in params.items()}
+
+
+def get_id_param(params, name):
+    """Return id param as string, False if it is not a valid id"""
+    value = params.get(name)
+    if value is None:
+        return None
+    value = str(value)
+    return value if value.isdigit() else False
+
+
+@database_sync_to_async
+def get_department_groups(user, dep_id=None):
+    """Department groups the user may subscribe to"""
+    if user.is_staff:
+        departments = Department.objects.all()
+    else:
+        departments = user.departments.all()
+    if dep_id is not None:
+        departments = departments.filter(id=dep_id)
+    dep_ids = departments.values_list('id', flat=True)
+    return [file_department_group(pk) for pk in dep_ids]
+
+
+async def get_stream_groups(stream, user, params):
+    """Channel layer groups of the stream, empty list if not allowed"""
+    if stream == 'project-noti':
+        return [f'user_project_noti_{user.id}']
+    if stream == 'file-noti':
+        return [f'user_task_noti_{user.id}']
+    if stream == 'project-manage':
+        return [PROJECT_MANAGE_GROUP]
+    if stream == 'file-project':
+        project_id = get_id_param(params, 'project')
+        if project_id is False:
+            return []
+        if project_id is None:
+            return [FILE_PROJECT_BOARD_GROUP]
+        return [file_project_group(project_id)]
+    if stream == 'file-department':
+        dep_id = get_id_param(params, 'dep_id')
+        if dep_id is False:
+            return []
+        return await get_department_groups(user, dep_id)
+    return []
+
+
+class StreamConsumer(AsyncWebsocketConsumer):
+    """Multiplexed consumer serving every stream over one socket"""
+
+    async def connect(self):
+        self.user = self.scope.get('user')
+        if self.user is None or not self.user.is_authenticated:
+            await self.close()
+            return
+        if self.scope.get('legacy_auth'):
+            # the multiplexed socket is new, its clients send the token
+            await self.close()
+            return
+        self.subscriptions = {}
+        self.received_messages = MessageDedupe()
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        for stream in list(getattr(self, 'subscriptions', {})):
+            await self.unsubscribe(stream)
+        if hasattr(self, 'received_messages'):
+            logger.debug(
+                'Websocket %s dedupe metrics %s',
+                self.channel_name,
+                self.received_messages.metrics()
+            )
+            del self.received_messages
+
+    async def receive(self, text_data):
+        try:
+            frame = json.loads(text_data)
+        except ValueError:
+            await self.send_frame({'error': 'Invalid frame'})
+            return
+        if not isinstance(frame, dict):
+            await self.send_frame({'error': 'Invalid frame'})
+            return
+
+        action = frame.get('action')
+        stream = frame.get('stream')
+        if stream not in STREAMS:
+            await self.send_frame({'stream': stream, 'error': 'No stream'})
+        elif action == 'subscribe':
+            params = frame.get('params')
+            await self.subscribe(
+                stream,
+                params if isinstance(params, dict) else {}
+            )
+        elif action == 'unsubscribe':
+            await self.unsubscribe(stream)
+            await self.send_frame({'stream': stream, 'subscribed': False})
+        else:
+            await self.send_frame({'stream': stream, 'error': 'No action'})
+
+    async def subscribe(self, stream, params):
+        groups = await get_stream_groups(stream, self.user, params)
+        if not groups:
+            await self.send_frame({'stream': stream, 'error': 'Forbidden'})
+            return False
+        await self.unsubscribe(stream)
+        for group in groups:
+            await self.channel_layer.group_add(group, self.channel_name)
+        self.subscriptions[stream] = groups
+        await self.send_frame({'stream': stream, 'subscribed': True})
+        return True
+
+    async def unsubscribe(self, stream):
+        for group in self.subscriptions.pop(stream, []):
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def send_frame(self, frame):
+        await self.send(text_data=json.dumps(frame))
+
+    async def stream_message(self, stream, message):
+        await self.send_frame({'stream': stream, 'message': message})
+
+    async def dispatch_message(self, event):
+        message = event['message']
+        message_id = message.get('message_id')
+        if message_id is not None and self.received_messages.seen(message_id):
+            return
+        await self.stream_message(EVENT_STREAMS[event['type']], message)
+
+    project_noti = dispatch_message
+    project_manage = dispatch_message
+    task_noti = dispatch_message
+    task_modify_project = dispatch_message
+    task_modify_department = dispatch_message
+
+
+class SingleStreamConsumer(StreamConsumer):
+    """
+    Consumer of the legacy one socket per stream routes.
+    Subscribes to its stream at connect with params from query string.
+    """
+    stream = None
+
+    async def connect(self):
+        self.user = self.scope.get('user')
+        self.subscriptions = {}
+        self.received_messages = MessageDedupe()
+        groups = []
+        trusted = (
+            not self.scope.get('legacy_auth')
+            or self.stream in LEGACY_AUTH_STREAMS
+        )
+        if self.user is not None and self.user.is_authenticated and trusted:
+            groups = await get_stream_groups(
+                self.stream,
+                self.user,
+                get_query_params(self.scope)
+            )
+        if not groups:
+            await self.close()
+            return
+        for group in groups:
+            await self.channel_layer.group_add(group, self.channel_name)
+        self.subscriptions[self.stream] = groups
+        await self.accept()
+
+    async def receive(self, text_data):
+        text_data_json = json.loads(text_data)
+        if text_data_json.get('type') == STREAMS[self.stream]:
+            await self.dispatch_message(text_data_json)
+
+    async def stream_message(self, stream, message):
+        await self.send_frame({'message': message})
+
+    async def send_message(self, event):
+        message = event['message']
+        message_id = str(uuid.uuid4())
+        message['message_id'] = message_id
+
+        await self.send_frame({'message': message})
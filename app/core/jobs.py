@@ -0,0 +1,135 @@
+"""
+Background jobs
+
+Views enqueue work with ``enqueue`` and return immediately, the
+``run_jobs`` management command executes it. Jobs are registered with the
+``job`` decorator in ``<app>/jobs.py`` modules which are autodiscovered.
+With ``JOBS_BACKEND = 'local'`` jobs run in-process right away. Tests keep
+the default 'db' backend, enqueued jobs stay as rows until a test runs
+them with ``run_pending``.
+"""
+import hashlib
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from core.models import Job
+
+
+logger = logging.getLogger(__name__)
+
+JOB_BATCH_SIZE = 20
+JOB_RETRY_DELAY = 5
+JOB_LOCK_TIMEOUT = timedelta(minutes=10)
+
+registry = {}
+
+
+def job(name):
+    """Register function as background job under given name"""
+    def decorator(func):
+        registry[name] = func
+        return func
+    return decorator
+
+
+def make_payload(args, kwargs):
+    payload = {'args': list(args), 'kwargs': kwargs}
+    # round trip so the local backend sees exactly what the worker would
+    return json.loads(json.dumps(payload, cls=DjangoJSONEncoder))
+
+
+def make_dedupe_key(name, payload):
+    raw = json.dumps([name, payload], sort_keys=True)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def enqueue(name, *args, **kwargs):
+    """Queue job, identical job already pending is not queued twice"""
+    if name not in registry:
+        raise KeyError(f'There is no job registered as {name}')
+
+    payload = make_payload(args, kwargs)
+
+    if settings.JOBS_BACKEND == 'local':
+        registry[name](*payload['args'], **payload['kwargs'])
+        return None
+
+    try:
+        with transaction.atomic():
+            return Job.objects.create(
+                name=name,
+                payload=payload,
+                dedupe_key=make_dedupe_key(name, payload)
+            )
+    except IntegrityError:
+        return None
+
+
+def requeue_stale_jobs():
+    """Give back jobs of workers which died in the middle of a job"""
+    return Job.objects.filter(
+        status='Running',
+        locked_at__lt=timezone.now() - JOB_LOCK_TIMEOUT
+    ).update(status='Pending', locked_at=None)
+
+
+def claim_jobs(batch_size=JOB_BATCH_SIZE):
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True).filter(
+                status='Pending',
+                run_after__lte=now
+            )[:batch_size]
+        )
+        Job.objects.filter(id__in=[j.id for j in jobs]).update(
+            status='Running',
+            locked_at=now
+        )
+    return jobs
+
+
+def execute_job(job_obj):
+    """Run job, delete it on success and schedule retry on failure"""
+    func = registry.get(job_obj.name)
+    try:
+        if func is None:
+            raise KeyError(f'There is no job registered as {job_obj.name}')
+        with transaction.atomic():
+            func(*job_obj.payload['args'], **job_obj.payload['kwargs'])
+    except Exception as e:
+        logger.exception('Job %s (%s) failed', job_obj.name, job_obj.id)
+        job_obj.attempts += 1
+        job_obj.last_error = repr(e)
+        job_obj.locked_at = None
+        if job_obj.attempts < job_obj.max_attempts:
+            job_obj.status = 'Pending'
+            job_obj.run_after = timezone.now() + timedelta(
+                seconds=JOB_RETRY_DELAY * 2 ** (job_obj.attempts - 1)
+            )
+        else:
+            job_obj.status = 'Failed'
+        try:
+            with transaction.atomic():
+                job_obj.save()
+        except IntegrityError:
+            # identical job was queued meanwhile, it will do the work
+            job_obj.delete()
+        return False
+
+    job_obj.delete()
+    return True
+
+
+def run_pending(batch_size=JOB_BATCH_SIZE):
+    """Run one batch of due jobs, returns number of processed jobs"""
+    requeue_stale_jobs()
+    jobs = claim_jobs(batch_size)
+    for job_obj in jobs:
+        execute_job(job_obj)
+    return len(jobs)
@@ -0,0 +1,34 @@
+"""
+Django command to delete stored file content nobody references
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from file.blob_utils import collect_blobs, recount_blobs, BLOB_GC_GRACE
+
+
+class Command(BaseCommand):
+    """Django command to garbage collect unreferenced blobs"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=int(BLOB_GC_GRACE.total_seconds()),
+            help='Seconds a blob is kept after it was stored'
+        )
+        parser.add_argument(
+            '--recount',
+            action='store_true',
+            help='Recompute reference counts from files first'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        if options['recount']:
+            with transaction.atomic():
+                recounted = recount_blobs()
+            self.stdout.write(f'Recounted {recounted} blobs')
+        deleted = collect_blobs(grace=timedelta(seconds=options['grace']))
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} blobs!'))
@@ -0,0 +1,64 @@
+"""
+Django command to remove storage of deleted files and projects
+"""
+import argparse
+import time
+
+from django.core.management.base import BaseCommand
+from file.tombstone_utils import (
+    reap_tombstones,
+    REAP_ENTRY_LIMIT,
+    TOMBSTONE_BATCH_SIZE
+)
+
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError('must be at least 1')
+    return number
+
+
+class Command(BaseCommand):
+    """Django command to reap tombstones on a schedule"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Reap once and exit'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=30,
+            help='Seconds between passes'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=positive_int,
+            default=TOMBSTONE_BATCH_SIZE,
+            help='Tombstones locked per transaction'
+        )
+        parser.add_argument(
+            '--limit',
+            type=positive_int,
+            default=REAP_ENTRY_LIMIT,
+            help='Files removed per transaction'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        while True:
+            metrics = reap_tombstones(
+                batch_size=options['batch_size'],
+                limit=options['limit']
+            )
+            self.stdout.write(
+                'Reaped {reaped} tombstones, {files} files, {bytes} bytes, '
+                '{blobs} blobs, {expired} expired uploads; {retried} retried, '
+                '{failed} failed, {pending} pending'.format(**metrics)
+            )
+            if options['once']:
+                break
+            time.sleep(options['interval'])
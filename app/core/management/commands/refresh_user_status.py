@@ -0,0 +1,33 @@
+"""
+Django command to refresh Busy/Free status of users
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from user.user_utils import refresh_user_status
+
+
+class Command(BaseCommand):
+    """Django command to recompute user status on a schedule"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Refresh status once and exit'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=60,
+            help='Seconds between refreshes'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        while True:
+            changed = refresh_user_status()
+            self.stdout.write(f'Status of {changed} users changed')
+            if options['once']:
+                break
+            time.sleep(options['interval'])
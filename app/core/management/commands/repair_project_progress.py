@@ -0,0 +1,27 @@
+"""
+Django command to recompute project task counters
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from project.project_utils import recount_project_tasks
+
+
+class Command(BaseCommand):
+    """Django command to repair task counters, progress and status"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'project_ids',
+            nargs='*',
+            type=int,
+            help='Projects to repair, all projects by default'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        project_ids = options['project_ids'] or None
+        with transaction.atomic():
+            repaired = recount_project_tasks(project_ids)
+        self.stdout.write(
+            self.style.SUCCESS(f'Repaired {repaired} projects!')
+        )
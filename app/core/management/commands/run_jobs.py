@@ -0,0 +1,41 @@
+"""
+Django command to run background jobs worker
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from core.jobs import run_pending, JOB_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    """Django command to process queued background jobs"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process due jobs and exit'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=JOB_BATCH_SIZE
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1,
+            help='Seconds to wait when the queue is empty'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        self.stdout.write('Waiting for jobs...')
+        while True:
+            processed = run_pending(options['batch_size'])
+            while processed:
+                processed = run_pending(options['batch_size'])
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS('Jobs processed!'))
@@ -0,0 +1,90 @@
+# Generated by Django 4.2.7 on 2026-10-17 11:00
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+SEARCH_TRIGGERS = [
+    ('core_project', "concat_ws(' ', NEW.number, NEW.name, NEW.order_number)"),
+    ('core_file', 'NEW.name'),
+    ('core_commentproject', 'NEW.text'),
+    ('core_commentfile', 'NEW.text'),
+]
+
+# Punctuation is replaced with spaces so file names like
+# "gearbox_cover.step" are indexed as separate words.
+CREATE_TRIGGER_SQL = """
+CREATE FUNCTION {table}_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := to_tsvector(
+        'pg_catalog.simple',
+        regexp_replace(coalesce({document}, ''), '[^[:alnum:]]+', ' ', 'g')
+    );
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER {table}_search_vector_update
+BEFORE INSERT OR UPDATE ON {table}
+FOR EACH ROW EXECUTE FUNCTION {table}_search_vector();
+
+UPDATE {table} SET search_vector = NULL;
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS {table}_search_vector_update ON {table};
+DROP FUNCTION IF EXISTS {table}_search_vector();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_project_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='commentproject',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='commentfile',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='project_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='file',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='file_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='commentproject',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='comment_project_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='commentfile',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='comment_file_search_idx'),
+        ),
+    ] + [
+        migrations.RunSQL(
+            sql=CREATE_TRIGGER_SQL.format(table=table, document=document),
+            reverse_sql=DROP_TRIGGER_SQL.format(table=table),
+        )
+        for table, document in SEARCH_TRIGGERS
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-17 15:00
+
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_task_counters(apps, schema_editor):
+    Project = apps.get_model('core', 'Project')
+    QueueLogic = apps.get_model('core', 'QueueLogic')
+
+    tasks = QueueLogic.objects.filter(
+        project=OuterRef('pk')
+    ).order_by().values('project')
+    total = tasks.annotate(count=Count('id')).values('count')
+    done = tasks.filter(end=True).annotate(count=Count('id')).values('count')
+    Project.objects.update(
+        total_tasks=Coalesce(Subquery(total), 0),
+        done_tasks=Coalesce(Subquery(done), 0)
+    )
+    Project.objects.filter(total_tasks__gt=0).update(
+        progress=F('done_tasks') * 100 / F('total_tasks')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_outboxevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='done_tasks',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='total_tasks',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(
+            backfill_task_counters,
+            migrations.RunPython.noop
+        ),
+    ]
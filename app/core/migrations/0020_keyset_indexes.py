@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-17 16:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_project_task_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(
+                fields=['deadline', 'id'],
+                name='project_deadline_id_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(
+                fields=['name', 'id'],
+                name='file_name_id_idx'
+            ),
+        ),
+    ]
@@ -2,9 +2,14 @@
 db models
 """
 import os
+import uuid
 
 from django.db import models
-from django.db.models import CharField
+from django.db.models import CharField, Q
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models.functions import Upper
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.utils import timezone
 from django.contrib.auth.models import (
     AbstractBaseUser,
@@ -179,18 +184,63 @@ class Project(models.Model):
         choices=InvoiceStatus.choices
     )
     date_add = models.DateField(default=timezone.now)
+    total_tasks = models.PositiveIntegerField(default=0, editable=False)
+    done_tasks = models.PositiveIntegerField(default=0, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         ordering = ['deadline']
         indexes = [
             models.Index(fields=['deadline']),
-            models.Index(fields=['number'])
+            models.Index(
+                fields=['deadline', 'id'],
+                name='project_deadline_id_idx'
+            ),
+            models.Index(fields=['number']),
+            GinIndex(
+                fields=['search_vector'],
+                name='project_search_idx'
+            ),
+            GinIndex(
+                OpClass(Upper('number'), name='gin_trgm_ops'),
+                name='project_number_trgm_idx'
+            ),
+            GinIndex(
+                OpClass(Upper('name'), name='gin_trgm_ops'),
+                name='project_name_trgm_idx'
+            ),
+            GinIndex(
+                OpClass(Upper('order_number'), name='gin_trgm_ops'),
+                name='project_order_number_trgm_idx'
+            ),
         ]
 
     def __str__(self) -> str:
         return self.number
 
 
+class Blob(models.Model):
+    """File content stored once under its SHA-256, shared by File rows"""
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    refcount = models.PositiveIntegerField(default=0)
+    date_add = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(
+                fields=['refcount'],
+                condition=Q(refcount=0),
+                name='blob_unreferenced_idx'
+            )
+        ]
+
+    def __str__(self) -> str:
+        return self.sha256
+
+
 class File(models.Model):
     """File model"""
     class Destiny(models.TextChoices):
@@ -221,19 +271,56 @@ class File(models.Model):
         choices=Destiny.choices
     )
     file = models.FileField(upload_to=file_path, blank=False)
+    blob = models.ForeignKey(
+        Blob,
+        null=True,
+        blank=True,
+        related_name='files',
+        on_delete=models.PROTECT
+    )
     date_add = models.DateField(default=timezone.now)
     new = models.BooleanField(default=True)
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         ordering = ['name']
         indexes = [
             models.Index(fields=['name']),
-            models.Index(fields=['file'])
+            models.Index(fields=['name', 'id'], name='file_name_id_idx'),
+            models.Index(fields=['file']),
+            GinIndex(
+                fields=['search_vector'],
+                name='file_search_idx'
+            ),
         ]
 
     def __str__(self) -> str:
         return self.name
 
+    def queue_snapshot(self, lock=False):
+        """
+        Queue of the file ordered by department order as plain dicts,
+        read with one query. With lock the rows stay locked until the
+        end of the transaction.
+        """
+        queryset = QueueLogic.objects.filter(file=self.id)
+        if lock:
+            queryset = queryset.select_for_update(of=('self',))
+        rows = queryset.order_by('department__order').values_list(
+            'department_id',
+            'department__order',
+            'permission',
+            'start',
+            'paused',
+            'end'
+        )
+        return [dict(zip(QUEUE_SNAPSHOT_FIELDS, row)) for row in rows]
+
+
+QUEUE_SNAPSHOT_FIELDS = (
+    'department', 'order', 'permission', 'start', 'paused', 'end'
+)
+
 
 class QueueLogic(models.Model):
     """QueueLogic model"""
@@ -283,11 +370,16 @@ class CommentProject(models.Model):
     text = models.TextField(blank=False)
     date_posted = models.DateTimeField(default=timezone.now)
     read = models.BooleanField(default=False)
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         ordering = ['-date_posted']
         indexes = [
-            models.Index(fields=['-date_posted'])
+            models.Index(fields=['-date_posted']),
+            GinIndex(
+                fields=['search_vector'],
+                name='comment_project_search_idx'
+            ),
         ]
 
     def __str__(self) -> str:
@@ -305,11 +397,16 @@ class CommentFile(models.Model):
     text = models.TextField(blank=False)
     date_posted = models.DateTimeField(default=timezone.now)
     read = models.BooleanField(default=False)
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         ordering = ['date_posted']
         indexes = [
-            models.Index(fields=['date_posted'])
+            models.Index(fields=['date_posted']),
+            GinIndex(
+                fields=['search_vector'],
+                name='comment_file_search_idx'
+            ),
         ]
 
     def __str__(self) -> str:
@@ -355,3 +452,138 @@ class NotificationProject(models.Model):
 
     def __str__(self) -> str:
         return self.content
+
+
+class Job(models.Model):
+    """Background job waiting for the worker"""
+
+    class Status(models.TextChoices):
+        PENDING = 'Pending'
+        RUNNING = 'Running'
+        FAILED = 'Failed'
+
+    name = models.CharField(max_length=255)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    dedupe_key = models.CharField(max_length=64)
+    status = models.CharField(
+        max_length=10,
+        default='Pending',
+        choices=Status.choices
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    date_add = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['run_after']
+        indexes = [
+            models.Index(
+                fields=['status', 'run_after'],
+                name='job_status_run_after_idx'
+            )
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedupe_key'],
+                condition=Q(status='Pending'),
+                name='unique_pending_job'
+            )
+        ]
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class OutboxEvent(models.Model):
+    """Channel layer message waiting to be relayed"""
+    group = models.CharField(max_length=255)
+    type = models.CharField(max_length=100)
+    message = models.JSONField(encoder=DjangoJSONEncoder)
+    key = models.CharField(max_length=255, blank=True)
+    date_add = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self) -> str:
+        return self.group
+
+
+class UploadSession(models.Model):
+    """Chunked upload of one file, appended to in place until finalized"""
+
+    class Status(models.TextChoices):
+        OPEN = 'Open'
+        COMPLETED = 'Completed'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    project = models.ForeignKey(Project, on_delete=models.CASCADE)
+    destiny = models.CharField(max_length=30, choices=File.Destiny.choices)
+    name = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    checksum = models.CharField(max_length=64, blank=True)
+    status = models.CharField(
+        max_length=10,
+        default='Open',
+        choices=Status.choices
+    )
+    file = models.ForeignKey(
+        File,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL
+    )
+    date_add = models.DateTimeField(auto_now_add=True)
+    date_update = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['date_add']
+
+    def __str__(self) -> str:
+        return self.name
+
+    @property
+    def part_name(self):
+        """Storage name the chunks are written to"""
+        return os.path.join(
+            'uploads/projects',
+            str(self.project_id),
+            f'.upload-{self.id}.part'
+        )
+
+
+class Tombstone(models.Model):
+    """Storage of deleted rows waiting to be removed by the reaper"""
+
+    class Status(models.TextChoices):
+        PENDING = 'Pending'
+        FAILED = 'Failed'
+
+    name = models.CharField(max_length=255)
+    status = models.CharField(
+        max_length=10,
+        default='Pending',
+        choices=Status.choices
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    date_add = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['run_after']
+        indexes = [
+            models.Index(
+                fields=['status', 'run_after'],
+                name='tombstone_status_run_idx'
+            )
+        ]
+
+    def __str__(self) -> str:
+        return self.name
@@ -0,0 +1,120 @@
+"""
+Keyset pagination
+
+Archive lists are paged by a cursor holding the sort key of the last row
+of the page instead of a page number. A page is one index range scan
+whatever its depth, there is no OFFSET and no COUNT(*). The total is
+only computed on request and then as the planner estimate.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(values):
+    data = json.dumps(values, cls=DjangoJSONEncoder).encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode('ascii')
+
+
+def decode_cursor(cursor, keys, model):
+    """Return sort key values stored in cursor as python values of keys"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, UnicodeError):
+        raise ValidationError({'cursor': 'Invalid cursor'})
+    if not isinstance(values, list) or len(values) != len(keys):
+        raise ValidationError({'cursor': 'Invalid cursor'})
+    try:
+        values = [
+            model._meta.get_field(key).to_python(value)
+            for key, value in zip(keys, values)
+        ]
+    except (DjangoValidationError, TypeError, ValueError):
+        raise ValidationError({'cursor': 'Invalid cursor'})
+    if None in values:
+        raise ValidationError({'cursor': 'Invalid cursor'})
+    return values
+
+
+def get_page_size(params):
+    try:
+        page_size = int(params.get('page_size', PAGE_SIZE))
+    except (TypeError, ValueError):
+        page_size = PAGE_SIZE
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+
+def after(keys, values):
+    """
+    Rows sorting after values on keys.
+    The leading key bound lets the planner range scan the keys index.
+    """
+    condition = Q()
+    for index in reversed(range(len(keys))):
+        tie = Q(**{f'{keys[index]}__gt': values[index]})
+        if index < len(keys) - 1:
+            tie |= Q(**{keys[index]: values[index]}) & condition
+        condition = tie
+    return Q(**{f'{keys[0]}__gte': values[0]}) & condition
+
+
+def estimate_count(queryset):
+    """
+    Row count estimate, reltuples of the table for unfiltered querysets,
+    the planner estimate of the query otherwise.
+    """
+    query = queryset.order_by().query
+    if not query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        if row and row[0] >= 0:
+            return int(row[0])
+    sql, sql_params = query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', sql_params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def keyset_paginate(queryset, keys, params):
+    """
+    Return page of queryset ordered by keys after the ``cursor`` param.
+    ``next`` is the cursor of the following page, None on the last one.
+    ``totalItems`` is added when ``total=estimate`` is requested.
+    """
+    page_size = get_page_size(params)
+    ordered = queryset.order_by(*keys)
+    cursor = params.get('cursor')
+    if cursor:
+        ordered = ordered.filter(
+            after(keys, decode_cursor(cursor, keys, queryset.model))
+        )
+
+    rows = list(ordered[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor([
+            getattr(last, key) for key in keys
+        ])
+
+    page = {'rows': rows, 'next': next_cursor}
+    if params.get('total') == 'estimate':
+        page['totalItems'] = estimate_count(queryset)
+    return page
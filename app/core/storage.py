@@ -0,0 +1,35 @@
+"""
+Storage backends
+"""
+import os
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage of blobs named after their content hash.
+    A name always holds the same bytes, so an existing file is kept
+    instead of renamed and concurrent writers of one blob can not clash.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        full_path = self.path(name)
+        if os.path.exists(full_path):
+            return name
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as tmp:
+            for chunk in content.chunks():
+                tmp.write(chunk)
+        file_move_safe(tmp.name, full_path, allow_overwrite=True)
+        # temporary files are private, blobs are served like other media
+        os.chmod(full_path, self.file_permissions_mode or 0o644)
+        return name
@@ -0,0 +1,52 @@
+"""
+Helpers shared by tests of the apps
+"""
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+
+from core.models import Client, Project
+
+
+def create_admin_user(**params):
+    """Create and return a new admin user"""
+    defaults = {
+        'username': 'admin',
+        'password': 'testpass123',
+        'role': 'Admin',
+    }
+    defaults.update(params)
+    return get_user_model().objects.create_superuser(**defaults)
+
+
+def create_client(**params):
+    """Create and return a test client"""
+    defaults = {'name': 'Test client'}
+    defaults.update(params)
+    return Client.objects.create(**defaults)
+
+
+def create_project(user, client_obj, **params):
+    """Create and return a test project"""
+    defaults = {
+        'start': '2023-08-15',
+        'deadline': '2023-10-15',
+        'priority': 'Normal',
+        'number': 'Test number project'
+    }
+    defaults.update(params)
+    return Project.objects.create(manager=user, client=client_obj, **defaults)
+
+
+class TempMediaMixin:
+    """Run each test against an empty MEDIA_ROOT removed afterwards"""
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, True)
@@ -0,0 +1,235 @@
+"""
+Test multiplexed websocket consumer
+"""
+import json
+import urllib.parse
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.test import (
+    SimpleTestCase,
+    TransactionTestCase,
+    override_settings
+)
+from rest_framework.authtoken.models import Token
+
+from core.consumer import StreamConsumer, MessageDedupe
+from core.models import Department
+from core.ws_auth import TokenAuthMiddleware
+from core.ws_utils import file_department_group, PROJECT_MANAGE_GROUP
+from file.consumer import FileDepartmentConsumer
+from project.consumer import ProjectManageConsumer
+
+
+@override_settings(CHANNEL_LAYERS={
+    'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}
+})
+class StreamConsumerTests(TransactionTestCase):
+    """Test stream subscribe and routing over one socket"""
+
+    def setUp(self):
+        self.dep_a = Department.objects.create(name='Dep A', order=1)
+        self.dep_b = Department.objects.create(name='Dep B', order=2)
+        self.user = get_user_model().objects.create_user(
+            username='employee',
+            email='employee@example.com',
+            password='testpass123',
+            role='Employee',
+            departments=[self.dep_a]
+        )
+        self.token = Token.objects.create(user=self.user)
+
+    async def open(self):
+        communicator = WebsocketCommunicator(
+            TokenAuthMiddleware(StreamConsumer.as_asgi()),
+            f'/ws/stream/?token={self.token.key}'
+        )
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def _test_routes_streams(self):
+        communicator = await self.open()
+        channel_layer = get_channel_layer()
+
+        await communicator.send_json_to({
+            'action': 'subscribe',
+            'stream': 'file-department',
+            'params': {'dep_id': self.dep_a.id}
+        })
+        ack = await communicator.receive_json_from()
+        await communicator.send_json_to({
+            'action': 'subscribe',
+            'stream': 'project-manage'
+        })
+        await communicator.receive_json_from()
+
+        await channel_layer.group_send(
+            file_department_group(self.dep_a.id),
+            {'type': 'task_modify_department', 'message': {'id': 1}}
+        )
+        task = await communicator.receive_json_from()
+        await channel_layer.group_send(
+            PROJECT_MANAGE_GROUP,
+            {'type': 'project_manage', 'message': {'id': 2}}
+        )
+        manage = await communicator.receive_json_from()
+        await communicator.disconnect()
+        return ack, task, manage
+
+    def test_routes_streams(self):
+        """Test events of several streams arrive on one socket"""
+        ack, task, manage = async_to_sync(self._test_routes_streams)()
+
+        self.assertEqual(
+            ack,
+            {'stream': 'file-department', 'subscribed': True}
+        )
+        self.assertEqual(
+            task,
+            {'stream': 'file-department', 'message': {'id': 1}}
+        )
+        self.assertEqual(
+            manage,
+            {'stream': 'project-manage', 'message': {'id': 2}}
+        )
+
+    async def _test_unsubscribe(self):
+        communicator = await self.open()
+        channel_layer = get_channel_layer()
+        for action in ('subscribe', 'unsubscribe'):
+            await communicator.send_json_to({
+                'action': action,
+                'stream': 'project-manage'
+            })
+            await communicator.receive_json_from()
+
+        await channel_layer.group_send(
+            PROJECT_MANAGE_GROUP,
+            {'type': 'project_manage', 'message': {'id': 2}}
+        )
+        nothing = await communicator.receive_nothing()
+        await communicator.disconnect()
+        return nothing
+
+    def test_unsubscribe(self):
+        """Test unsubscribed stream stops receiving events"""
+        self.assertTrue(async_to_sync(self._test_unsubscribe)())
+
+    async def _test_forbidden(self):
+        communicator = await self.open()
+        await communicator.send_json_to({
+            'action': 'subscribe',
+            'stream': 'file-department',
+            'params': {'dep_id': self.dep_b.id}
+        })
+        forbidden = await communicator.receive_json_from()
+        await communicator.send_json_to({
+            'action': 'subscribe',
+            'stream': 'unknown'
+        })
+        unknown = await communicator.receive_json_from()
+        await communicator.disconnect()
+        return forbidden, unknown
+
+    def test_subscribe_refused(self):
+        """Test foreign department and unknown stream are refused"""
+        forbidden, unknown = async_to_sync(self._test_forbidden)()
+
+        self.assertEqual(
+            forbidden,
+            {'stream': 'file-department', 'error': 'Forbidden'}
+        )
+        self.assertEqual(unknown, {'stream': 'unknown', 'error': 'No stream'})
+
+    def test_disconnect_leaves_groups(self):
+        """Test every subscription is discarded on disconnect"""
+        async_to_sync(self._test_routes_streams)()
+
+        channel_layer = get_channel_layer()
+        self.assertFalse(any(channel_layer.groups.values()))
+
+    async def _test_legacy_cookie(self, consumer, path):
+        value = urllib.parse.quote(json.dumps({'id': self.user.id}))
+        communicator = WebsocketCommunicator(
+            TokenAuthMiddleware(consumer.as_asgi()),
+            path,
+            headers=[(b'cookie', f'user={value}'.encode('utf-8'))]
+        )
+        connected, _ = await communicator.connect()
+        await communicator.disconnect()
+        return connected
+
+    @override_settings(WS_LEGACY_COOKIE_AUTH=True)
+    def test_legacy_cookie_not_for_topics(self):
+        """Test legacy cookie opens legacy routes but no department topic"""
+        self.user.is_staff = True
+        self.user.save()
+        connect = async_to_sync(self._test_legacy_cookie)
+
+        self.assertTrue(
+            connect(ProjectManageConsumer, '/ws/project-manage/')
+        )
+        self.assertFalse(connect(
+            FileDepartmentConsumer,
+            f'/ws/file-department/?dep_id={self.dep_b.id}'
+        ))
+        self.assertFalse(connect(StreamConsumer, '/ws/stream/'))
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class MessageDedupeTests(SimpleTestCase):
+    """Test bounded message id dedupe"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.dedupe = MessageDedupe(max_size=3, ttl=10, clock=self.clock)
+
+    def test_duplicate_detected(self):
+        """Test id is reported as seen the second time"""
+        self.assertFalse(self.dedupe.seen('a'))
+        self.assertTrue(self.dedupe.seen('a'))
+
+    def test_size_bounded(self):
+        """Test least recently seen ids are evicted above max size"""
+        for message_id in ['a', 'b', 'c', 'a', 'd']:
+            self.dedupe.seen(message_id)
+
+        self.assertEqual(len(self.dedupe), 3)
+        self.assertNotIn('b', self.dedupe)
+        self.assertIn('a', self.dedupe)
+        self.assertEqual(self.dedupe.metrics()['evictions'], 1)
+
+    def test_ttl_expires(self):
+        """Test ids are forgotten after ttl"""
+        self.dedupe.seen('a')
+        self.clock.now = 11
+
+        self.assertFalse(self.dedupe.seen('a'))
+        self.assertEqual(len(self.dedupe), 1)
+
+    def test_long_session_memory_bounded(self):
+        """Test memory stays flat over a long stream of unique ids"""
+        dedupe = MessageDedupe(max_size=100, ttl=60, clock=self.clock)
+        for i in range(100):
+            dedupe.seen(f'message-{i:06d}')
+        memory = dedupe.metrics()['memory']
+
+        for i in range(100, 100000):
+            self.clock.now = i / 100
+            dedupe.seen(f'message-{i:06d}')
+
+        metrics = dedupe.metrics()
+        self.assertEqual(metrics['size'], 100)
+        self.assertEqual(metrics['misses'], 100000)
+        self.assertLessEqual(metrics['memory'], memory * 1.5)
@@ -0,0 +1,115 @@
+"""
+Test background jobs
+"""
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core import jobs
+from core.models import Job
+
+
+calls = []
+
+
+@jobs.job('tests.record')
+def record(value):
+    calls.append(value)
+
+
+@jobs.job('tests.explode')
+def explode():
+    raise ValueError('boom')
+
+
+class JobTests(TestCase):
+    """Test job queue"""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_dedupes_pending_jobs(self):
+        """Test identical pending job is queued once"""
+        jobs.enqueue('tests.record', 1)
+        jobs.enqueue('tests.record', 1)
+        jobs.enqueue('tests.record', 2)
+
+        self.assertEqual(Job.objects.filter(status='Pending').count(), 2)
+
+    def test_enqueue_unknown_job(self):
+        """Test enqueue of not registered job raises error"""
+        with self.assertRaises(KeyError):
+            jobs.enqueue('tests.missing')
+
+    def test_run_pending(self):
+        """Test worker runs due jobs and removes them"""
+        jobs.enqueue('tests.record', 1)
+        jobs.enqueue('tests.record', 2)
+
+        processed = jobs.run_pending()
+
+        self.assertEqual(processed, 2)
+        self.assertEqual(sorted(calls), [1, 2])
+        self.assertFalse(Job.objects.exists())
+
+    def test_run_pending_skips_future_jobs(self):
+        """Test job scheduled for later is not run"""
+        job_obj = jobs.enqueue('tests.record', 1)
+        job_obj.run_after = timezone.now() + timedelta(minutes=1)
+        job_obj.save()
+
+        self.assertEqual(jobs.run_pending(), 0)
+        self.assertEqual(calls, [])
+
+    def test_failed_job_retried(self):
+        """Test failed job is scheduled again with backoff"""
+        job_obj = jobs.enqueue('tests.explode')
+
+        jobs.run_pending()
+
+        job_obj.refresh_from_db()
+        self.assertEqual(job_obj.status, 'Pending')
+        self.assertEqual(job_obj.attempts, 1)
+        self.assertGreater(job_obj.run_after, timezone.now())
+        self.assertIn('boom', job_obj.last_error)
+
+    def test_failed_job_gives_up(self):
+        """Test job is marked failed after max attempts"""
+        job_obj = jobs.enqueue('tests.explode')
+        job_obj.attempts = job_obj.max_attempts - 1
+        job_obj.save()
+
+        jobs.run_pending()
+
+        job_obj.refresh_from_db()
+        self.assertEqual(job_obj.status, 'Failed')
+
+    def test_stale_running_job_requeued(self):
+        """Test job of dead worker is given back to the queue"""
+        job_obj = jobs.enqueue('tests.record', 1)
+        Job.objects.filter(id=job_obj.id).update(
+            status='Running',
+            locked_at=timezone.now() - jobs.JOB_LOCK_TIMEOUT * 2
+        )
+
+        jobs.run_pending()
+
+        self.assertEqual(calls, [1])
+
+    @override_settings(JOBS_BACKEND='local')
+    def test_local_backend_runs_in_process(self):
+        """Test local backend runs job right away"""
+        jobs.enqueue('tests.record', 1)
+
+        self.assertEqual(calls, [1])
+        self.assertFalse(Job.objects.exists())
+
+    def test_run_jobs_command(self):
+        """Test run_jobs command processes queue"""
+        jobs.enqueue('tests.record', 1)
+
+        call_command('run_jobs', once=True)
+
+        self.assertEqual(calls, [1])
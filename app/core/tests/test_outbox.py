@@ -0,0 +1,74 @@
+"""
+Test channel layer outbox
+"""
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.test import TestCase, override_settings
+
+from core.models import Job, OutboxEvent
+from core.ws_utils import publish, relay_outbox
+
+
+def event(message, type='project_noti'):
+    return {'type': type, 'message': message}
+
+
+@override_settings(CHANNEL_LAYERS={
+    'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}
+})
+class OutboxTests(TestCase):
+    """Test outbox publish and relay"""
+
+    def setUp(self):
+        self.channel_layer = get_channel_layer()
+        self.channel = async_to_sync(self.channel_layer.new_channel)()
+        async_to_sync(self.channel_layer.group_add)('group_a', self.channel)
+
+    def receive(self):
+        return async_to_sync(self.channel_layer.receive)(self.channel)
+
+    def test_publish_writes_outbox(self):
+        """Test publish stores events instead of sending them"""
+        publish([('group_a', event({'id': 1}))])
+
+        self.assertEqual(OutboxEvent.objects.count(), 1)
+
+    def test_relay_enqueued_on_commit(self):
+        """Test relay job is queued once the transaction commits"""
+        with self.captureOnCommitCallbacks(execute=True):
+            publish([('group_a', event({'id': 1}))])
+            publish([('group_a', event({'id': 2}))])
+
+        relay_jobs = Job.objects.filter(name='core.relay_outbox')
+        self.assertEqual(relay_jobs.count(), 1)
+
+    def test_relay_sends_and_clears(self):
+        """Test relay pushes events to the channel layer"""
+        publish([('group_a', event({'id': 1}))])
+
+        relayed = relay_outbox()
+
+        self.assertEqual(relayed, 1)
+        self.assertEqual(self.receive()['message'], {'id': 1})
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_relay_coalesces_duplicates(self):
+        """Test identical events of one batch are sent once"""
+        publish([('group_a', event({'id': 1}))])
+        publish([('group_a', event({'id': 1}))])
+        publish([('group_a', event({'id': 2}))])
+
+        relay_outbox()
+
+        self.assertEqual(self.receive()['message'], {'id': 1})
+        self.assertEqual(self.receive()['message'], {'id': 2})
+        self.assertNotIn(self.channel, self.channel_layer.channels)
+
+    def test_relay_coalesces_keyed_events(self):
+        """Test only latest event with the same key is sent"""
+        publish([('group_a', event({'progress': 10}))], key='task_1')
+        publish([('group_a', event({'progress': 20}))], key='task_1')
+
+        relay_outbox()
+
+        self.assertEqual(self.receive()['message'], {'progress': 20})
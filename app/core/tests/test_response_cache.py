@@ -0,0 +1,110 @@
+"""
+Test versioned response cache of column endpoints
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.cache_utils import departments_version
+from core.models import Department
+
+
+FILE_COLUMNS_URL = reverse('file:admin-file-mange-columns')
+CLIENT_COLUMNS_URL = reverse('client:client-client-columns')
+
+
+class ResponseCacheTests(TestCase):
+    """Test ETag and If-None-Match handling of cached responses"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_superuser(
+            username='admin',
+            password='testpass123',
+            role='Admin'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Department.objects.create(name='Dep 1', order=1)
+
+    def test_revalidation_not_modified(self):
+        """Test matching ETag gets 304 without db queries"""
+        res = self.client.get(FILE_COLUMNS_URL)
+        etag = res['ETag']
+
+        with CaptureQueriesContext(connection) as ctx:
+            cached = self.client.get(
+                FILE_COLUMNS_URL,
+                HTTP_IF_NONE_MATCH=etag
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('Dep 1', res.data['merged'])
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(cached['ETag'], etag)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_cached_body_without_db(self):
+        """Test request without ETag is served from cache"""
+        res = self.client.get(FILE_COLUMNS_URL)
+
+        with CaptureQueriesContext(connection) as ctx:
+            cached = self.client.get(FILE_COLUMNS_URL)
+
+        self.assertEqual(cached.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached.data, res.data)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_department_change_invalidates(self):
+        """Test saving or deleting department changes response and ETag"""
+        etag = self.client.get(FILE_COLUMNS_URL)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            department = Department.objects.create(name='Dep 2', order=2)
+
+        res = self.client.get(FILE_COLUMNS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('Dep 2', res.data['merged'])
+        self.assertNotEqual(res['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            department.delete()
+        res = self.client.get(FILE_COLUMNS_URL)
+
+        self.assertNotIn('Dep 2', res.data['merged'])
+        self.assertEqual(res['ETag'], etag)
+
+    def test_version_bumped_on_commit(self):
+        """Test version changes only when the department change commits"""
+        version = departments_version()
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            Department.objects.create(name='Dep 2', order=2)
+            self.assertEqual(departments_version(), version)
+
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(departments_version(), version)
+
+    def test_static_columns(self):
+        """Test static columns are revalidated with ETag"""
+        etag = self.client.get(CLIENT_COLUMNS_URL)['ETag']
+
+        res = self.client.get(CLIENT_COLUMNS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertIn('no-cache', res['Cache-Control'])
+
+    def test_permissions_checked(self):
+        """Test cached response still requires permission"""
+        self.client.get(CLIENT_COLUMNS_URL)
+        self.client.force_authenticate(None)
+
+        res = self.client.get(CLIENT_COLUMNS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
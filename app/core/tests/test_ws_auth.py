@@ -0,0 +1,132 @@
+"""
+Test websocket authentication
+"""
+import json
+import time
+import urllib.parse
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from core.consumer import StreamConsumer, MessageDedupe
+from core.ws_auth import TokenAuthMiddleware
+
+
+BURST_MESSAGES = 10000
+BURST_BUDGET = 1.0
+
+
+def legacy_cookie(user_id):
+    value = urllib.parse.quote(json.dumps({'id': user_id}))
+    return (b'cookie', f'user={value}'.encode('utf-8'))
+
+
+class TokenAuthMiddlewareTests(TransactionTestCase):
+    """Test identity is resolved from the auth token"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='employee',
+            email='employee@example.com',
+            password='testpass123',
+            role='Employee'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.middleware = TokenAuthMiddleware(None)
+
+    def resolve(self, query_string=b'', headers=()):
+        scope = {'query_string': query_string, 'headers': list(headers)}
+        return async_to_sync(self.middleware.resolve_user)(scope)
+
+    def test_token_query_param(self):
+        """Test token from query string authenticates"""
+        user = self.resolve(f'token={self.token.key}'.encode('utf-8'))
+
+        self.assertEqual(user.id, self.user.id)
+
+    def test_token_cookie_and_header(self):
+        """Test token from cookie or authorization header authenticates"""
+        cookie = (b'cookie', f'token={self.token.key}'.encode('utf-8'))
+        header = (
+            b'authorization',
+            f'Token {self.token.key}'.encode('utf-8')
+        )
+
+        self.assertEqual(self.resolve(headers=[cookie]).id, self.user.id)
+        self.assertEqual(self.resolve(headers=[header]).id, self.user.id)
+
+    def test_invalid_token_anonymous(self):
+        """Test unknown token is not authenticated"""
+        user = self.resolve(b'token=invalid')
+
+        self.assertFalse(user.is_authenticated)
+
+    def test_inactive_user_anonymous(self):
+        """Test token of inactive user is not authenticated"""
+        self.user.is_active = False
+        self.user.save()
+
+        user = self.resolve(f'token={self.token.key}'.encode('utf-8'))
+
+        self.assertFalse(user.is_authenticated)
+
+    @override_settings(WS_LEGACY_COOKIE_AUTH=True)
+    def test_legacy_cookie_fallback(self):
+        """Test legacy user cookie is accepted when enabled"""
+        user = self.resolve(headers=[legacy_cookie(self.user.id)])
+
+        self.assertEqual(user.id, self.user.id)
+
+    @override_settings(WS_LEGACY_COOKIE_AUTH=False)
+    def test_legacy_cookie_disabled(self):
+        """Test legacy user cookie is refused when disabled"""
+        user = self.resolve(headers=[legacy_cookie(self.user.id)])
+
+        self.assertFalse(user.is_authenticated)
+
+
+class DispatchBenchmarkTests(TransactionTestCase):
+    """Test per message dispatch cost of a connected consumer"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='employee',
+            email='employee@example.com',
+            password='testpass123',
+            role='Employee'
+        )
+
+    async def burst(self, consumer, events):
+        start = time.perf_counter()
+        for event in events:
+            await consumer.dispatch_message(event)
+        return time.perf_counter() - start
+
+    def test_dispatch_burst(self):
+        """Test 10k msg burst is dispatched within a second, no queries"""
+        sent = []
+
+        async def send(text_data):
+            sent.append(text_data)
+
+        consumer = StreamConsumer()
+        consumer.scope = {'user': self.user}
+        consumer.user = self.user
+        consumer.subscriptions = {}
+        consumer.received_messages = MessageDedupe()
+        consumer.send = send
+        events = [
+            {'type': 'task_modify_department', 'message': {'id': i}}
+            for i in range(BURST_MESSAGES)
+        ]
+
+        with CaptureQueriesContext(connection) as ctx:
+            elapsed = async_to_sync(self.burst)(consumer, events)
+
+        self.assertEqual(len(sent), BURST_MESSAGES)
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertLess(elapsed, BURST_BUDGET)
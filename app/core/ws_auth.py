@@ -0,0 +1,96 @@
+"""
+Websocket authentication
+
+The user is resolved once when the socket connects and stored in
+``scope['user']``. The DRF auth token is read from the ``token`` query
+param, the ``token`` cookie or the ``Authorization: Token <key>``
+header. The legacy ``user`` cookie holding the user data is accepted as
+fallback while WS_LEGACY_COOKIE_AUTH is enabled, such a scope is marked
+with ``legacy_auth`` because the cookie is not signed.
+"""
+import json
+import urllib.parse
+from http.cookies import SimpleCookie
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.authtoken.models import Token
+from core.models import User
+
+
+def get_header(scope, name):
+    for header in scope.get('headers', []):
+        if header[0] == name:
+            return header[1].decode('utf-8')
+
+
+def get_cookies(scope):
+    cookie = SimpleCookie()
+    cookie_header = get_header(scope, b'cookie')
+    if cookie_header:
+        cookie.load(cookie_header)
+    return {name: morsel.value for name, morsel in cookie.items()}
+
+
+def get_token_key(scope, cookies):
+    query_string = scope.get('query_string', b'').decode('utf-8')
+    values = urllib.parse.parse_qs(query_string).get('token')
+    if values:
+        return values[0]
+    if 'token' in cookies:
+        return cookies['token']
+    authorization = get_header(scope, b'authorization') or ''
+    keyword, _, key = authorization.partition(' ')
+    if keyword == 'Token' and key:
+        return key
+
+
+def get_legacy_user_id(cookies):
+    if 'user' not in cookies:
+        return None
+    try:
+        user_data = json.loads(urllib.parse.unquote(cookies['user']))
+        return int(user_data['id'])
+    except (ValueError, TypeError, KeyError):
+        return None
+
+
+@database_sync_to_async
+def get_user(token_key=None, user_id=None):
+    if token_key:
+        token = Token.objects.select_related('user').filter(
+            key=token_key
+        ).first()
+        user = token.user if token else None
+    else:
+        user = User.objects.filter(id=user_id).first()
+    if user is None or not user.is_active:
+        return AnonymousUser()
+    return user
+
+
+class TokenAuthMiddleware(BaseMiddleware):
+    """Populate scope['user'] from the DRF auth token"""
+
+    async def __call__(self, scope, receive, send):
+        scope = dict(scope)
+        scope['user'] = await self.resolve_user(scope)
+        return await super().__call__(scope, receive, send)
+
+    async def resolve_user(self, scope):
+        cookies = get_cookies(scope)
+        token_key = get_token_key(scope, cookies)
+        if token_key:
+            return await get_user(token_key=token_key)
+        if getattr(settings, 'WS_LEGACY_COOKIE_AUTH', False):
+            user_id = get_legacy_user_id(cookies)
+            if user_id:
+                scope['legacy_auth'] = True
+                return await get_user(user_id=user_id)
+        return AnonymousUser()
+
+
+def TokenAuthMiddlewareStack(inner):
+    return TokenAuthMiddleware(inner)
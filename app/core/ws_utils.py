@@ -0,0 +1,113 @@
+"""
+Helpers for pushing messages to channel layer groups
+
+Messages are not sent from the request. ``publish`` stores them in the
+outbox table inside the current transaction and ``relay_outbox`` job
+drains the outbox to the channel layer after commit, in batches.
+"""
+import asyncio
+import json
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from core.jobs import job, enqueue
+from core.models import OutboxEvent
+
+
+GROUP_SEND_BATCH_SIZE = 100
+OUTBOX_BATCH_SIZE = 500
+
+# Shared topic groups, consumers subscribe to the ones the user may see
+# so every event is a single group_send regardless of the number of users.
+FILE_PROJECT_BOARD_GROUP = 'file_modify_project_board'
+PROJECT_MANAGE_GROUP = 'project_manage_board'
+
+
+def file_project_group(project_id):
+    return f'file_modify_project_{project_id}'
+
+
+def file_department_group(dep_id):
+    return f'file_modify_department_{dep_id}'
+
+
+async def _group_send_batched(channel_layer, messages, batch_size):
+    for i in range(0, len(messages), batch_size):
+        batch = messages[i:i + batch_size]
+        await asyncio.gather(*[
+            channel_layer.group_send(group, event)
+            for group, event in batch
+        ])
+
+
+def group_send_many(messages, batch_size=GROUP_SEND_BATCH_SIZE):
+    """
+    Send list of (group, event) pairs to the channel layer.
+    Sends of one batch run concurrently in a single event loop pass
+    instead of one async_to_sync round trip per message.
+    """
+    if not messages:
+        return
+    channel_layer = get_channel_layer()
+    async_to_sync(_group_send_batched)(channel_layer, messages, batch_size)
+
+
+def publish(messages, key=''):
+    """
+    Store list of (group, event) pairs in the outbox.
+    Events with the same non empty key and group waiting in the outbox
+    are coalesced, only the latest one is sent.
+    """
+    if not messages:
+        return
+    OutboxEvent.objects.bulk_create([
+        OutboxEvent(
+            group=group,
+            type=event['type'],
+            message=event['message'],
+            key=key
+        )
+        for group, event in messages
+    ])
+    transaction.on_commit(lambda: enqueue('core.relay_outbox'))
+
+
+def coalesce(events):
+    """Drop events superseded by a later event in the same batch"""
+    latest = {}
+    for event in events:
+        if event.key:
+            ident = (event.group, event.key)
+        else:
+            ident = (
+                event.group,
+                event.type,
+                json.dumps(event.message, sort_keys=True)
+            )
+        latest.pop(ident, None)
+        latest[ident] = event
+    return [
+        (event.group, {'type': event.type, 'message': event.message})
+        for event in latest.values()
+    ]
+
+
+@job('core.relay_outbox')
+def relay_outbox(batch_size=OUTBOX_BATCH_SIZE):
+    """Send outbox events to the channel layer, returns number relayed"""
+    relayed = 0
+    while True:
+        with transaction.atomic():
+            events = list(
+                OutboxEvent.objects.select_for_update(
+                    skip_locked=True
+                ).order_by('id')[:batch_size]
+            )
+            if not events:
+                return relayed
+            group_send_many(coalesce(events))
+            OutboxEvent.objects.filter(
+                id__in=[event.id for event in events]
+            ).delete()
+        relayed += len(events)
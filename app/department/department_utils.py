@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+from core.models import QueueLogic
+
+
+STATS_CACHE_PREFIX = 'department_stats'
+
+
+def department_stats(queryset, now=None):
+    """
+    Open tasks per department with started, paused and overdue
+    breakdowns, counted in one grouped query
+    """
+    if now is None:
+        now = timezone.now()
+    rows = (
+        queryset.filter(end=False)
+        .order_by('department__order')
+        .values('department', 'department__name', 'department__order')
+        .annotate(
+            quantity=Count('id', distinct=True),
+            started=Count(
+                'id',
+                filter=Q(start=True, paused=False),
+                distinct=True
+            ),
+            paused=Count('id', filter=Q(paused=True), distinct=True),
+            overdue=Count(
+                'id',
+                filter=Q(planned_end_date__lt=now),
+                distinct=True
+            ),
+        )
+    )
+    return [
+        {
+            'id': row['department'],
+            'quantity': row['quantity'],
+            'name': row['department__name'],
+            'started': row['started'],
+            'paused': row['paused'],
+            'overdue': row['overdue'],
+        }
+        for row in rows
+    ]
+
+
+def cached_stats(key, compute):
+    """Cache stats for DEPARTMENT_STATS_CACHE_TIMEOUT seconds if set"""
+    timeout = getattr(settings, 'DEPARTMENT_STATS_CACHE_TIMEOUT', 0)
+    if not timeout:
+        return compute()
+    key = f'{STATS_CACHE_PREFIX}_{key}'
+    data = cache.get(key)
+    if data is None:
+        data = compute()
+        cache.set(key, data, timeout)
+    return data
+
+
+def admin_department_stats():
+    return cached_stats(
+        'all',
+        lambda: department_stats(QueueLogic.objects.all())
+    )
+
+
+def user_department_stats(user):
+    queryset = QueueLogic.objects.filter(
+        department__in=user.departments.all(),
+        users=user
+    )
+    return cached_stats(
+        f'user_{user.id}',
+        lambda: department_stats(queryset)
+    )
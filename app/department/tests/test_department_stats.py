@@ -0,0 +1,130 @@
+"""
+Test for department stats APIs
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.models import Client, Department, File, Project, QueueLogic
+
+
+DEPARTMENT_ADMIN_STATS_URL = reverse('department:admin-department-admin-stats')
+DEPARTMENT_STATS_URL = reverse('department:auth-department-stats')
+
+
+class DepartmentStatsTests(TestCase):
+    """Test department stats aggregation"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = get_user_model().objects.create_user(
+            username='admin',
+            email='admin@example.com',
+            password='testpass123',
+            role='Admin'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.dep_a = Department.objects.create(name='Dep A', order=1)
+        self.dep_b = Department.objects.create(name='Dep B', order=2)
+        project = Project.objects.create(
+            manager=self.admin,
+            client=Client.objects.create(name='Test client'),
+            start='2023-08-15',
+            deadline='2023-10-15',
+            priority='Normal',
+            number='Test number project'
+        )
+        self.file = File.objects.create(
+            user=self.admin,
+            project=project,
+            name='Test file',
+            destiny='Production',
+            file='uploads/projects/test.pdf'
+        )
+        now = timezone.now()
+        self.create_task(self.dep_a, now + timedelta(days=1), start=True)
+        self.create_task(
+            self.dep_a,
+            now + timedelta(days=1),
+            start=True,
+            paused=True
+        )
+        self.create_task(self.dep_a, now - timedelta(days=1))
+        self.create_task(self.dep_a, now - timedelta(days=1), end=True)
+        self.create_task(self.dep_b, now + timedelta(days=1))
+
+    def create_task(self, department, planned_end, users=(), **params):
+        task = QueueLogic.objects.create(
+            file=self.file,
+            project=self.file.project,
+            department=department,
+            planned_start_date=planned_end - timedelta(days=2),
+            planned_end_date=planned_end,
+            **params
+        )
+        task.users.set(users)
+        return task
+
+    def test_admin_stats(self):
+        """Test open tasks are grouped per department with breakdowns"""
+        res = self.client.get(DEPARTMENT_ADMIN_STATS_URL)
+
+        self.assertEqual(res.data, [
+            {
+                'id': self.dep_a.id, 'quantity': 3, 'name': 'Dep A',
+                'started': 1, 'paused': 1, 'overdue': 1
+            },
+            {
+                'id': self.dep_b.id, 'quantity': 1, 'name': 'Dep B',
+                'started': 0, 'paused': 0, 'overdue': 0
+            },
+        ])
+
+    def test_admin_stats_single_query(self):
+        """Test stats come from one grouped query"""
+        for _ in range(20):
+            self.create_task(self.dep_b, timezone.now())
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(DEPARTMENT_ADMIN_STATS_URL)
+
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_user_stats(self):
+        """Test user stats count only his tasks in his departments"""
+        user = get_user_model().objects.create_user(
+            username='employee',
+            email='employee@example.com',
+            password='testpass123',
+            role='Employee',
+            departments=[self.dep_b]
+        )
+        self.create_task(self.dep_b, timezone.now(), users=[user])
+        self.create_task(self.dep_a, timezone.now(), users=[user])
+        self.client.force_authenticate(user)
+
+        res = self.client.get(DEPARTMENT_STATS_URL)
+
+        self.assertEqual(len(res.data), 1)
+        self.assertEqual(res.data[0]['id'], self.dep_b.id)
+        self.assertEqual(res.data[0]['quantity'], 1)
+
+    @override_settings(DEPARTMENT_STATS_CACHE_TIMEOUT=30)
+    def test_stats_cached(self):
+        """Test stats are served from cache when enabled"""
+        self.client.get(DEPARTMENT_ADMIN_STATS_URL)
+        self.create_task(self.dep_b, timezone.now())
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(DEPARTMENT_ADMIN_STATS_URL)
+
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(res.data[1]['quantity'], 1)
@@ -2,6 +2,7 @@
 Views for the department APIs.
 """
 
+from django.db import transaction
 from rest_framework import (
     viewsets,
     mixins,
@@ -15,6 +16,11 @@ from core.models import (
     QueueLogic,
 )
 from department import serializers
+from department.department_utils import (
+    admin_department_stats,
+    user_department_stats
+)
+from project.project_utils import recount_project_tasks
 
 
 class DepartmentAdminViewSet(mixins.CreateModelMixin,
@@ -32,31 +38,23 @@ class DepartmentAdminViewSet(mixins.CreateModelMixin,
     def perform_create(self, serializer):
         """Create a new department"""
         serializer.save()
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        """Delete department and recount progress of its projects"""
+        project_ids = list(
+            QueueLogic.objects.filter(department=instance)
+            .order_by()
+            .values_list('project', flat=True)
+            .distinct()
+        )
+        instance.delete()
+        recount_project_tasks(project_ids)
     
     @action(methods=['GET'], detail=False, url_path='stats')
     def department_admin_stats(self, request):
         """Returns a list of how much files are assigned to department"""
-        queryset = QueueLogic.objects.filter(end=False)
-        serializer = serializers.DepartmentStatsSerializer(queryset, many=True)
-        data = serializer.data
-        dep_info_dict = {}
-
-        for item in data:
-            dep_info = item["department"]
-            dep_id = dep_info["id"]
-            dep_name = dep_info["name"]
-
-            if dep_name in dep_info_dict:
-                dep_info_dict[dep_name]["quantity"] += 1
-            else:
-                dep_info_dict[dep_name] = {
-                    "id": dep_id,
-                    "quantity": 1,
-                    "name": dep_name
-                }
-
-        result = list(dep_info_dict.values())
-        return Response(result)
+        return Response(admin_department_stats())
 
 
 class DepartmentAuthViewSet(mixins.RetrieveModelMixin,
@@ -82,28 +80,4 @@ class DepartmentAuthViewSet(mixins.RetrieveModelMixin,
     @action(methods=['GET'], detail=False, url_path='stats')
     def department_stats(self, request):
         """Returns a list of how much files are assigned to department where user has permission"""
-        user = request.user
-        user_deps = []
-        for dep in user.departments.values():
-            user_deps.append(dep['id'])
-        queryset = self.queryset.filter(department__in=user_deps, users__in=[user.id], end=False)
-        serializer = self.get_serializer(queryset, many=True)
-        data = serializer.data
-        dep_info_dict = {}
-
-        for item in data:
-            dep_info = item["department"]
-            dep_id = dep_info["id"]
-            dep_name = dep_info["name"]
-
-            if dep_name in dep_info_dict:
-                dep_info_dict[dep_name]["quantity"] += 1
-            else:
-                dep_info_dict[dep_name] = {
-                    "id": dep_id,
-                    "quantity": 1,
-                    "name": dep_name
-                }
-
-        result = list(dep_info_dict.values())
-        return Response(result)
+        return Response(user_department_stats(request.user))
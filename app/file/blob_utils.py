@@ -0,0 +1,184 @@
+"""
+Content addressed file storage
+
+File bodies are stored once per SHA-256 under ``blobs/`` and shared by
+every File row pointing at the Blob. Blob.refcount counts those rows,
+blobs nobody references any more are removed by ``collect_blobs``.
+Clients can ask for a hash before uploading and attach the existing blob
+instead of sending the bytes again.
+"""
+import hashlib
+import os
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import (
+    Case,
+    Count,
+    Exists,
+    F,
+    OuterRef,
+    PositiveIntegerField,
+    Subquery,
+    Value,
+    When
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from core.models import Blob, File
+from core.storage import ContentAddressedStorage
+
+
+BLOB_PREFIX = 'blobs'
+BLOB_GC_GRACE = timedelta(hours=1)
+BLOB_GC_BATCH_SIZE = 100
+
+blob_storage = ContentAddressedStorage()
+
+
+def blob_name(sha256, filename):
+    """Storage name of content, the extension keeps the mime type"""
+    extension = os.path.splitext(filename)[1].lower()
+    return os.path.join(
+        BLOB_PREFIX,
+        sha256[:2],
+        sha256[2:4],
+        f'{sha256}{extension}'
+    )
+
+
+def hash_content(content):
+    """Return SHA-256 and size of uploaded file"""
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in content.chunks():
+        digest.update(chunk)
+        size += len(chunk)
+    content.seek(0)
+    return digest.hexdigest(), size
+
+
+def lock_blob(sha256, size, filename):
+    """Locked Blob row of the content, created when it is new"""
+    blob, _ = Blob.objects.select_for_update().get_or_create(
+        sha256=sha256,
+        defaults={'name': blob_name(sha256, filename), 'size': size}
+    )
+    return blob
+
+
+def lock_blobs(contents):
+    """
+    Locked Blob rows by hash for ``{sha256: (size, filename)}``,
+    the missing ones are created
+    """
+    Blob.objects.bulk_create(
+        [
+            Blob(sha256=sha256, name=blob_name(sha256, filename), size=size)
+            for sha256, (size, filename) in contents.items()
+        ],
+        ignore_conflicts=True
+    )
+    blobs = Blob.objects.select_for_update().filter(sha256__in=contents)
+    return {blob.sha256: blob for blob in blobs}
+
+
+def write_blob(content, blob):
+    """Save content under the blob name unless it is stored already"""
+    if blob_storage.exists(blob.name):
+        return False
+    blob_storage.save(blob.name, content)
+    return True
+
+
+def move_to_blob(path, blob):
+    """Move local file holding blob content in place, drop it if stored"""
+    target = blob_storage.path(blob.name)
+    if os.path.exists(target):
+        os.remove(path)
+        return
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.replace(path, target)
+
+
+def download_name(file):
+    """
+    Name a file is downloaded under, the stored name of a blob is its
+    hash so the name given by the user is used with the stored extension.
+    """
+    stored = os.path.basename(file.file.name)
+    if not file.name:
+        return stored
+    extension = os.path.splitext(stored)[1]
+    if os.path.splitext(file.name)[1].lower() == extension.lower():
+        return file.name
+    return f'{file.name}{extension}'
+
+
+def attach_blob(blob, **fields):
+    """Create File pointing at the blob and count the reference"""
+    Blob.objects.filter(id=blob.id).update(refcount=F('refcount') + 1)
+    return File.objects.create(file=blob.name, blob=blob, **fields)
+
+
+def attach_blobs(entries, **fields):
+    """
+    Bulk create Files for ``(blob, name)`` entries sharing fields
+    and count the references
+    """
+    files = File.objects.bulk_create([
+        File(file=blob.name, blob=blob, name=name, **fields)
+        for blob, name in entries
+    ])
+    references = Counter(blob.id for blob, _ in entries)
+    Blob.objects.filter(id__in=references).update(
+        refcount=F('refcount') + Case(
+            *[
+                When(id=blob_id, then=Value(count))
+                for blob_id, count in references.items()
+            ],
+            output_field=PositiveIntegerField()
+        )
+    )
+    return files
+
+
+def release_blobs(files):
+    """Drop the blob references of files about to be deleted"""
+    references = files.filter(
+        blob=OuterRef('pk')
+    ).order_by().values('blob').annotate(count=Count('id')).values('count')
+    return Blob.objects.filter(
+        id__in=files.filter(blob__isnull=False).values('blob')
+    ).update(refcount=F('refcount') - Subquery(references))
+
+
+def recount_blobs():
+    """Recompute every refcount from File rows, return updated count"""
+    references = File.objects.filter(
+        blob=OuterRef('pk')
+    ).order_by().values('blob').annotate(count=Count('id')).values('count')
+    return Blob.objects.update(refcount=Coalesce(Subquery(references), 0))
+
+
+def collect_blobs(grace=BLOB_GC_GRACE, batch_size=BLOB_GC_BATCH_SIZE):
+    """
+    Delete unreferenced blobs older than grace with their content.
+    Rows are locked, a blob being attached meanwhile is skipped.
+    """
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            blobs = list(
+                Blob.objects.select_for_update(skip_locked=True)
+                .filter(refcount=0, date_add__lt=timezone.now() - grace)
+                .exclude(Exists(File.objects.filter(blob=OuterRef('pk'))))
+                [:batch_size]
+            )
+            if not blobs:
+                return deleted
+            for blob in blobs:
+                blob_storage.delete(blob.name)
+            Blob.objects.filter(id__in=[blob.id for blob in blobs]).delete()
+        deleted += len(blobs)
@@ -1,8 +1,15 @@
 import math
 from django.core.paginator import Paginator
+from django.db.models import Prefetch
 from project.serializers import ProjectProgressSerializer
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
+from project.project_utils import adjust_project_tasks
+from core.pagination_utils import keyset_paginate
+from core.ws_utils import (
+    publish,
+    file_project_group,
+    file_department_group,
+    FILE_PROJECT_BOARD_GROUP
+)
 from file import serializers
 from department.serializers import DepartmentSerializer
 from file.serializers import FileDepartmentSerializer
@@ -15,9 +22,9 @@ from core.models import (
     User,
     CommentFile
 )
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework import status
-from datetime import datetime, timezone, timedelta
 
 
 def get_file_project_data(file_id):
@@ -26,6 +33,29 @@ def get_file_project_data(file_id):
     return serializer_file.data
 
 
+def board_queryset(queryset):
+    """
+    Load files for FileDepartmentSerializer in a fixed number of queries.
+    Filters joining queue rows may repeat a file, hence distinct().
+    Queue comes in department order, comments get their file from prefetch.
+    """
+    return queryset.distinct().select_related(
+        'project__manager'
+    ).prefetch_related(
+        Prefetch(
+            'comments',
+            queryset=CommentFile.objects.select_related('user')
+        ),
+        Prefetch(
+            'queue',
+            queryset=QueueLogic.objects.order_by(
+                'department__order',
+                'id'
+            ).prefetch_related('users')
+        )
+    )
+
+
 def get_queue_status(queue_status):
     if queue_status == 'Active':
         status_filter = True
@@ -41,7 +71,7 @@ def get_queue_status(queue_status):
 
 
 def paginate(page_size, page_number, dep_id, query):
-    paginator = Paginator(query, page_size)
+    paginator = Paginator(board_queryset(query), page_size)
     page_obj = paginator.get_page(page_number)
     context = {'dep_id': int(dep_id)}
     serializer = serializers.FileDepartmentSerializer(
@@ -59,28 +89,19 @@ def paginate(page_size, page_number, dep_id, query):
     return data
 
 
-def project_progress(project_id):
-    all_task = QueueLogic.objects.filter(project=project_id).count()
-    end_task = QueueLogic.objects.filter(project=project_id, end=True).count()
-    project = Project.objects.get(id=project_id)
-    try:
-        procent = (end_task / all_task) * 100
-    except ZeroDivisionError:
-        procent = 0
-    if all_task > 0 and procent >= 0 and procent < 100:
-        data = {'status': 'Started'}
-        serializer = ProjectProgressSerializer(project, data=data)
-        if serializer.is_valid():
-            serializer.save()
-    if procent == 100:
-        data = {'status': 'Completed'}
-        serializer = ProjectProgressSerializer(project, data=data)
-        if serializer.is_valid():
-            serializer.save()
-    data = {'progress': int(procent)}
-    serializer = ProjectProgressSerializer(project, data=data)
-    if serializer.is_valid():
-        serializer.save()
+FILE_KEYSET = ('name', 'id')
+
+
+def keyset_page(params, dep_id, query):
+    """Completed files page after the cursor, keyed on name and id"""
+    page = keyset_paginate(board_queryset(query), FILE_KEYSET, params)
+    serializer = serializers.FileDepartmentSerializer(
+        page.pop('rows'),
+        many=True,
+        context={'dep_id': int(dep_id)}
+    )
+    page['data'] = serializer.data
+    return page
 
 
 def filter_files(params, user):
@@ -113,7 +134,7 @@ def filter_files(params, user):
             )
         context = {'dep_id': int(dep_id)}
         serializer_file = serializers.FileDepartmentSerializer(
-            query_file,
+            board_queryset(query_file),
             many=True,
             context=context
         )
@@ -128,9 +149,12 @@ def filter_files(params, user):
             queue__department=int(dep_id),
             queue__end=True
         )
-        page_size = params.get('page_size')
-        page_number = params.get('page_number')
-        files = paginate(page_size, page_number, dep_id, query_file)
+        if 'page_number' in params:
+            page_size = params.get('page_size')
+            page_number = params.get('page_number')
+            files = paginate(page_size, page_number, dep_id, query_file)
+        else:
+            files = keyset_page(params, dep_id, query_file)
         data = {
             'department': department,
             'files': files
@@ -161,7 +185,7 @@ def search_files(params):
 
     context = {'dep_id': int(dep_id)}
     serializer_file = serializers.FileDepartmentSerializer(
-        query_file,
+        board_queryset(query_file),
         many=True,
         context=context
     )
@@ -173,119 +197,212 @@ def search_files(params):
     return data
 
 
+QUEUE_RESET = {
+    'permission': False,
+    'start': False,
+    'paused': False,
+    'end': False,
+}
+
+
+def queue_create(file, department):
+    """
+    Make room for a new department.
+    Return its permission and number of done tasks reset for it.
+    """
+    queue = file.queue_snapshot(lock=True)
+    if any(q['department'] == department.id for q in queue):
+        info = {'message': 'Queue with this department exists'}
+        raise ValidationError(info)
+
+    before = [q for q in queue if q['order'] < department.order]
+    after = [q for q in queue if q['order'] > department.order]
+    if not before:
+        QueueLogic.objects.filter(
+            file=file.id,
+            department__order__gt=department.order
+        ).update(permission=False)
+        return True, 0
+    reset = 0
+    if after:
+        QueueLogic.objects.filter(
+            file=file.id,
+            department=after[0]['department']
+        ).update(**QUEUE_RESET)
+        reset = int(after[0]['end'])
+    return before[-1]['end'], reset
+
+
+def queue_destroy(file, dep_id):
+    """Pass permission to the department following the removed one"""
+    queue = file.queue_snapshot(lock=True)
+    deps = [q['department'] for q in queue]
+    index = deps.index(dep_id)
+    if index + 1 < len(deps):
+        QueueLogic.objects.filter(
+            file=file.id,
+            department=deps[index + 1]
+        ).update(permission=True)
+    adjust_project_tasks(
+        file.project_id,
+        total=-1,
+        done=-int(queue[index]['end'])
+    )
+
+
+def queue_update(file, dep_id, end):
+    """
+    Propagate end of the department task along the queue.
+    Return end of the task before the update and number of done tasks
+    reset by the propagation.
+    """
+    queue = file.queue_snapshot(lock=True)
+    deps = [q['department'] for q in queue]
+    index = deps.index(dep_id)
+    previous_end = queue[index]['end']
+    if not queue[index]['permission']:
+        return previous_end, 0
+
+    if end:
+        if index + 1 < len(deps):
+            QueueLogic.objects.filter(
+                file=file.id,
+                department=deps[index + 1]
+            ).update(permission=True)
+        return previous_end, 0
+
+    following = queue[index + 1:]
+    QueueLogic.objects.filter(
+        file=file.id,
+        department__order__gt=queue[index]['order']
+    ).update(**QUEUE_RESET)
+    return previous_end, sum(q['end'] for q in following)
+
+
 def notification_ws(data):
+    """Create task notification for every user and push it"""
     dep = Department.objects.get(id=data['department'])
     file = File.objects.get(id=data['file'])
-    users = User.objects.all()
+    user_ids = User.objects.values_list('id', flat=True)
     content = f'New Task ({file}) appeared in {dep}'
 
-    for user in users:
-        notification = NotificationTask(
-            user=user,
+    notifications = NotificationTask.objects.bulk_create([
+        NotificationTask(
+            user_id=user_id,
             department=dep,
             file=file,
             content=content,
             type='task'
         )
-        notification.save()
-
-        noti_ser = serializers.NotificationTaskSerializer(
-            notification,
-            many=False
-        )
-        message = {
-            'data': noti_ser.data,
-        }
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            f'user_task_noti_{user.id}',
+        for user_id in user_ids
+    ])
+    if not notifications:
+        return
+
+    payload = serializers.NotificationTaskSerializer(notifications[0]).data
+    messages = [
+        (
+            f'user_task_noti_{notification.user_id}',
             {
                 'type': 'task_noti',
+                'message': {
+                    'data': {
+                        **payload,
+                        'id': notification.id,
+                        'user': notification.user_id,
+                    },
+                },
+            }
+        )
+        for notification in notifications
+    ]
+    publish(messages)
+
+
+def file_modify_messages(groups, where, message):
+    return [
+        (
+            group,
+            {
+                'type': f'task_modify_{where}',
                 'message': message,
             }
         )
+        for group in groups
+    ]
+
+
+def project_groups(project_id):
+    return [FILE_PROJECT_BOARD_GROUP, file_project_group(project_id)]
+
 
+def department_groups(queue):
+    return [file_department_group(q['department']) for q in queue]
 
-def task(data, users, where):
-    project_progress(data['project'])
-    project = Project.objects.get(id=data['project'])
+
+def project_progress_data(project_id):
+    project = Project.objects.get(id=project_id)
     serializer = ProjectProgressSerializer(project, many=False)
+    return serializer.data
+
+
+def task(data, groups, where, project_data=None):
+    if project_data is None:
+        project_data = project_progress_data(data['project'])
     message = {
         'file': data,
-        'project': serializer.data,
+        'project': project_data,
         'type': 'task'
     }
-    for user in users:
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            f'user_file_modify_{where}_{user.id}',
-        {
-            'type': f'task_modify_{where}',
-            'message': message,
-            }
-        )
+    messages = file_modify_messages(groups, where, message)
+    publish(messages, key=f'task_{data["id"]}')
 
 
-def comment(comment_id, users, destiny, where):
+def serialize_comment(comment_id):
     comment = CommentFile.objects.get(id=comment_id)
     comment_ser = serializers.CommentFileDisplaySerializer(
         comment,
         many=False
     )
-    comment_data = comment_ser.data
+    return comment_ser.data
+
+
+def comment(comment_data, groups, destiny, where):
     message = {
         'comment': comment_data,
         'type': destiny,
     }
-    for user in users:
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            f'user_file_modify_{where}_{user.id}',
-            {
-                'type': f'task_modify_{where}',
-                'message': message,
-            }
-        )
+    publish(file_modify_messages(groups, where, message))
+
 
-def file_delete(data, users, where):
+def file_delete(data, groups, where):
     message = {
         'file': data,
         'type': 'file_delete'
     }
-    for user in users:
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            f'user_file_modify_{where}_{user.id}',
-            {
-                'type': f'task_modify_{where}',
-                'message': message,
-            }
-        )
+    publish(file_modify_messages(groups, where, message))
 
 
 def update_task_project_ws(data, destiny):
     """Refresh task for file and progress for project in project view"""
-    users = User.objects.all()
-
     if destiny == 'task':
-        task(data, users, 'project')
+        task(data, project_groups(data['project']), 'project')
 
     elif destiny == 'comment_add' or destiny == 'comment_delete':
-        comment(data, users, destiny, 'project')
-        
+        file = File.objects.get(id=data['file']['id'])
+        comment(data, project_groups(file.project_id), destiny, 'project')
+
     elif destiny == 'file_delete':
-        file_delete(data, users, 'project')
+        file_delete(data, project_groups(data['project']), 'project')
 
 
 def update_task_department_ws(data, destiny):
     """Refresh task for file in department view"""
-
-    users = User.objects.all()
-
     if destiny == 'task':
-        query = File.objects.get(id=data['id'])
-        try:
-            dep_id = data['queue'][0]['department']
+        query = board_queryset(File.objects.filter(id=data['id'])).get()
+        project_data = None
+        for queue in data['queue']:
+            dep_id = queue['department']
             context = {'dep_id': dep_id}
             serializer_file = serializers.FileDepartmentSerializer(
                 query,
@@ -293,56 +410,34 @@ def update_task_department_ws(data, destiny):
             )
             file_data = serializer_file.data
             file_data['project'] = serializer_file.data['project']['id']
-            task(file_data, users, 'department')
-        except IndexError:
-            pass       
-    
+            if project_data is None:
+                project_data = project_progress_data(file_data['project'])
+            groups = [file_department_group(dep_id)]
+            task(file_data, groups, 'department', project_data)
+
     elif destiny == 'comment_add' or destiny == 'comment_delete':
-        comment(data, users, destiny, 'department')
-       
-    elif destiny == 'file_delete':
-        file_delete(data, users, 'department')
+        queue = QueueLogic.objects.filter(
+            file=data['file']['id']
+        ).values('department')
+        comment(data, department_groups(queue), destiny, 'department')
 
+    elif destiny == 'file_delete':
+        file_delete(data, department_groups(data['queue']), 'department')
 
-def is_current_date_in_range(start, end):
-    current_date = datetime.now(timezone.utc)
-    return start <= current_date <= end
 
+def file_task_ws(file_id):
+    """Push current task state of the file to project and department views"""
+    if not File.objects.filter(id=file_id).exists():
+        return
+    file_data = get_file_project_data(file_id)
+    update_task_project_ws(file_data, 'task')
+    update_task_department_ws(file_data, 'task')
 
-def check_user_status(user_id):
-    query = QueueLogic.objects.filter(users__in=[user_id], end=False)
-    serializer = serializers.QueueLogicCalendarSerializer(query, many=True)
-    data = serializer.data
-    results = []
-    for obj in data:
-        start_date = datetime.fromisoformat(obj['planned_start_date'])
-        end_date = datetime.fromisoformat(obj['planned_end_date'])
-        results.append(is_current_date_in_range(start_date, end_date))
 
-    user = User.objects.get(id=user_id)
-    if True in results:        
-        user.status = 'Busy'
-        user.save()
-    else:
-        user.status = 'Free'
-        user.save()
-
-def check_all_user_status():
-    users = User.objects.filter(role='Employee')
-    for user in users:
-        query = QueueLogic.objects.filter(users__in=[user.id], end=False)
-        serializer = serializers.QueueLogicCalendarSerializer(query, many=True)
-        data = serializer.data
-        results = []
-        for obj in data:
-            start_date = datetime.fromisoformat(obj['planned_start_date'])
-            end_date = datetime.fromisoformat(obj['planned_end_date'])
-            results.append(is_current_date_in_range(start_date, end_date))
-
-        #user = User.objects.get(id=user_id)
-        if True in results:        
-            user.status = 'Busy'
-            user.save()
-        else:
-            user.status = 'Free'
-            user.save()
+def queue_removed_ws(file_id, dep_id):
+    """Drop the file from the board of the department removed from queue"""
+    if not File.objects.filter(id=file_id).exists():
+        return
+    file_data = get_file_project_data(file_id)
+    file_data['queue'] = [{'department': dep_id}]
+    update_task_department_ws(file_data, 'file_delete')
@@ -0,0 +1,31 @@
+"""
+Background jobs for the file app
+"""
+from core.jobs import job
+from file import file_utils
+from project.project_utils import recount_project_tasks
+
+
+@job('file.project_progress')
+def project_progress(project_id):
+    recount_project_tasks([project_id])
+
+
+@job('file.update_task_project_ws')
+def update_task_project_ws(data, destiny):
+    file_utils.update_task_project_ws(data, destiny)
+
+
+@job('file.update_task_department_ws')
+def update_task_department_ws(data, destiny):
+    file_utils.update_task_department_ws(data, destiny)
+
+
+@job('file.task_ws')
+def file_task_ws(file_id):
+    file_utils.file_task_ws(file_id)
+
+
+@job('file.queue_removed_ws')
+def queue_removed_ws(file_id, dep_id):
+    file_utils.queue_removed_ws(file_id, dep_id)
@@ -1,6 +1,8 @@
 """
 Serializers for files APIs
 """
+import os
+
 from rest_framework import serializers
 
 from core.models import (
@@ -8,8 +10,10 @@ from core.models import (
     Project,
     CommentFile,
     QueueLogic,
-    NotificationTask
+    NotificationTask,
+    UploadSession
 )
+from file.upload_utils import ingest_files
 from user.serializers import UserNestedSerializer
 from department.serializers import DepartmentSerializer
 
@@ -26,6 +30,23 @@ def validate_file_extension(file_extension):
         return False
 
 
+def destiny_file_name(name, destiny):
+    """Secretariat files are stored with the _s suffix"""
+    if destiny != 'Secretariat':
+        return name
+    file_new_list = name.split('.')
+    file_new_list[-2] = f"{file_new_list[-2]}_s"
+    return '.'.join(file_new_list)
+
+
+def validate_upload_name(value):
+    if '.' not in value or os.path.basename(value) != value:
+        raise serializers.ValidationError('Wrong file name')
+    if not validate_file_extension(value.lower().split('.')[-1]):
+        raise serializers.ValidationError('Wrong file format')
+    return value
+
+
 class FilesUploadSerializer(serializers.ModelSerializer):
     """Serializer for upload file"""
     file = serializers.ListField(
@@ -43,35 +64,65 @@ class FilesUploadSerializer(serializers.ModelSerializer):
             'name': {'required': False},
         }
 
+    def validate_file(self, value):
+        """Check every extension before anything is stored"""
+        for file in value:
+            file_extension = str(file).lower().split('.')[-1]
+            if not validate_file_extension(file_extension):
+                raise serializers.ValidationError('Wrong file format')
+        return value
+
     def create(self, validated_data):
-        project = validated_data['project']
-        user = validated_data['user']
         destiny = validated_data['destiny']
-        file = validated_data.pop('file')
-        file_list = []
-        for file in file:
-            file_name_str = str(file).lower()
-            file_split = file_name_str.split('.')
-            file_extension = file_split[-1]
-            if validate_file_extension(file_extension):
-                if destiny == 'Secretariat':
-                    file_new_list = file.name.split('.')
-                    file_new_list[-2] = f"{file_new_list[-2]}_s"
-                    file.name = '.'.join(file_new_list)
-                    file_obj = File.objects.create(
-                        file=file, project=project, user=user,
-                        destiny=destiny, name=file.name
-                    )
-                elif destiny == 'Production':
-                    file_obj = File.objects.create(
-                        file=file, project=project, user=user,
-                        destiny=destiny, name=file.name
-                    )
-                fileurl = f'{file_obj.name}'
-                file_list.append(fileurl)
-            else:
-                raise serializers.ValidationError('Wrong file format')
-        return file_list
+        uploads = validated_data.pop('file')
+        files, self.timings = ingest_files(
+            uploads,
+            [destiny_file_name(file.name, destiny) for file in uploads],
+            project=validated_data['project'],
+            user=validated_data['user'],
+            destiny=destiny
+        )
+        return [file.name for file in files]
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """Serializer for chunked upload session"""
+
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'project', 'destiny', 'name',
+            'size', 'checksum', 'offset', 'status'
+        ]
+        read_only_fields = ['id', 'offset', 'status']
+
+    def validate_name(self, value):
+        return validate_upload_name(value)
+
+    def validate_size(self, value):
+        if value < 1:
+            raise serializers.ValidationError('File can not be empty')
+        return value
+
+    def create(self, validated_data):
+        validated_data['name'] = destiny_file_name(
+            validated_data['name'],
+            validated_data['destiny']
+        )
+        return super().create(validated_data)
+
+
+class BlobAttachSerializer(serializers.Serializer):
+    """Serializer for file created from an already stored blob"""
+    project = serializers.PrimaryKeyRelatedField(
+        queryset=Project.objects.all()
+    )
+    destiny = serializers.ChoiceField(choices=File.Destiny.choices)
+    name = serializers.CharField(max_length=255)
+    sha256 = serializers.RegexField(r'^[0-9a-f]{64}$')
+
+    def validate_name(self, value):
+        return validate_upload_name(value)
 
 
 class FileManageSerializer(serializers.ModelSerializer):
@@ -80,7 +131,8 @@ class FileManageSerializer(serializers.ModelSerializer):
     class Meta:
         model = File
         fields = ['id', 'name', 'file', 'destiny', 'queue']
-        read_only_fields = ['id']
+        # content is replaced by uploads, which keep blob references
+        read_only_fields = ['id', 'file']
 
 
 class CommentFileDisplaySerializer(serializers.ModelSerializer):
@@ -218,27 +270,23 @@ class FileDepartmentSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
     def to_representation(self, instance):
-        response = super().to_representation(instance)        
+        """
+        Keep queue entry of the context department with its neighbours.
+        Queue must come ordered by department order (see board_queryset).
+        """
+        response = super().to_representation(instance)
         dep_id = self.context.get('dep_id')
-        departments = [q['department'] for q in response['queue']]
-        dep_index = departments.index(dep_id)
-
-        filtered_queue = [
-            {
-                **queue_data,
-                'next_task': next((q for q in response['queue'] if q['department'] > queue_data['department']), 'lack'),
-                'prev_task': next((q for q in response['queue'] if q['department'] < queue_data['department']), 'lack')
-            }
-            for queue_data in response['queue']
-            if queue_data['department'] == dep_id
-        ]
-
-        if filtered_queue:
-            dep_index = departments.index(dep_id)
-            if dep_index > 0:
-                filtered_queue[0]['prev_task'] = next((q for q in response['queue'] if q['department'] == departments[dep_index - 1]), 'lack')
-            if dep_index < len(departments) - 1:
-                filtered_queue[0]['next_task'] = next((q for q in response['queue'] if q['department'] == departments[dep_index + 1]), 'lack')
+        queue = response['queue']
+        filtered_queue = []
+        for index, queue_data in enumerate(queue):
+            if queue_data['department'] == dep_id:
+                last = index == len(queue) - 1
+                filtered_queue.append({
+                    **queue_data,
+                    'next_task': 'lack' if last else queue[index + 1],
+                    'prev_task': queue[index - 1] if index else 'lack',
+                })
+                break
 
         response['queue'] = filtered_queue
         return response
@@ -0,0 +1,202 @@
+"""
+Test for content addressed file storage
+"""
+import hashlib
+import os
+from datetime import timedelta
+from io import StringIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Blob, File
+from core.tests.helpers import (
+    TempMediaMixin,
+    create_admin_user,
+    create_client,
+    create_project
+)
+from file.blob_utils import collect_blobs, recount_blobs
+
+
+FILE_URL = reverse('file:admin-list')
+ATTACH_URL = reverse('file:admin-blob-attach')
+
+
+def exists_url(sha256):
+    return reverse('file:admin-blob-exists', args=[sha256])
+
+
+def file_url(file_id):
+    return reverse('file:admin-detail', args=[file_id])
+
+
+def download_url(file_id):
+    return reverse('file:auth-file-download', args=[file_id])
+
+
+def project_url(project_id):
+    return reverse('project:admin-detail', args=[project_id])
+
+
+class BlobStorageApiTests(TempMediaMixin, TestCase):
+    """Test uploads share stored content"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_admin_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        client_obj = create_client()
+        self.projects = [
+            create_project(self.user, client_obj, number=f'Project {i}')
+            for i in range(2)
+        ]
+        self.content = b'solid drawing' * 1000
+        self.sha256 = hashlib.sha256(self.content).hexdigest()
+
+    def upload(self, project, name='drawing.step'):
+        payload = {
+            'file': [SimpleUploadedFile(name, self.content)],
+            'project': project.id,
+            'user': self.user.id,
+            'destiny': 'Production',
+        }
+        res = self.client.post(FILE_URL, payload, format='multipart')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def attach(self, project, sha256=None):
+        return self.client.post(
+            ATTACH_URL,
+            {
+                'project': project.id,
+                'destiny': 'Production',
+                'name': 'drawing.step',
+                'sha256': sha256 or self.sha256,
+            },
+            format='json'
+        )
+
+    def blob_path(self):
+        return os.path.join(self.media_root, Blob.objects.get().name)
+
+    def test_same_content_stored_once(self):
+        """Test uploading same bytes to two projects stores one blob"""
+        self.upload(self.projects[0])
+        self.upload(self.projects[1], name='copy.step')
+
+        blob = Blob.objects.get()
+        self.assertEqual(blob.sha256, self.sha256)
+        self.assertEqual(blob.refcount, 2)
+        self.assertEqual(blob.size, len(self.content))
+        self.assertEqual(
+            set(File.objects.values_list('file', flat=True)),
+            {blob.name}
+        )
+        with open(self.blob_path(), 'rb') as stored:
+            self.assertEqual(stored.read(), self.content)
+
+    def test_exists_and_attach(self):
+        """Test known hash is attached without uploading the bytes"""
+        missing = self.client.get(exists_url(self.sha256))
+        self.upload(self.projects[0])
+        found = self.client.get(exists_url(self.sha256))
+
+        res = self.attach(self.projects[1])
+
+        self.assertFalse(missing.data['exists'])
+        self.assertTrue(found.data['exists'])
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        file = File.objects.get(id=res.data['id'])
+        self.assertEqual(file.project, self.projects[1])
+        self.assertEqual(file.blob.refcount, 2)
+
+    def test_attach_unknown_hash(self):
+        """Test attaching hash which is not stored fails"""
+        res = self.attach(self.projects[0], sha256='0' * 64)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(File.objects.exists())
+
+    def test_delete_releases_blob(self):
+        """Test content is kept until its last file is gone and collected"""
+        self.upload(self.projects[0])
+        self.upload(self.projects[1])
+        files = list(File.objects.all())
+
+        self.client.delete(file_url(files[0].id))
+        collect_blobs(grace=timedelta(0))
+
+        self.assertEqual(Blob.objects.get().refcount, 1)
+        self.assertTrue(os.path.exists(self.blob_path()))
+
+        path = self.blob_path()
+        self.client.delete(project_url(self.projects[1].id))
+        collected = collect_blobs(grace=timedelta(0))
+
+        self.assertEqual(collected, 1)
+        self.assertFalse(Blob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_download_name(self):
+        """Test blob content is downloaded under the uploaded name"""
+        self.upload(self.projects[0], name='Front panel.step')
+        file = File.objects.get()
+
+        res = self.client.get(download_url(file.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res['Content-Disposition'],
+            'attachment; filename="Front panel.step"'
+        )
+        self.assertEqual(b''.join(res.streaming_content), self.content)
+
+    def test_update_keeps_blob(self):
+        """Test file content can not be swapped past the blob store"""
+        self.upload(self.projects[0])
+        file = File.objects.get()
+
+        res = self.client.patch(
+            file_url(file.id),
+            {'file': SimpleUploadedFile('other.pdf', b'other')},
+            format='multipart'
+        )
+
+        file.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(file.file.name, file.blob.name)
+        self.assertEqual(file.blob.refcount, 1)
+        self.assertEqual(os.listdir(self.media_root), ['blobs'])
+
+    def test_grace_period(self):
+        """Test fresh unreferenced blob is not collected"""
+        self.upload(self.projects[0])
+        Blob.objects.update(refcount=0)
+        File.objects.all().delete()
+
+        self.assertEqual(collect_blobs(), 0)
+        self.assertEqual(collect_blobs(grace=timedelta(0)), 1)
+
+    def test_recount_and_command(self):
+        """Test referenced blob survives wrong refcount and is recounted"""
+        self.upload(self.projects[0])
+        Blob.objects.update(refcount=0)
+
+        self.assertEqual(collect_blobs(grace=timedelta(0)), 0)
+        self.assertEqual(recount_blobs(), 1)
+        self.assertEqual(Blob.objects.get().refcount, 1)
+
+        File.objects.all().delete()
+        call_command(
+            'collect_blobs',
+            '--recount',
+            '--grace', '0',
+            stdout=StringIO()
+        )
+
+        self.assertFalse(Blob.objects.exists())
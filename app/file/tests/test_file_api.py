@@ -0,0 +1,269 @@
+"""
+Test for file APIs
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Client,
+    CommentFile,
+    Department,
+    File,
+    Project,
+    QueueLogic,
+)
+from file.file_utils import board_queryset
+from file.serializers import FileDepartmentSerializer
+
+
+QUEUE_STEPS = 25
+BOARD_FILES = 40
+BOARD_SERIALIZE_BUDGET = 2.0
+DEPARTMENT_FILES = 200
+DEPARTMENT_QUERY_BUDGET = 8
+
+FILE_DEPARTMENT_URL = reverse('file:auth-file-department')
+
+
+class FileDepartmentSerializerTests(TestCase):
+    """Test queue neighbours in department file board"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='admin',
+            email='admin@example.com',
+            password='testpass123',
+            role='Admin',
+            first_name='Test',
+            last_name='Admin'
+        )
+        self.project = Project.objects.create(
+            manager=self.user,
+            client=Client.objects.create(name='Test client'),
+            start='2023-08-15',
+            deadline='2023-10-15',
+            priority='Normal',
+            number='Test number project'
+        )
+        # ids run against the order, neighbours must follow order
+        self.deps = [
+            Department.objects.create(name=f'Dep {order}', order=order)
+            for order in range(QUEUE_STEPS, 0, -1)
+        ][::-1]
+
+    def create_file(self, name='Test file'):
+        file = File.objects.create(
+            user=self.user,
+            project=self.project,
+            name=name,
+            destiny='Production',
+            file='uploads/projects/test.pdf'
+        )
+        QueueLogic.objects.bulk_create([
+            QueueLogic(
+                file=file,
+                project=self.project,
+                department=department,
+                planned_start_date='2023-08-15T08:00:00Z',
+                planned_end_date='2023-08-16T08:00:00Z'
+            )
+            for department in self.deps
+        ])
+        return file
+
+    def serialize(self, files, department):
+        return FileDepartmentSerializer(
+            board_queryset(File.objects.filter(id__in=files)),
+            many=True,
+            context={'dep_id': department.id}
+        ).data
+
+    def test_neighbours_follow_department_order(self):
+        """Test prev and next task are queue neighbours by order"""
+        file = self.create_file()
+
+        data = self.serialize([file.id], self.deps[5])
+
+        queue = data[0]['queue']
+        self.assertEqual(len(queue), 1)
+        self.assertEqual(queue[0]['department'], self.deps[5].id)
+        self.assertEqual(queue[0]['prev_task']['department'], self.deps[4].id)
+        self.assertEqual(queue[0]['next_task']['department'], self.deps[6].id)
+
+    def test_queue_ends_lack_neighbours(self):
+        """Test first and last department have no prev and next task"""
+        file = self.create_file()
+
+        first = self.serialize([file.id], self.deps[0])[0]['queue'][0]
+        last = self.serialize([file.id], self.deps[-1])[0]['queue'][0]
+
+        self.assertEqual(first['prev_task'], 'lack')
+        self.assertEqual(first['next_task']['department'], self.deps[1].id)
+        self.assertEqual(last['next_task'], 'lack')
+        self.assertEqual(last['prev_task']['department'], self.deps[-2].id)
+
+    def test_board_with_long_queues(self):
+        """Test board of files with 20+ queue steps serializes in budget"""
+        files = [
+            self.create_file(f'File {i}').id for i in range(BOARD_FILES)
+        ]
+
+        start = time.perf_counter()
+        data = self.serialize(files, self.deps[QUEUE_STEPS // 2])
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(len(data), BOARD_FILES)
+        self.assertTrue(all(len(item['queue']) == 1 for item in data))
+        self.assertLess(elapsed, BOARD_SERIALIZE_BUDGET)
+
+
+class FileDepartmentApiTests(TestCase):
+    """Test department file board query plan"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='employee',
+            email='employee@example.com',
+            password='testpass123',
+            role='Employee',
+            first_name='Test',
+            last_name='Employee'
+        )
+        self.other = get_user_model().objects.create_user(
+            username='other',
+            email='other@example.com',
+            password='testpass123',
+            role='Employee',
+            first_name='Other',
+            last_name='Employee'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.deps = [
+            Department.objects.create(name=f'Dep {order}', order=order)
+            for order in range(1, 4)
+        ]
+        self.project = Project.objects.create(
+            manager=self.user,
+            client=Client.objects.create(name='Test client'),
+            start='2023-08-15',
+            deadline='2023-10-15',
+            priority='Normal',
+            number='Test number project'
+        )
+
+    def create_files(self, count):
+        files = File.objects.bulk_create([
+            File(
+                user=self.user,
+                project=self.project,
+                name=f'File {len(self.deps)}-{i}',
+                destiny='Production',
+                file='uploads/projects/test.pdf'
+            )
+            for i in range(count)
+        ])
+        queue = QueueLogic.objects.bulk_create([
+            QueueLogic(
+                file=file,
+                project=self.project,
+                department=department,
+                planned_start_date='2023-08-15T08:00:00Z',
+                planned_end_date='2023-08-16T08:00:00Z'
+            )
+            for file in files
+            for department in self.deps
+        ])
+        QueueLogic.users.through.objects.bulk_create([
+            QueueLogic.users.through(queuelogic_id=task.id, user_id=user.id)
+            for task in queue
+            for user in (self.user, self.other)
+        ])
+        CommentFile.objects.bulk_create([
+            CommentFile(user=user, file=file, text='Test comment')
+            for file in files
+            for user in (self.user, self.other)
+        ])
+        return files
+
+    def get_board(self):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(
+                FILE_DEPARTMENT_URL,
+                {'dep_id': self.deps[1].id, 'status': 'Active'}
+            )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data['files'], len(ctx.captured_queries)
+
+    def test_board_query_count(self):
+        """Test board of 200 files loads in a constant number of queries"""
+        self.create_files(10)
+        _, small_count = self.get_board()
+        self.create_files(DEPARTMENT_FILES - 10)
+
+        files, count = self.get_board()
+
+        self.assertEqual(len(files), DEPARTMENT_FILES)
+        self.assertEqual(count, small_count)
+        self.assertLessEqual(count, DEPARTMENT_QUERY_BUDGET)
+
+    def test_board_without_duplicates(self):
+        """Test file with several matching queue rows is listed once"""
+        files = self.create_files(3)
+        task = QueueLogic.objects.create(
+            file=files[0],
+            project=self.project,
+            department=self.deps[1],
+            planned_start_date='2023-08-15T08:00:00Z',
+            planned_end_date='2023-08-16T08:00:00Z'
+        )
+        task.users.add(self.user)
+
+        files, _ = self.get_board()
+
+        ids = [file['id'] for file in files]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(len(ids), 3)
+        self.assertEqual(len(files[0]['comments']), 2)
+        self.assertEqual(
+            files[0]['comments'][0]['user']['name'],
+            'T. Employee'
+        )
+        self.assertEqual(files[0]['project']['manager'], 'T. Employee')
+
+    def test_completed_cursor_pages(self):
+        """Test completed files are paged by cursor on name and id"""
+        files = self.create_files(12)
+        File.objects.filter(id__in=[f.id for f in files[:4]]).update(
+            name='Same name'
+        )
+        QueueLogic.objects.filter(department=self.deps[1]).update(end=True)
+
+        ids = []
+        counts = []
+        params = {
+            'dep_id': self.deps[1].id,
+            'status': 'Completed',
+            'page_size': 5
+        }
+        while True:
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.get(FILE_DEPARTMENT_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            page = res.data['files']
+            ids += [file['id'] for file in page['data']]
+            counts.append(len(ctx.captured_queries))
+            if page['next'] is None:
+                break
+            params['cursor'] = page['next']
+
+        expected = File.objects.order_by('name', 'id')
+        self.assertEqual(ids, list(expected.values_list('id', flat=True)))
+        self.assertEqual(len(set(counts)), 1)
@@ -0,0 +1,127 @@
+"""
+Test file websocket topic groups
+"""
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.test import TransactionTestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from core.models import Department, OutboxEvent
+from core.ws_auth import TokenAuthMiddleware
+from core.ws_utils import file_department_group, relay_outbox
+from file.consumer import FileDepartmentConsumer
+from file.file_utils import file_delete, department_groups
+
+
+def create_user(**params):
+    """Create and return a new user"""
+    return get_user_model().objects.create_user(**params)
+
+
+@override_settings(CHANNEL_LAYERS={
+    'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}
+})
+class FileTopicGroupTests(TransactionTestCase):
+    """Test file events go to shared topic groups"""
+
+    def setUp(self):
+        self.dep_a = Department.objects.create(name='Dep A', order=1)
+        self.dep_b = Department.objects.create(name='Dep B', order=2)
+        self.employee = create_user(
+            username='employee',
+            email='employee@example.com',
+            password='testpass123',
+            role='Employee',
+            departments=[self.dep_a]
+        )
+        self.admin = create_user(
+            username='admin',
+            email='admin@example.com',
+            password='testpass123',
+            role='Admin'
+        )
+
+    async def subscribed_groups(self, user, query=''):
+        token = await Token.objects.acreate(user=user)
+        communicator = WebsocketCommunicator(
+            TokenAuthMiddleware(FileDepartmentConsumer.as_asgi()),
+            f'/ws/file-department/?token={token.key}{query}'
+        )
+        connected, _ = await communicator.connect()
+        groups = set()
+        if connected:
+            channel_layer = get_channel_layer()
+            groups = {
+                group for group, channels in channel_layer.groups.items()
+                if channels
+            }
+        await communicator.disconnect()
+        return connected, groups
+
+    def test_employee_subscribes_to_own_departments(self):
+        """Test employee joins only groups of his departments"""
+        connected, groups = async_to_sync(self.subscribed_groups)(
+            self.employee
+        )
+
+        self.assertTrue(connected)
+        self.assertEqual(groups, {file_department_group(self.dep_a.id)})
+
+    def test_employee_other_department_rejected(self):
+        """Test subscribing to foreign department is refused"""
+        connected, groups = async_to_sync(self.subscribed_groups)(
+            self.employee,
+            f'&dep_id={self.dep_b.id}'
+        )
+
+        self.assertFalse(connected)
+        self.assertEqual(groups, set())
+
+    def test_admin_subscribes_to_all_departments(self):
+        """Test staff user joins every department group"""
+        connected, groups = async_to_sync(self.subscribed_groups)(self.admin)
+
+        self.assertTrue(connected)
+        self.assertEqual(groups, {
+            file_department_group(self.dep_a.id),
+            file_department_group(self.dep_b.id),
+        })
+
+    def test_disconnect_leaves_groups(self):
+        """Test groups are discarded on disconnect"""
+        async_to_sync(self.subscribed_groups)(self.employee)
+
+        channel_layer = get_channel_layer()
+        self.assertFalse(any(channel_layer.groups.values()))
+
+    def test_event_sent_once_per_group(self):
+        """Test one event per department regardless of user count"""
+        get_user_model().objects.bulk_create([
+            get_user_model()(
+                username=f'user{i}',
+                email=f'user{i}@example.com',
+                role='Employee'
+            )
+            for i in range(50)
+        ])
+        channel_layer = get_channel_layer()
+        channel = async_to_sync(channel_layer.new_channel)()
+        async_to_sync(channel_layer.group_add)(
+            file_department_group(self.dep_a.id),
+            channel
+        )
+        queue = [
+            {'department': self.dep_a.id},
+            {'department': self.dep_b.id}
+        ]
+
+        file_delete({'id': 1, 'queue': queue}, department_groups(queue),
+                    'department')
+
+        self.assertEqual(OutboxEvent.objects.count(), 2)
+        self.assertEqual(relay_outbox(), 2)
+        event = async_to_sync(channel_layer.receive)(channel)
+        self.assertEqual(event['type'], 'task_modify_department')
+        self.assertEqual(event['message']['file']['id'], 1)
@@ -0,0 +1,304 @@
+"""
+Test for queue logic APIs
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Client,
+    Department,
+    File,
+    Job,
+    Project,
+    QueueLogic,
+)
+from file.file_utils import queue_update
+from project.project_utils import recount_project_tasks
+
+
+QUEUE_LOGIC_URL = reverse('file:queue-logic-list')
+QUEUE_UPDATE_QUERY_BUDGET = 16
+
+
+def detail_url(queue_id):
+    return reverse('file:queue-logic-detail', args=[queue_id])
+
+
+def create_file(user, departments=()):
+    """Create and return file with queue for departments"""
+    project = Project.objects.create(
+        manager=user,
+        client=Client.objects.get_or_create(name='Test client')[0],
+        start='2023-08-15',
+        deadline='2023-10-15',
+        priority='Normal',
+        number='Test number project'
+    )
+    file = File.objects.create(
+        user=user,
+        project=project,
+        name='Test file',
+        destiny='Production',
+        file='uploads/projects/test.pdf'
+    )
+    for index, department in enumerate(departments):
+        QueueLogic.objects.create(
+            file=file,
+            project=project,
+            department=department,
+            planned_start_date='2023-08-15T08:00:00Z',
+            planned_end_date='2023-08-16T08:00:00Z',
+            permission=index == 0
+        )
+    recount_project_tasks([project.id])
+    return file
+
+
+class QueueLogicApiTests(TestCase):
+    """Test queue state propagation"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='admin',
+            email='admin@example.com',
+            password='testpass123',
+            role='Admin',
+            first_name='Test',
+            last_name='Admin'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.deps = [
+            Department.objects.create(name=f'Dep {order}', order=order)
+            for order in range(1, 4)
+        ]
+
+    def queue(self, file):
+        return list(
+            QueueLogic.objects.filter(file=file)
+            .order_by('department__order')
+            .values_list('department__order', 'permission', 'end')
+        )
+
+    def test_create_first_department(self):
+        """Test department placed first takes the permission"""
+        file = create_file(self.user, self.deps[1:])
+        payload = {
+            'file': file.id,
+            'project': file.project.id,
+            'department': self.deps[0].id,
+            'users': [self.user.id],
+            'planned_start_date': '2023-08-15T08:00:00Z',
+            'planned_end_date': '2023-08-16T08:00:00Z',
+        }
+
+        res = self.client.post(QUEUE_LOGIC_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            self.queue(file),
+            [(1, True, False), (2, False, False), (3, False, False)]
+        )
+
+    def test_create_existing_department_conflict(self):
+        """Test department can not be queued twice"""
+        file = create_file(self.user, self.deps)
+        payload = {
+            'file': file.id,
+            'project': file.project.id,
+            'department': self.deps[1].id,
+            'users': [self.user.id],
+            'planned_start_date': '2023-08-15T08:00:00Z',
+            'planned_end_date': '2023-08-16T08:00:00Z',
+        }
+
+        res = self.client.post(QUEUE_LOGIC_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+    def test_update_end_passes_permission(self):
+        """Test ending a task opens the next department"""
+        file = create_file(self.user, self.deps)
+        first = QueueLogic.objects.get(file=file, department=self.deps[0])
+
+        res = self.client.patch(
+            detail_url(first.id),
+            {'end': True},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self.queue(file),
+            [(1, True, True), (2, True, False), (3, False, False)]
+        )
+
+    def test_update_reopen_resets_following(self):
+        """Test reopening a task resets every following department"""
+        file = create_file(self.user, self.deps)
+        QueueLogic.objects.filter(file=file).update(
+            permission=True,
+            end=True
+        )
+        recount_project_tasks([file.project_id])
+        first = QueueLogic.objects.get(file=file, department=self.deps[0])
+
+        res = self.client.patch(
+            detail_url(first.id),
+            {'end': False},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self.queue(file),
+            [(1, True, False), (2, False, False), (3, False, False)]
+        )
+
+    def test_destroy_passes_permission(self):
+        """Test removing first department opens the next one"""
+        file = create_file(self.user, self.deps)
+        first = QueueLogic.objects.get(file=file, department=self.deps[0])
+
+        res = self.client.delete(detail_url(first.id))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(
+            self.queue(file),
+            [(2, True, False), (3, False, False)]
+        )
+
+    def test_update_constant_queries(self):
+        """Test queue propagation query count does not grow with queue"""
+        self.deps += [
+            Department.objects.create(name=f'Dep {order}', order=order)
+            for order in range(4, 16)
+        ]
+        short_file = create_file(self.user, self.deps[:3])
+        long_file = create_file(self.user, self.deps)
+
+        counts = []
+        for file in (short_file, long_file):
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as ctx:
+                    queue_update(file, self.deps[0].id, False)
+            counts.append(len(ctx.captured_queries))
+
+        self.assertEqual(counts[0], counts[1])
+        self.assertLessEqual(counts[1], 2)
+
+    def test_queue_snapshot(self):
+        """Test snapshot lists queue in department order in one query"""
+        file = create_file(self.user, reversed(self.deps))
+
+        with CaptureQueriesContext(connection) as ctx:
+            snapshot = file.queue_snapshot()
+
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(
+            [q['department'] for q in snapshot],
+            [dep.id for dep in self.deps]
+        )
+        self.assertEqual(
+            set(snapshot[0]),
+            {'department', 'order', 'permission', 'start', 'paused', 'end'}
+        )
+
+    def test_update_query_count(self):
+        """Test queue update request stays within query budget"""
+        self.deps += [
+            Department.objects.create(name=f'Dep {order}', order=order)
+            for order in range(4, 16)
+        ]
+        counts = []
+        for departments in (self.deps[:3], self.deps):
+            file = create_file(self.user, departments)
+            first = QueueLogic.objects.get(file=file, department=self.deps[0])
+            Job.objects.all().delete()
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.patch(
+                    detail_url(first.id),
+                    {'end': True},
+                    format='json'
+                )
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            counts.append(len(ctx.captured_queries))
+
+        self.assertEqual(counts[0], counts[1])
+        self.assertLessEqual(counts[1], QUEUE_UPDATE_QUERY_BUDGET)
+
+    def project_counters(self, file):
+        project = Project.objects.get(id=file.project_id)
+        return (
+            project.total_tasks,
+            project.done_tasks,
+            project.progress,
+            project.status
+        )
+
+    def test_create_before_ended_task_counters(self):
+        """Test task reset by an inserted department is not counted done"""
+        file = create_file(self.user, [self.deps[0], self.deps[2]])
+        QueueLogic.objects.filter(file=file).update(
+            permission=True,
+            end=True
+        )
+        recount_project_tasks([file.project_id])
+        payload = {
+            'file': file.id,
+            'project': file.project.id,
+            'department': self.deps[1].id,
+            'users': [self.user.id],
+            'planned_start_date': '2023-08-15T08:00:00Z',
+            'planned_end_date': '2023-08-16T08:00:00Z',
+        }
+
+        res = self.client.post(QUEUE_LOGIC_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.project_counters(file), (3, 1, 33, 'Started'))
+        recount_project_tasks([file.project_id])
+        self.assertEqual(self.project_counters(file), (3, 1, 33, 'Started'))
+
+    def test_counters_follow_queue(self):
+        """Test project counters follow create, end, reopen and delete"""
+        file = create_file(self.user, self.deps[1:])
+        payload = {
+            'file': file.id,
+            'project': file.project.id,
+            'department': self.deps[0].id,
+            'users': [self.user.id],
+            'planned_start_date': '2023-08-15T08:00:00Z',
+            'planned_end_date': '2023-08-16T08:00:00Z',
+        }
+        res = self.client.post(QUEUE_LOGIC_URL, payload)
+        first = QueueLogic.objects.get(id=res.data['id'])
+
+        self.assertEqual(self.project_counters(file), (3, 0, 0, 'Started'))
+
+        for department in self.deps:
+            task = QueueLogic.objects.get(file=file, department=department)
+            self.client.patch(
+                detail_url(task.id),
+                {'end': True},
+                format='json'
+            )
+        self.assertEqual(
+            self.project_counters(file),
+            (3, 3, 100, 'Completed')
+        )
+
+        self.client.patch(
+            detail_url(first.id),
+            {'end': False},
+            format='json'
+        )
+        self.assertEqual(self.project_counters(file), (3, 0, 0, 'Started'))
+
+        self.client.delete(detail_url(first.id))
+        self.assertEqual(self.project_counters(file), (2, 0, 0, 'Started'))
@@ -0,0 +1,180 @@
+"""
+Test deferred removal of deleted storage
+"""
+import os
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.models import File, Project, Tombstone, UploadSession
+from core.tests.helpers import (
+    TempMediaMixin,
+    create_admin_user,
+    create_client,
+    create_project
+)
+from file.tombstone_utils import bury, reap_tombstones, remove_storage
+
+
+def file_url(file_id):
+    return reverse('file:admin-detail', args=[file_id])
+
+
+def project_url(project_id):
+    return reverse('project:admin-detail', args=[project_id])
+
+
+class TombstoneReaperTests(TempMediaMixin, TestCase):
+    """Test deletes are tombstoned and reaped in the background"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_admin_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.project = create_project(self.user, create_client())
+        self.project_dir = os.path.join(
+            self.media_root, 'uploads', 'projects', str(self.project.id)
+        )
+
+    def create_file(self, name='drawing.pdf'):
+        return File.objects.create(
+            user=self.user,
+            project=self.project,
+            destiny='Production',
+            name=name,
+            file=SimpleUploadedFile(name, b'drawing')
+        )
+
+    def test_delete_file_is_reaped(self):
+        """Test file is kept on disk until the reaper runs"""
+        file = self.create_file()
+        path = file.file.path
+
+        self.client.delete(file_url(file.id))
+
+        self.assertFalse(File.objects.exists())
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(Tombstone.objects.get().name, file.file.name)
+
+        metrics = reap_tombstones()
+
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(Tombstone.objects.exists())
+        self.assertEqual(metrics['reaped'], 1)
+        self.assertEqual(metrics['files'], 1)
+        self.assertEqual(metrics['bytes'], len(b'drawing'))
+        self.assertEqual(metrics['pending'], 0)
+
+    def test_delete_project_reaped_in_batches(self):
+        """Test project directory is emptied a few files at a time"""
+        for i in range(5):
+            self.create_file(f'drawing {i}.pdf')
+
+        self.client.delete(project_url(self.project.id))
+
+        self.assertFalse(Project.objects.exists())
+        self.assertEqual(len(os.listdir(self.project_dir)), 5)
+
+        metrics = reap_tombstones(limit=2)
+
+        self.assertFalse(os.path.exists(self.project_dir))
+        self.assertFalse(Tombstone.objects.exists())
+        self.assertEqual(metrics['reaped'], 1)
+        self.assertEqual(metrics['files'], 5)
+
+    def test_remove_storage_limit(self):
+        """Test directory is removed once its last file is gone"""
+        for i in range(3):
+            self.create_file(f'drawing {i}.pdf')
+
+        self.assertEqual(remove_storage(self.project_dir, 2)[::2], (2, False))
+        self.assertEqual(remove_storage(self.project_dir, 2)[::2], (1, True))
+        self.assertEqual(remove_storage(self.project_dir, 2), (0, 0, True))
+
+    def test_failed_removal_retried(self):
+        """Test failing removal is retried later and gives up at the end"""
+        file = self.create_file()
+        bury(file.file.name)
+
+        with patch(
+            'file.tombstone_utils.os.remove',
+            side_effect=PermissionError('denied')
+        ), self.assertLogs('file.tombstone_utils', level='WARNING'):
+            metrics = reap_tombstones()
+
+        tombstone = Tombstone.objects.get()
+        self.assertEqual(metrics['retried'], 1)
+        self.assertEqual(metrics['pending'], 1)
+        self.assertEqual(tombstone.attempts, 1)
+        self.assertIn('denied', tombstone.last_error)
+        self.assertGreater(tombstone.run_after, timezone.now())
+        self.assertTrue(os.path.exists(file.file.path))
+
+        Tombstone.objects.update(run_after=timezone.now(), max_attempts=2)
+        with patch(
+            'file.tombstone_utils.os.remove',
+            side_effect=PermissionError('denied')
+        ), self.assertLogs('file.tombstone_utils', level='WARNING'):
+            metrics = reap_tombstones()
+
+        self.assertEqual(metrics['failed'], 1)
+        self.assertEqual(Tombstone.objects.get().status, 'Failed')
+
+    def test_abandoned_upload_expired(self):
+        """Test stale open upload session and its part file are removed"""
+        sessions = [
+            UploadSession.objects.create(
+                user=self.user,
+                project=self.project,
+                destiny='Production',
+                name='drawing.step',
+                size=100,
+                offset=10
+            )
+            for _ in range(2)
+        ]
+        for session in sessions:
+            default_storage.save(session.part_name, ContentFile(b'x' * 10))
+        UploadSession.objects.filter(id=sessions[0].id).update(
+            date_update=timezone.now() - timedelta(days=2)
+        )
+
+        metrics = reap_tombstones()
+
+        self.assertEqual(metrics['expired'], 1)
+        self.assertEqual(metrics['files'], 1)
+        self.assertEqual(UploadSession.objects.get().id, sessions[1].id)
+        self.assertFalse(default_storage.exists(sessions[0].part_name))
+        self.assertTrue(default_storage.exists(sessions[1].part_name))
+
+    def test_reap_command(self):
+        """Test command reaps once and reports metrics"""
+        file = self.create_file()
+        bury(file.file.name, 'uploads/projects/missing')
+        out = StringIO()
+
+        call_command('reap_tombstones', '--once', stdout=out)
+
+        self.assertFalse(os.path.exists(file.file.path))
+        self.assertFalse(Tombstone.objects.exists())
+        self.assertIn('Reaped 2 tombstones, 1 files', out.getvalue())
+
+    def test_zero_limit(self):
+        """Test pass without file budget ends and command refuses it"""
+        bury('uploads/projects/missing')
+
+        metrics = reap_tombstones(limit=0)
+
+        self.assertEqual(metrics['pending'], 1)
+        with self.assertRaises(CommandError):
+            call_command('reap_tombstones', '--once', '--limit', '0')
@@ -0,0 +1,266 @@
+"""
+Test for chunked upload APIs
+"""
+import hashlib
+import os
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Blob, File, UploadSession
+from core.tests.helpers import (
+    TempMediaMixin,
+    create_admin_user,
+    create_client,
+    create_project
+)
+
+
+UPLOAD_URL = reverse('file:admin-upload-init')
+FILE_URL = reverse('file:admin-list')
+
+
+def chunk_url(session_id):
+    return reverse('file:admin-upload-chunk', args=[session_id])
+
+
+def finalize_url(session_id):
+    return reverse('file:admin-upload-finalize', args=[session_id])
+
+
+class ChunkedUploadApiTests(TempMediaMixin, TestCase):
+    """Test init, append chunk and finalize of uploads"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_admin_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.project = create_project(self.user, create_client())
+        self.content = os.urandom(300 * 1024)
+
+    def init(self, name='drawing.step', destiny='Production', **params):
+        payload = {
+            'project': self.project.id,
+            'destiny': destiny,
+            'name': name,
+            'size': len(self.content),
+            **params
+        }
+        res = self.client.post(UPLOAD_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return res.data['id']
+
+    def put(self, session_id, offset, body):
+        return self.client.put(
+            chunk_url(session_id),
+            body,
+            content_type='application/octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset)
+        )
+
+    def upload(self, session_id, size=128 * 1024):
+        for offset in range(0, len(self.content), size):
+            res = self.put(
+                session_id,
+                offset,
+                self.content[offset:offset + size]
+            )
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def finalize(self, session_id, checksum=None):
+        if checksum is None:
+            checksum = hashlib.sha256(self.content).hexdigest()
+        return self.client.post(
+            finalize_url(session_id),
+            {'checksum': checksum},
+            format='json'
+        )
+
+    def test_chunked_upload(self):
+        """Test chunks are assembled into the project file"""
+        session_id = self.init()
+        self.upload(session_id)
+
+        res = self.finalize(session_id)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        file = File.objects.get(id=res.data['id'])
+        sha256 = hashlib.sha256(self.content).hexdigest()
+        self.assertEqual(
+            file.file.name,
+            f'blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}.step'
+        )
+        self.assertEqual(file.name, 'drawing.step')
+        self.assertEqual(file.blob.refcount, 1)
+        with open(file.file.path, 'rb') as stored:
+            self.assertEqual(stored.read(), self.content)
+        session = UploadSession.objects.get(id=session_id)
+        self.assertEqual(session.status, 'Completed')
+        upload_dir = os.path.join(
+            self.media_root,
+            'uploads/projects',
+            str(self.project.id)
+        )
+        self.assertEqual(os.listdir(upload_dir), [])
+
+    def test_resume_after_dropped_chunk(self):
+        """Test wrong offset is refused with the offset to resume from"""
+        session_id = self.init()
+        self.put(session_id, 0, self.content[:1000])
+
+        conflict = self.put(session_id, 5000, self.content[5000:6000])
+        status_res = self.client.get(chunk_url(session_id))
+
+        self.assertEqual(conflict.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(conflict.data['offset'], 1000)
+        self.assertEqual(status_res.data['offset'], 1000)
+
+    def test_interrupted_chunk_overwritten(self):
+        """Test bytes of an unfinished chunk are written over on resume"""
+        session_id = self.init()
+        self.put(session_id, 0, self.content[:1000])
+        part_name = UploadSession.objects.get(id=session_id).part_name
+        with open(os.path.join(self.media_root, part_name), 'ab') as part:
+            part.write(b'partial chunk')
+
+        self.put(session_id, 1000, self.content[1000:])
+        res = self.finalize(session_id)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_checksum_mismatch(self):
+        """Test upload with wrong checksum is not finalized"""
+        session_id = self.init()
+        self.upload(session_id)
+
+        res = self.finalize(session_id, checksum='0' * 64)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(File.objects.exists())
+        session = UploadSession.objects.get(id=session_id)
+        self.assertEqual(session.status, 'Open')
+
+    def test_finalize_incomplete(self):
+        """Test upload missing bytes can not be finalized"""
+        session_id = self.init()
+        self.put(session_id, 0, self.content[:1000])
+
+        res = self.finalize(session_id)
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+    def test_session_id_not_uuid(self):
+        """Test session urls with malformed id are not found"""
+        url = f'{UPLOAD_URL}abc/'
+
+        self.assertEqual(
+            self.client.get(url).status_code,
+            status.HTTP_404_NOT_FOUND
+        )
+        self.assertEqual(
+            self.client.post(f'{url}finalize/').status_code,
+            status.HTTP_404_NOT_FOUND
+        )
+
+    def test_chunk_over_declared_size(self):
+        """Test chunk past declared size is refused"""
+        session_id = self.init()
+
+        res = self.put(session_id, 0, self.content + b'extra')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(UploadSession.objects.get(id=session_id).offset, 0)
+
+    def test_secretariat_name_and_format(self):
+        """Test secretariat suffix and extension check at init"""
+        session_id = self.init(destiny='Secretariat')
+        res = self.client.post(
+            UPLOAD_URL,
+            {
+                'project': self.project.id,
+                'destiny': 'Production',
+                'name': 'script.exe',
+                'size': 10
+            },
+            format='json'
+        )
+
+        session = UploadSession.objects.get(id=session_id)
+        self.assertEqual(session.name, 'drawing_s.step')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class FilesUploadApiTests(TempMediaMixin, TestCase):
+    """Test batch ingestion of multipart uploads"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_admin_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.project = create_project(self.user, create_client())
+
+    def post(self, files, destiny='Production'):
+        payload = {
+            'file': files,
+            'project': self.project.id,
+            'user': self.user.id,
+            'destiny': destiny,
+        }
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post(FILE_URL, payload, format='multipart')
+        return res, len(ctx.captured_queries)
+
+    def drawings(self, count, prefix='drawing'):
+        return [
+            SimpleUploadedFile(f'{prefix}-{i}.dxf', f'body {i}'.encode())
+            for i in range(count)
+        ]
+
+    def test_batch_constant_queries(self):
+        """Test db work of a batch does not grow with its size"""
+        small, small_count = self.post(self.drawings(3, 'small'))
+        res, count = self.post(self.drawings(30))
+
+        self.assertEqual(small.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(count, small_count)
+        self.assertEqual(File.objects.count(), 33)
+        self.assertEqual(len(res.data['timings']), 30)
+        self.assertEqual(
+            set(res.data['timings'][0]),
+            {'name', 'sha256', 'size', 'stored', 'hash_ms', 'write_ms'}
+        )
+
+    def test_duplicates_in_batch(self):
+        """Test same content twice in a batch is stored once"""
+        files = [
+            SimpleUploadedFile('a.dxf', b'same body'),
+            SimpleUploadedFile('b.dxf', b'same body'),
+        ]
+
+        res, _ = self.post(files, destiny='Secretariat')
+
+        self.assertEqual(res.data['detail'], ['a_s.dxf', 'b_s.dxf'])
+        self.assertEqual(Blob.objects.get().refcount, 2)
+        self.assertEqual(
+            [t['stored'] for t in res.data['timings']],
+            [True, False]
+        )
+
+    def test_wrong_format_stores_nothing(self):
+        """Test batch with one wrong extension is refused as a whole"""
+        files = self.drawings(3)
+        files.insert(1, SimpleUploadedFile('virus.exe', b'body'))
+
+        res, _ = self.post(files)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(File.objects.exists())
+        self.assertEqual(os.listdir(self.media_root), [])
@@ -0,0 +1,147 @@
+"""
+Deferred removal of deleted storage
+
+Deleting a file or a project only removes rows and records a Tombstone
+with the storage name in the same transaction, the request does not touch
+the disk. The reaper removes tombstoned storage in batches, a directory
+is emptied a bounded number of entries at a time, so a project with
+thousands of files spreads over many short transactions. Failed removals
+are retried with backoff. Unreferenced blobs and the part files of
+abandoned chunked uploads are collected in the same pass.
+"""
+import logging
+import os
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from core.models import Tombstone
+from file.blob_utils import collect_blobs
+from file.upload_utils import expire_upload_sessions
+
+
+TOMBSTONE_BATCH_SIZE = 50
+REAP_ENTRY_LIMIT = 500
+REAP_RETRY_DELAY = 30
+
+logger = logging.getLogger(__name__)
+
+
+def bury(*names):
+    """Record storage names for the reaper"""
+    return Tombstone.objects.bulk_create(
+        [Tombstone(name=name) for name in names if name]
+    )
+
+
+def remove_storage(path, limit):
+    """
+    Remove path, a directory at most limit files at once.
+    Return removed files, their bytes and whether path is gone.
+    """
+    if not os.path.lexists(path):
+        return 0, 0, True
+    if not os.path.isdir(path) or os.path.islink(path):
+        size = os.lstat(path).st_size
+        os.remove(path)
+        return 1, size, True
+
+    removed = freed = 0
+    for root, dirs, files in os.walk(path, topdown=False):
+        for name in files:
+            if removed >= limit:
+                return removed, freed, False
+            file_path = os.path.join(root, name)
+            freed += os.lstat(file_path).st_size
+            os.remove(file_path)
+            removed += 1
+        for name in dirs:
+            dir_path = os.path.join(root, name)
+            if os.path.islink(dir_path):
+                os.remove(dir_path)
+            else:
+                os.rmdir(dir_path)
+    os.rmdir(path)
+    return removed, freed, True
+
+
+def schedule_retry(tombstone, error):
+    tombstone.attempts += 1
+    tombstone.last_error = repr(error)
+    if tombstone.attempts < tombstone.max_attempts:
+        tombstone.run_after = timezone.now() + timedelta(
+            seconds=REAP_RETRY_DELAY * 2 ** (tombstone.attempts - 1)
+        )
+    else:
+        tombstone.status = 'Failed'
+    tombstone.save(
+        update_fields=['attempts', 'last_error', 'run_after', 'status']
+    )
+
+
+def reap_batch(batch_size, limit, metrics):
+    """Process one batch of due tombstones, return False when none was"""
+    with transaction.atomic():
+        tombstones = list(
+            Tombstone.objects.select_for_update(skip_locked=True).filter(
+                status='Pending',
+                run_after__lte=timezone.now()
+            )[:batch_size]
+        )
+        if not tombstones:
+            return False
+
+        reaped = []
+        processed = 0
+        for tombstone in tombstones:
+            if limit <= 0:
+                break
+            processed += 1
+            try:
+                removed, freed, done = remove_storage(
+                    default_storage.path(tombstone.name),
+                    limit
+                )
+            except OSError as e:
+                logger.warning('Removing %s failed: %r', tombstone.name, e)
+                schedule_retry(tombstone, e)
+                metrics['retried' if tombstone.status == 'Pending'
+                        else 'failed'] += 1
+                continue
+            limit -= removed
+            metrics['files'] += removed
+            metrics['bytes'] += freed
+            if done:
+                reaped.append(tombstone.id)
+        Tombstone.objects.filter(id__in=reaped).delete()
+        metrics['reaped'] += len(reaped)
+    return processed > 0
+
+
+def reap_tombstones(batch_size=TOMBSTONE_BATCH_SIZE, limit=REAP_ENTRY_LIMIT):
+    """
+    Remove storage of due tombstones, unreferenced blobs and expired
+    upload sessions. Return metrics of the pass.
+    """
+    start = time.perf_counter()
+    metrics = Counter(reaped=0, retried=0, failed=0, files=0, bytes=0)
+    with transaction.atomic():
+        parts = expire_upload_sessions()
+        bury(*parts)
+    metrics['expired'] = len(parts)
+    while reap_batch(batch_size, limit, metrics):
+        pass
+    metrics['blobs'] = collect_blobs()
+    metrics['pending'] = Tombstone.objects.filter(status='Pending').count()
+    metrics['duration_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    logger.info(
+        'Reaped %(reaped)s tombstones, %(files)s files, %(bytes)s bytes '
+        'and %(blobs)s blobs in %(duration_ms)s ms, %(expired)s uploads '
+        'expired, %(retried)s retried, %(failed)s failed, '
+        '%(pending)s pending',
+        metrics
+    )
+    return dict(metrics)
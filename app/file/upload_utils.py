@@ -0,0 +1,243 @@
+"""
+Chunked uploads
+
+A client opens an UploadSession, PUTs the file in chunks with the
+``Upload-Offset`` header and finalizes it with the SHA-256 of the whole
+file. Chunks are appended in place to a part file on the media volume,
+finalize only moves it into the blob store, so no request holds a worker
+for the whole transfer. After a dropped connection the client asks for the
+session offset and resumes from there. Sessions left open longer than
+``FILE_UPLOAD_SESSION_TTL`` are expired by the reaper.
+
+Multipart posts of many files go through ``ingest_files``, bodies are
+hashed and written by a thread pool and all File rows are created in one
+transaction.
+"""
+import hashlib
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import BaseParser
+from core.models import UploadSession
+from file.blob_utils import (
+    attach_blob,
+    attach_blobs,
+    hash_content,
+    lock_blob,
+    lock_blobs,
+    move_to_blob,
+    write_blob
+)
+
+
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+COPY_BUFFER_SIZE = 64 * 1024
+INGEST_WORKERS = 4
+UPLOAD_SESSION_TTL = 60 * 60 * 24
+
+logger = logging.getLogger(__name__)
+
+
+class OffsetConflict(Exception):
+    """Chunk or finalize does not match bytes stored for the session"""
+
+    def __init__(self, message, offset):
+        super().__init__(message)
+        self.message = message
+        self.offset = offset
+
+
+class ChunkParser(BaseParser):
+    """Hand the raw body of a chunk to the view as a stream"""
+    media_type = 'application/octet-stream'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return stream
+
+
+def chunk_size():
+    return getattr(settings, 'FILE_UPLOAD_CHUNK_SIZE', UPLOAD_CHUNK_SIZE)
+
+
+def append_chunk(session_id, user, offset, stream):
+    """
+    Write chunk at offset, return the new session offset.
+    Bytes past the stored offset, left by an interrupted chunk,
+    are overwritten. A part file shorter than the offset moves the
+    session back to its size.
+    """
+    with transaction.atomic():
+        session = get_object_or_404(
+            UploadSession.objects.select_for_update(),
+            id=session_id,
+            user=user,
+            status='Open'
+        )
+        path = default_storage.path(session.part_name)
+        stored = os.path.getsize(path) if os.path.exists(path) else 0
+        session.offset = min(session.offset, stored)
+        if offset != session.offset:
+            raise OffsetConflict(
+                'Upload offset does not match the session',
+                session.offset
+            )
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'ab') as part:
+            part.truncate(session.offset)
+            written = 0
+            while True:
+                block = stream.read(COPY_BUFFER_SIZE)
+                if not block:
+                    break
+                written += len(block)
+                if session.offset + written > session.size:
+                    part.truncate(session.offset)
+                    raise ValidationError(
+                        {'message': 'Chunk exceeds declared file size'}
+                    )
+                part.write(block)
+
+        session.offset += written
+        session.save(update_fields=['offset', 'date_update'])
+        return session.offset
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as part:
+        for block in iter(lambda: part.read(COPY_BUFFER_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@transaction.atomic
+def finalize_upload(session_id, user, checksum=''):
+    """Verify the uploaded bytes and turn the session into a File"""
+    session = get_object_or_404(
+        UploadSession.objects.select_for_update(),
+        id=session_id,
+        user=user,
+        status='Open'
+    )
+    if session.offset != session.size:
+        raise OffsetConflict('Upload is not complete', session.offset)
+
+    expected = (checksum or session.checksum).lower()
+    part_path = default_storage.path(session.part_name)
+    if not expected or file_checksum(part_path) != expected:
+        raise ValidationError({'message': 'Checksum does not match'})
+
+    blob = lock_blob(expected, session.size, session.name)
+    file = attach_blob(
+        blob,
+        user=session.user,
+        project=session.project,
+        destiny=session.destiny,
+        name=session.name
+    )
+    session.status = 'Completed'
+    session.checksum = expected
+    session.file = file
+    session.save(update_fields=['status', 'checksum', 'file', 'date_update'])
+    # last step, a failed move rolls the rows back
+    move_to_blob(part_path, blob)
+    return file
+
+
+def expire_upload_sessions():
+    """
+    Delete open sessions not written to within the TTL,
+    return part names left behind. Sessions taking a chunk are skipped.
+    """
+    ttl = getattr(settings, 'FILE_UPLOAD_SESSION_TTL', UPLOAD_SESSION_TTL)
+    sessions = list(
+        UploadSession.objects.select_for_update(skip_locked=True).filter(
+            status='Open',
+            date_update__lt=timezone.now() - timedelta(seconds=ttl)
+        )
+    )
+    UploadSession.objects.filter(
+        id__in=[session.id for session in sessions]
+    ).delete()
+    return [session.part_name for session in sessions]
+
+
+def elapsed_ms(start):
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def timed_hash(upload):
+    start = time.perf_counter()
+    sha256, size = hash_content(upload)
+    return sha256, size, elapsed_ms(start)
+
+
+def timed_write(upload, blob):
+    start = time.perf_counter()
+    written = write_blob(upload, blob)
+    return written, elapsed_ms(start)
+
+
+def ingest_files(uploads, names, **fields):
+    """
+    Store uploads as ``names`` and create their File rows.
+    Hashing and writing run in a thread pool, the db work stays in the
+    calling thread in one transaction and File rows are bulk created.
+    Return files and per file timings.
+    """
+    start = time.perf_counter()
+    workers = max(1, min(
+        getattr(settings, 'FILE_INGEST_WORKERS', INGEST_WORKERS),
+        len(uploads)
+    ))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        hashes = list(pool.map(timed_hash, uploads))
+
+        with transaction.atomic():
+            blobs = lock_blobs({
+                sha256: (size, name)
+                for (sha256, size, _), name in zip(hashes, names)
+            })
+            # a content posted twice in the batch is written once
+            first = {}
+            for index, (sha256, _, _) in enumerate(hashes):
+                first.setdefault(sha256, index)
+            writes = dict(zip(
+                first.values(),
+                pool.map(
+                    timed_write,
+                    [uploads[index] for index in first.values()],
+                    [blobs[sha256] for sha256 in first]
+                )
+            ))
+            files = attach_blobs(
+                [(blobs[sha256], name)
+                 for (sha256, _, _), name in zip(hashes, names)],
+                **fields
+            )
+
+    timings = []
+    for index, (sha256, size, hash_ms) in enumerate(hashes):
+        written, write_ms = writes.get(index, (False, 0))
+        timings.append({
+            'name': names[index],
+            'sha256': sha256,
+            'size': size,
+            'stored': written,
+            'hash_ms': hash_ms,
+            'write_ms': write_ms,
+        })
+    logger.info(
+        'Ingested %s files in %s ms', len(files), elapsed_ms(start)
+    )
+    return files, timings
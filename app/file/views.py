@@ -1,7 +1,9 @@
 """
 Views for the file APIs.
 """
-import os
+from django.db import transaction
+from django.http import FileResponse
+from django.shortcuts import get_object_or_404
 from rest_framework import (
     viewsets,
     mixins,
@@ -12,26 +14,41 @@ from rest_framework import status
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.exceptions import ValidationError
-from app.settings import MEDIA_ROOT
 from file import serializers
 from department.serializers import DepartmentSerializer
 from core.models import (
+    Blob,
     File,
     Department,
     CommentFile,
     QueueLogic,
     NotificationTask,
+    UploadSession,
 )
+from core.cache_utils import cached_response
+from core.jobs import enqueue
+from project.project_utils import adjust_project_tasks
 from .file_utils import (
-    project_progress,
-    get_file_project_data,
     filter_files,
     search_files,
     notification_ws,
-    update_task_project_ws,
-    update_task_department_ws,
-    check_user_status
+    serialize_comment,
+    queue_create,
+    queue_destroy,
+    queue_update
 )
+from .blob_utils import attach_blob, download_name, release_blobs
+from .tombstone_utils import bury
+from .upload_utils import (
+    OffsetConflict,
+    ChunkParser,
+    chunk_size,
+    append_chunk,
+    finalize_upload
+)
+
+
+UUID_PATTERN = r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}'
 
 
 class FileAdminViewSet(mixins.DestroyModelMixin,
@@ -44,17 +61,25 @@ class FileAdminViewSet(mixins.DestroyModelMixin,
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAdminUser]
 
+    @transaction.atomic
     def destroy(self, request, *args, **kwargs):
-        """Delete file object in db and file on server"""
+        """Delete file object in db, the reaper removes file on server"""
         file = self.get_object()
-        file_path = MEDIA_ROOT + '/' + str(file.file)
-        os.remove(file_path)
+        if file.blob_id:
+            release_blobs(File.objects.filter(id=file.id))
+        else:
+            bury(str(file.file))
         file_data = serializers.FileProjectSerializer(file).data
+        queue = file.queue_snapshot(lock=True)
         super().destroy(request, *args, **kwargs)
-        if len(file_data['queue']) > 0:
-            project_progress(file_data['project'])
-        update_task_project_ws(file_data, 'file_delete')
-        update_task_department_ws(file_data, 'file_delete')
+        if queue:
+            adjust_project_tasks(
+                file.project_id,
+                total=-len(queue),
+                done=-sum(q['end'] for q in queue)
+            )
+        enqueue('file.update_task_project_ws', file_data, 'file_delete')
+        enqueue('file.update_task_department_ws', file_data, 'file_delete')
         return Response({'File has been deleted'})
 
     def create(self, request, *args, **kwargs):
@@ -62,12 +87,121 @@ class FileAdminViewSet(mixins.DestroyModelMixin,
         serializer = serializers.FilesUploadSerializer(data=request.data)
         if serializer.is_valid():
             qs = serializer.save()
-            message = {'detail': qs, 'status': True}
+            message = {
+                'detail': qs,
+                'status': True,
+                'timings': serializer.timings
+            }
             return Response(message, status=status.HTTP_201_CREATED)        
         info = {'message': serializer.errors, 'status': False}
         return Response(info, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(
+        methods=['GET'],
+        detail=False,
+        url_path=r'blobs/(?P<sha256>[0-9a-f]{64})'
+    )
+    def blob_exists(self, request, sha256):
+        """Tell if content with the hash is stored, upload can be skipped"""
+        exists = Blob.objects.filter(sha256=sha256).exists()
+        return Response({'sha256': sha256, 'exists': exists})
+
+    @action(methods=['POST'], detail=False, url_path='attach')
+    @transaction.atomic
+    def blob_attach(self, request):
+        """Create file from stored content given its hash"""
+        serializer = serializers.BlobAttachSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        blob = Blob.objects.select_for_update().filter(
+            sha256=data['sha256']
+        ).first()
+        if blob is None:
+            info = {'message': 'There is no file with this hash'}
+            return Response(info, status=status.HTTP_404_NOT_FOUND)
+        file = attach_blob(
+            blob,
+            user=request.user,
+            project=data['project'],
+            destiny=data['destiny'],
+            name=serializers.destiny_file_name(
+                data['name'],
+                data['destiny']
+            )
+        )
+        message = {'detail': [file.name], 'status': True, 'id': file.id}
+        return Response(message, status=status.HTTP_201_CREATED)
+
+    @action(methods=['POST'], detail=False, url_path='upload')
+    def upload_init(self, request):
+        """Open chunked upload session"""
+        serializer = serializers.UploadSessionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user=request.user)
+        data = {**serializer.data, 'chunk_size': chunk_size()}
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    @action(
+        methods=['GET', 'PUT'],
+        detail=False,
+        url_path=rf'upload/(?P<session_id>{UUID_PATTERN})',
+        parser_classes=[ChunkParser]
+    )
+    def upload_chunk(self, request, session_id):
+        """
+            GET returns session offset to resume from,
+            PUT appends body at Upload-Offset header
+        """
+        if request.method == 'GET':
+            session = get_object_or_404(
+                UploadSession,
+                id=session_id,
+                user=request.user
+            )
+            serializer = serializers.UploadSessionSerializer(session)
+            return Response(serializer.data)
+
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+        except ValueError:
+            info = {'message': 'Upload-Offset header is required'}
+            return Response(info, status=status.HTTP_400_BAD_REQUEST)
+        if not hasattr(request.data, 'read'):
+            info = {'message': 'Chunk body is required'}
+            return Response(info, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            offset = append_chunk(
+                session_id,
+                request.user,
+                offset,
+                request.data
+            )
+        except OffsetConflict as e:
+            info = {'message': e.message, 'offset': e.offset}
+            return Response(info, status=status.HTTP_409_CONFLICT)
+        return Response({'offset': offset})
+
+    @action(
+        methods=['POST'],
+        detail=False,
+        url_path=rf'upload/(?P<session_id>{UUID_PATTERN})/finalize'
+    )
+    def upload_finalize(self, request, session_id):
+        """Verify checksum and create file of the upload session"""
+        try:
+            file = finalize_upload(
+                session_id,
+                request.user,
+                request.data.get('checksum', '')
+            )
+        except OffsetConflict as e:
+            info = {'message': e.message, 'offset': e.offset}
+            return Response(info, status=status.HTTP_409_CONFLICT)
+        message = {'detail': [file.name], 'status': True, 'id': file.id}
+        return Response(message, status=status.HTTP_201_CREATED)
+
     @action(methods=['GET'], detail=False, url_path='columns-manage')
+    @cached_response('FileAdminViewSet.columns-manage')
     def file_mange_columns(self, request):
         """Columns for mange files"""
         deps = Department.objects.all()
@@ -84,12 +218,14 @@ class FileAdminViewSet(mixins.DestroyModelMixin,
         return Response(result)
 
     @action(methods=['GET'], detail=False, url_path='columns-secretariat')
+    @cached_response('FileAdminViewSet.columns-secretariat')
     def file_secretariat_columns(self, request):
         """Columns for secretariat files"""
         result = ['view', 'name', 'comments', 'options']
         return Response(result)
     
     @action(methods=['GET'], detail=False, url_path='columns-department')
+    @cached_response('FileAdminViewSet.columns-department')
     def file_admin_department_columns(self, request):
         """Columns for files at department auth"""
         columns = ['view', 'name', 'prev_task',
@@ -122,7 +258,26 @@ class FileAuthViewSet(viewsets.GenericViewSet):
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
 
+    @action(methods=['GET'], detail=True, url_path='download')
+    def file_download(self, request, pk=None):
+        """Download file content under the name given by the user"""
+        file = self.get_object()
+        if file.destiny == 'Secretariat' and not request.user.is_staff:
+            info = {'message': 'You do not have permission'}
+            return Response(info, status=status.HTTP_403_FORBIDDEN)
+        try:
+            content = file.file.open('rb')
+        except FileNotFoundError:
+            info = {'message': 'File content is missing'}
+            return Response(info, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(
+            content,
+            as_attachment=True,
+            filename=download_name(file)
+        )
+
     @action(methods=['GET'], detail=False, url_path='columns-project')
+    @cached_response('FileAuthViewSet.columns-project')
     def file_auth_project_columns(self, request):
         """Columns for files at project"""
         deps = Department.objects.all()
@@ -139,6 +294,7 @@ class FileAuthViewSet(viewsets.GenericViewSet):
         return Response(result)
 
     @action(methods=['GET'], detail=False, url_path='columns-department')
+    @cached_response('FileAuthViewSet.columns-department')
     def file_auth_department_columns(self, request):
         """Columns for files at department auth"""
         columns = ['view', 'name', 'prev_task',
@@ -175,7 +331,7 @@ class QueueLogicViewSet(mixins.CreateModelMixin,
                         viewsets.GenericViewSet):
     """Manage Queue Logic for file APIs"""
     serializer_class = serializers.QueueLogicManageSerializer
-    queryset = QueueLogic.objects.all()
+    queryset = QueueLogic.objects.select_related('file')
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAdminUser]
 
@@ -201,155 +357,64 @@ class QueueLogicViewSet(mixins.CreateModelMixin,
     def perform_create(self, serializer):
         """Creating logic and calculate project progress"""
         validated_data = serializer.validated_data
-        dep_id = validated_data['department'].id
-        file_id = validated_data['file'].id
-        exists = QueueLogic.objects.filter(
-            file=file_id,
-            department=dep_id
-        ).exists()
-
-        if exists:
-            info = {'message': 'Queue with this department exists'}
-            raise ValidationError(info)
-
-        file_data = get_file_project_data(file_id)
-        queue_deps = [
-            dep['department'] for dep in file_data.get('queue', [])
-        ]
-
-        queue_deps.append(dep_id)
-        queue_deps.sort()
-        validated_data['permission'] = False
-
-        if dep_id == queue_deps[0]:
-            validated_data['permission'] = True
-            QueueLogic.objects.filter(
-                file=file_id,
-                department__in=queue_deps[1:]
-            ).update(permission=False)
-
-        elif dep_id == queue_deps[-1] and len(queue_deps) > 1:
-            penultimate_dep = queue_deps[-2]
-            logic = QueueLogic.objects.get(
-                file=file_id,
-                department=penultimate_dep
-            )
-            logic_ser = serializers.QueueLogicToFileSerializer(logic)
-            validated_data['permission'] = logic_ser.data.get('end', False)
-
-        else:
-            index = queue_deps.index(dep_id)
-            dep = queue_deps[index-1]
-            dep_next = queue_deps[index+1]
-            logic = QueueLogic.objects.get(file=file_id, department=dep)
-            logic_ser = serializers.QueueLogicToFileSerializer(logic)
-            logic_next = QueueLogic.objects.get(
-                file=file_id,
-                department=dep_next
-            )
-            logic_next.permission = False
-            logic_next.start = False
-            logic_next.paused = False
-            logic_next.end = False
-            logic_next.save()
-            validated_data['permission'] = logic_ser.data.get('end', False)
-
+        validated_data['permission'], reset = queue_create(
+            validated_data['file'],
+            validated_data['department']
+        )
         super().perform_create(serializer)
+        adjust_project_tasks(
+            serializer.instance.project_id,
+            total=1,
+            done=int(serializer.instance.end) - reset
+        )
 
+    @transaction.atomic
     def create(self, request, *args, **kwargs):
         try:
             response = super().create(request, *args, **kwargs)
-            file = File.objects.get(id=response.data['file'])
-            file.new = False
-            file.save()
-            file = File.objects.get(id=response.data['file'])
-            serializer_file = serializers.FileProjectSerializer(
-                file,
-                many=False
-            )
-            file_data = serializer_file.data
+            file_id = response.data['file']
+            File.objects.filter(id=file_id).update(new=False)
             notification_ws(response.data)
-            update_task_project_ws(file_data, 'task')
-            update_task_department_ws(file_data,'task')
+            enqueue('file.task_ws', file_id)
             return response
 
         except ValidationError as e:
             return Response(e.detail, status=status.HTTP_409_CONFLICT)
 
+    @transaction.atomic
     def destroy(self, request, *args, **kwargs):
         """Delete logic and calculate project progress"""
         q_obj = self.get_object()
-        dep_id = q_obj.department.id
-        file_data = get_file_project_data(q_obj.file.id)
-        queue_deps = [
-            dep['department'] for dep in file_data.get('queue', [])
-        ]
-
-        if dep_id == queue_deps[0] and len(queue_deps) > 1:
-            queue_deps.remove(dep_id)
-
-            logic = QueueLogic.objects.get(
-                file=q_obj.file.id,
-                department=queue_deps[0]
-            )
-            logic.permission = True
-            logic.save()
-        else:
-            try:
-                index = queue_deps.index(dep_id)
-                dep_next = queue_deps[index+1]
-                logic_next = QueueLogic.objects.get(
-                    file=q_obj.file.id,
-                    department=dep_next
-                )
-                logic_next.permission = True
-                logic_next.save()
-            except IndexError:
-                pass
-
+        queue_destroy(q_obj.file, q_obj.department_id)
         response = super().destroy(request, *args, **kwargs)
         if response.status_code == 204:
-            file_data = get_file_project_data(q_obj.file.id)
-            update_task_project_ws(file_data, 'task')
-            update_task_department_ws(file_data,'task')
+            # department board the task was removed from drops the file
+            enqueue(
+                'file.queue_removed_ws',
+                q_obj.file_id,
+                q_obj.department_id
+            )
+            enqueue('file.task_ws', q_obj.file_id)
             return response
 
+    @transaction.atomic
     def update(self, request, *args, **kwargs):
         """Updating logic and calculate project progress"""
         request_data = request.data
         user_id = request.user.id
         q_obj = self.get_object()
-        file_data = get_file_project_data(q_obj.file.id)
-        deps_id = [dep['department'] for dep in file_data['queue']]
-        if len(deps_id) > 1 and request_data.get('end') and q_obj.permission:
-            if max(deps_id) != q_obj.department.id:
-                index = deps_id.index(q_obj.department.id)
-                next_dep_id = deps_id[index + 1]
-
-                logic = QueueLogic.objects.get(
-                    file=q_obj.file.id, department=next_dep_id
-                )
-                logic.permission = True
-                logic.save()
-
-        if not request_data.get('end') and q_obj.permission:
-            index = deps_id.index(q_obj.department.id)
-            deps_to_update = deps_id[index + 1:]
-
-            for dep_id in deps_to_update:
-                logic = QueueLogic.objects.get(
-                    file=q_obj.file.id, department=dep_id
-                )
-                logic.permission = False
-                logic.end = False
-                logic.start = False
-                logic.paused = False
-                logic.save()
+        previous_end, done_reset = queue_update(
+            q_obj.file,
+            q_obj.department_id,
+            bool(request_data.get('end'))
+        )
         response = super().update(request, *args, **kwargs)
-        check_user_status(user_id)
-        file_data = get_file_project_data(q_obj.file.id)
-        update_task_project_ws(file_data, 'task')
-        update_task_department_ws(file_data, 'task')
+        done = int(response.data['end']) - int(previous_end) - done_reset
+        if done:
+            adjust_project_tasks(q_obj.project_id, done=done)
+        user_ids = [user_id, *q_obj.users.values_list('id', flat=True)]
+        enqueue('user.refresh_status', user_ids)
+        enqueue('file.task_ws', q_obj.file_id)
         return response
 
 
@@ -368,27 +433,34 @@ class CommentFileViewSet(mixins.CreateModelMixin,
             return serializers.CommentFileManageSerializer
         return self.serializer_class
 
+    @transaction.atomic
     def create(self, request, *args, **kwargs):
         response = super().create(request, *args, **kwargs)
-        update_task_project_ws(response.data['id'], 'comment_add')
-        update_task_department_ws(response.data['id'], 'comment_add')
+        comment_data = serialize_comment(response.data['id'])
+        enqueue('file.update_task_project_ws', comment_data, 'comment_add')
+        enqueue(
+            'file.update_task_department_ws',
+            comment_data,
+            'comment_add'
+        )
         return response
 
+    @transaction.atomic
     def destroy(self, request, *args, **kwargs):
         user = request.user
         comment_object = self.get_object()
-        comment_id = comment_object.id
-        if not user.is_staff:            
-            if user.id == comment_object.user.id:
-                update_task_project_ws(comment_id, 'comment_delete')
-                update_task_department_ws(comment_id, 'comment_delete')
-                return super().destroy(request, *args, **kwargs)
-            else:
-                info = {'message': 'This is not your comment'}
-                return Response(info, status=status.HTTP_403_FORBIDDEN)
-        update_task_project_ws(comment_id, 'comment_delete')
-        update_task_department_ws(comment_id, 'comment_delete')
-        return super().destroy(request, *args, **kwargs)
+        if not user.is_staff and user.id != comment_object.user.id:
+            info = {'message': 'This is not your comment'}
+            return Response(info, status=status.HTTP_403_FORBIDDEN)
+        comment_data = serialize_comment(comment_object.id)
+        response = super().destroy(request, *args, **kwargs)
+        enqueue('file.update_task_project_ws', comment_data, 'comment_delete')
+        enqueue(
+            'file.update_task_department_ws',
+            comment_data,
+            'comment_delete'
+        )
+        return response
 
 
 class NotificationsTaskView(mixins.ListModelMixin,
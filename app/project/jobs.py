@@ -0,0 +1,10 @@
+"""
+Background jobs for the project app
+"""
+from core.jobs import job
+from project import project_utils
+
+
+@job('project.manage_project_ws')
+def manage_project_ws(data, destiny):
+    project_utils.manage_project_ws(data, destiny)
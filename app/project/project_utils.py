@@ -1,10 +1,11 @@
 from rest_framework.response import Response
 from rest_framework import status
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
+from core.ws_utils import publish, PROJECT_MANAGE_GROUP
+from core.pagination_utils import keyset_paginate
 from core.models import (
     Project,
     NotificationProject,
+    QueueLogic,
     User
 )
 from project.serializers import (
@@ -12,12 +13,115 @@ from project.serializers import (
     NotificationProjectSerializer
 )
 from django.core.paginator import Paginator
-from django.db.models import Q
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db.models import (
+    Q,
+    F,
+    Case,
+    When,
+    Value,
+    BooleanField,
+    Count,
+    OuterRef,
+    Subquery
+)
+from django.db.models.functions import Greatest, Coalesce
 
 import math
 
 
+# Per-endpoint query plans. Every list/search path runs its queryset through
+# ``apply_query_plan`` so the serializer never hits the db per row.
+# ``max_queries`` is the hard budget enforced by the test suite.
+QUERY_PLANS = {
+    'status': {
+        'select_related': ['manager', 'client'],
+        'prefetch_related': [],
+        'max_queries': 1,
+    },
+    'status_paginated': {
+        'select_related': ['manager', 'client'],
+        'prefetch_related': [],
+        'max_queries': 2,
+    },
+    'search': {
+        'select_related': ['manager', 'client'],
+        'prefetch_related': [],
+        'max_queries': 1,
+    },
+    'retrieve': {
+        'select_related': ['manager', 'client'],
+        'prefetch_related': [
+            'comments__user',
+            'files__comments__user',
+            'files__queue__users',
+        ],
+        'max_queries': 8,
+    },
+}
+
+
+def apply_query_plan(queryset, endpoint):
+    """Apply select_related/prefetch_related plan for the endpoint"""
+    plan = QUERY_PLANS[endpoint]
+    if plan['select_related']:
+        queryset = queryset.select_related(*plan['select_related'])
+    if plan['prefetch_related']:
+        queryset = queryset.prefetch_related(*plan['prefetch_related'])
+    return queryset
+
+
+SEARCH_FIELDS = ['number', 'name', 'order_number']
+SEARCH_LIMIT = 50
+SEARCH_MAX_LIMIT = 200
+SEARCH_MIN_TRIGRAM_LENGTH = 3
+
+
+def get_search_limit(params):
+    try:
+        limit = int(params.get('limit', SEARCH_LIMIT))
+    except (TypeError, ValueError):
+        limit = SEARCH_LIMIT
+    return max(1, min(limit, SEARCH_MAX_LIMIT))
+
+
+def rank_projects(queryset, search, limit=SEARCH_LIMIT):
+    """
+    Filter projects matching search phrase and rank them.
+    Phrases shorter than a trigram only use prefix matching,
+    longer ones use substring matching served by the trigram GIN indexes.
+    Prefix hits go first, then by similarity to the phrase.
+    """
+    search = (search or '').strip()
+    if not search:
+        return queryset[:limit]
+
+    prefix_match = Q()
+    substring_match = Q()
+    for field in SEARCH_FIELDS:
+        prefix_match |= Q(**{f'{field}__istartswith': search})
+        substring_match |= Q(**{f'{field}__icontains': search})
+
+    if len(search) < SEARCH_MIN_TRIGRAM_LENGTH:
+        queryset = queryset.filter(prefix_match)
+    else:
+        queryset = queryset.filter(substring_match)
+
+    queryset = queryset.annotate(
+        is_prefix=Case(
+            When(prefix_match, then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField()
+        ),
+        similarity=Greatest(
+            *[TrigramSimilarity(field, search) for field in SEARCH_FIELDS]
+        )
+    ).order_by('-is_prefix', '-similarity', 'deadline', 'id')
+    return queryset[:limit]
+
+
 def paginate(page_size, page_number, query):
+    query = apply_query_plan(query, 'status_paginated')
     paginator = Paginator(query, page_size)
     page_obj = paginator.get_page(page_number)
     serializer = ProjectSerializer(page_obj, many=True)
@@ -30,6 +134,26 @@ def paginate(page_size, page_number, query):
     return data
 
 
+PROJECT_KEYSET = ('deadline', 'id')
+
+
+def keyset_page(params, query):
+    """Archive page after the cursor, keyed on deadline and id"""
+    query = apply_query_plan(query, 'status_paginated')
+    page = keyset_paginate(query, PROJECT_KEYSET, params)
+    page['data'] = ProjectSerializer(page.pop('rows'), many=True).data
+    return page
+
+
+def paginate_archive(params, query):
+    """Offset pages for page_number clients, cursor pages otherwise"""
+    if 'page_number' in params:
+        page_size = params.get('page_size')
+        page_number = params.get('page_number')
+        return paginate(page_size, page_number, query)
+    return keyset_page(params, query)
+
+
 def project_production_status(project_status, user=None):
     status_mapping = {
         'Active': ['Started', 'In design'],
@@ -80,16 +204,14 @@ def search_projects(params, user):
         }
         return Response(info, status=status.HTTP_404_NOT_FOUND)
 
-    queryset = Project.objects.filter(
-        Q(status__in=status_filter) &
-        (Q(number__icontains=search) |
-         Q(name__icontains=search) |
-         Q(order_number__icontains=search))
-    )
+    queryset = Project.objects.filter(status__in=status_filter)
 
     if user and not user.is_staff and status.startswith('My'):
         queryset = queryset.filter(manager=user)
 
+    queryset = apply_query_plan(queryset, 'search')
+    queryset = rank_projects(queryset, search, get_search_limit(params))
+
     serializer = ProjectSerializer(queryset, many=True)
     return serializer.data
 
@@ -107,13 +229,12 @@ def search_secretariat_projects(params, user):
         return Response(info, status=status.HTTP_404_NOT_FOUND)
 
     queryset = Project.objects.filter(
-        Q(invoiced__in=status_filter) &
-        Q(secretariat=True) &
-        (Q(number__icontains=search) |
-         Q(name__icontains=search) |
-         Q(order_number__icontains=search))
+        invoiced__in=status_filter,
+        secretariat=True
     )
 
+    queryset = apply_query_plan(queryset, 'search')
+    queryset = rank_projects(queryset, search, get_search_limit(params))
     serializer = ProjectSerializer(queryset, many=True)
     return serializer.data
 
@@ -135,11 +256,9 @@ def filter_production_projects(queryset, params, user=None):
                        'My Suspended', 'My Completed']
 
     if project_status in status_paginate:
-        page_size = params.get('page_size')
-        page_number = params.get('page_number')
-        data = paginate(page_size, page_number, queryset)
-        return data
+        return paginate_archive(params, queryset)
 
+    queryset = apply_query_plan(queryset, 'status')
     serializer = ProjectSerializer(queryset, many=True)
     data = serializer.data
     return data
@@ -161,60 +280,117 @@ def filter_secretariat_projects(queryset, params, user=None):
     status_paginate = ['YES', 'YES (LACK OF INVOICE)']
 
     if invoice_status in status_paginate:
-        page_size = params.get('page_size')
-        page_number = params.get('page_number')
-        data = paginate(page_size, page_number, queryset)
-        return data
+        return paginate_archive(params, queryset)
 
+    queryset = apply_query_plan(queryset, 'status')
     serializer = ProjectSerializer(queryset, many=True)
     data = serializer.data
     return data
 
 
-def send_message(group, type, message):
-    channel_layer = get_channel_layer()
-    async_to_sync(channel_layer.group_send)(
-        group,
-        {
-            'type': type,
-            'message': message,
-        }
-    )
-
-
 def notification_ws(data):
+    """Create project notification for every user and push it"""
     project = Project.objects.get(id=data['id'])
-    users = User.objects.all()
+    user_ids = User.objects.values_list('id', flat=True)
     content = f'Project ({project}) has been added'
 
-    for user in users:
-        notification = NotificationProject(
-            user=user,
+    notifications = NotificationProject.objects.bulk_create([
+        NotificationProject(
+            user_id=user_id,
             project=project,
             content=content,
             type='project'
         )
-        notification.save()
-
-        noti_ser = NotificationProjectSerializer(notification, many=False)
-        message = {
-            'data': noti_ser.data,
-        }
-        group = f'user_project_noti_{user.id}'
-        type = 'project_noti'
-        send_message(group, type, message)
+        for user_id in user_ids
+    ])
+    if not notifications:
+        return
+
+    payload = NotificationProjectSerializer(notifications[0]).data
+    messages = [
+        (
+            f'user_project_noti_{notification.user_id}',
+            {
+                'type': 'project_noti',
+                'message': {
+                    'data': {
+                        **payload,
+                        'id': notification.id,
+                        'user': notification.user_id,
+                    },
+                },
+            }
+        )
+        for notification in notifications
+    ]
+    publish(messages)
 
 
 def manage_project_ws(data, destiny):
-    users = User.objects.all()
+    message = {
+        'data': data,
+        'type': destiny
+    }
+    event = {
+        'type': 'project_manage',
+        'message': message,
+    }
+    publish([(PROJECT_MANAGE_GROUP, event)])
+
+
+def progress_update(total=0, done=0, status=True):
+    """
+    Values for Project UPDATE shifting task counters by total/done and
+    deriving progress, and status unless told not to, from the new
+    counters. Counters never drop below zero, status is left alone for
+    projects without tasks.
+    """
+    new_total = Greatest(F('total_tasks') + total, 0)
+    new_done = Greatest(F('done_tasks') + done, 0)
+    has_tasks = Q(total_tasks__gt=-total)
+    values = {
+        'total_tasks': new_total,
+        'done_tasks': new_done,
+        'progress': Case(
+            When(has_tasks, then=new_done * 100 / new_total),
+            default=Value(0)
+        ),
+    }
+    if status:
+        all_done = Q(done_tasks__gte=F('total_tasks') + (total - done))
+        values['status'] = Case(
+            When(has_tasks & all_done, then=Value('Completed')),
+            When(has_tasks, then=Value('Started')),
+            default=F('status')
+        )
+    return values
 
-    for user in users:
-        message = {
-            'data': data,
-            'type': destiny
-        }
-        group = f'project_manage_{user.id}'
-        type = 'project_manage'
-        send_message(group, type, message)
+
+def adjust_project_tasks(project_id, total=0, done=0):
+    """Shift task counters of the project in one UPDATE"""
+    Project.objects.filter(id=project_id).update(
+        **progress_update(total, done)
+    )
 
 
+def recount_project_tasks(project_ids=None):
+    """
+    Recompute task counters and progress from QueueLogic.
+    Status is only derived when a task changes, a Suspended or manually
+    Completed project keeps it.
+    """
+    projects = Project.objects.all()
+    if project_ids is not None:
+        projects = projects.filter(id__in=project_ids)
+
+    tasks = QueueLogic.objects.filter(
+        project=OuterRef('pk')
+    ).order_by().values('project')
+    total = tasks.annotate(count=Count('id')).values('count')
+    done = tasks.filter(end=True).annotate(count=Count('id')).values('count')
+    updated = projects.update(
+        total_tasks=Coalesce(Subquery(total), 0),
+        done_tasks=Coalesce(Subquery(done), 0)
+    )
+    projects.update(**progress_update(status=False))
+    return updated
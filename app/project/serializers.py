@@ -3,9 +3,6 @@ Serializers for Project APIs
 """
 from rest_framework import serializers
 
-from user.serializers import UserNestedSerializer
-from client.serializers import ClientNestedSerializer
-
 from core.models import (
     Project,
     CommentProject,
@@ -14,6 +11,23 @@ from core.models import (
 from file.serializers import FileProjectSerializer
 
 
+def user_short_representation(user):
+    """Build the short user block from an already loaded user row"""
+    return {
+        'id': user.id,
+        'name': user.first_name[0].upper() + '. ' + user.last_name
+    }
+
+
+def client_short_representation(client):
+    """Build the short client block from an already loaded client row"""
+    return {
+        'id': client.id,
+        'name': client.name,
+        'color': client.color,
+    }
+
+
 class CommentProjectDisplaySerializer(serializers.ModelSerializer):
     """Serializer for comment project"""
 
@@ -24,12 +38,7 @@ class CommentProjectDisplaySerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         response = super().to_representation(instance)
-        first_name = UserNestedSerializer(instance.user).data['first_name']
-        last_name = UserNestedSerializer(instance.user).data['last_name']
-        response['user'] = {
-            'id': UserNestedSerializer(instance.user).data['id'],
-            'name': first_name[0].upper() + '. ' + last_name
-        }
+        response['user'] = user_short_representation(instance.user)
         return response
 
 
@@ -61,19 +70,11 @@ class ProjectCreateSerializer(serializers.ModelSerializer):
             'status',
         ]
         read_only_fields = ['id']
+
     def to_representation(self, instance):
         response = super().to_representation(instance)
-        first_name = UserNestedSerializer(instance.manager).data['first_name']
-        last_name = UserNestedSerializer(instance.manager).data['last_name']
-        response['manager'] = {
-            'id': UserNestedSerializer(instance.manager).data['id'],
-            'name': first_name[0].upper() + '. ' + last_name
-        }
-        response['client'] = {
-            'id': ClientNestedSerializer(instance.client).data['id'],
-            'name': ClientNestedSerializer(instance.client).data['name'],
-            'color': ClientNestedSerializer(instance.client).data['color'],
-        }
+        response['manager'] = user_short_representation(instance.manager)
+        response['client'] = client_short_representation(instance.client)
         return response
 
 
@@ -102,17 +103,8 @@ class ProjectSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         response = super().to_representation(instance)
-        first_name = UserNestedSerializer(instance.manager).data['first_name']
-        last_name = UserNestedSerializer(instance.manager).data['last_name']
-        response['manager'] = {
-            'id': UserNestedSerializer(instance.manager).data['id'],
-            'name': first_name[0].upper() + '. ' + last_name
-        }
-        response['client'] = {
-            'id': ClientNestedSerializer(instance.client).data['id'],
-            'name': ClientNestedSerializer(instance.client).data['name'],
-            'color': ClientNestedSerializer(instance.client).data['color'],
-        }
+        response['manager'] = user_short_representation(instance.manager)
+        response['client'] = client_short_representation(instance.client)
         return response
 
 
@@ -0,0 +1,294 @@
+"""
+Test for project list and search APIs
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Project, Client
+
+from core.pagination_utils import encode_cursor
+from project.project_utils import QUERY_PLANS
+
+
+def create_project(user, client_obj, **params):
+    """Create and retrun a test project"""
+    defaults = {
+        'start': '2023-08-15',
+        'deadline': '2023-10-15',
+        'priority': 'Normal',
+        'number': 'Test number project'
+    }
+    defaults.update(params)
+
+    project = Project.objects.create(
+        manager=user,
+        client=client_obj,
+        **defaults
+    )
+    return project
+
+
+def create_client(**params):
+    """Create and retrun a test client"""
+    defaults = {
+        'name': 'Test name client',
+        'email': 'clien@example.com',
+        'address': 'Test street 56',
+    }
+    defaults.update(params)
+
+    client = Client.objects.create(**defaults)
+    return client
+
+
+class ProjectQueryBudgetTests(TestCase):
+    """Test list endpoints stay within their query budget"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_superuser(
+            username='budget_admin',
+            password='testpass123',
+            role='Admin'
+        )
+        self.client.force_authenticate(self.user)
+
+        for i in range(10):
+            manager = get_user_model().objects.create_user(
+                username=f'manager{i}',
+                role='Employee',
+                password='testpass123',
+                email=f'manager{i}@example.com',
+                first_name='Test',
+                last_name=f'Manager {i}'
+            )
+            client_obj = create_client(
+                name=f'Client {i}',
+                email=f'client{i}@example.com'
+            )
+            create_project(
+                user=manager,
+                client_obj=client_obj,
+                number=f'PRJ-{i}',
+                name=f'Project {i}',
+                status='Started',
+                invoiced='NO'
+            )
+
+    def assertWithinBudget(self, endpoint, url, params):
+        """Fail when the endpoint exceeds its query plan budget"""
+        budget = QUERY_PLANS[endpoint]['max_queries']
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertLessEqual(
+            len(ctx.captured_queries),
+            budget,
+            f'{url} ran {len(ctx.captured_queries)} queries, '
+            f'budget is {budget}'
+        )
+        return res
+
+    def test_status_view_query_budget(self):
+        """Test active project board is served within budget"""
+        url = reverse('project:auth-project-production-status-view')
+        res = self.assertWithinBudget('status', url, {'status': 'Active'})
+
+        self.assertEqual(len(res.data), 10)
+        self.assertEqual(res.data[0]['manager']['name'], 'T. Manager 0')
+
+    def test_status_paginated_view_query_budget(self):
+        """Test paginated project archive is served within budget"""
+        Project.objects.update(status='Completed')
+        url = reverse('project:auth-project-production-status-view')
+        params = {'status': 'Completed', 'page_size': 5, 'page_number': 1}
+        res = self.assertWithinBudget('status_paginated', url, params)
+
+        self.assertEqual(res.data['totalItems'], 10)
+
+    def test_search_view_query_budget(self):
+        """Test project search is served within budget"""
+        url = reverse('project:auth-project-production-search-view')
+        params = {'status': 'Active', 'search': 'PRJ'}
+        res = self.assertWithinBudget('search', url, params)
+
+        self.assertEqual(len(res.data), 10)
+
+    def test_secretariat_status_view_query_budget(self):
+        """Test secretariat board is served within budget"""
+        url = reverse('project:admin-project-secretariat-status-view')
+        self.assertWithinBudget('status', url, {'status': 'NO'})
+
+
+class ProjectSearchTests(TestCase):
+    """Test ranked project search"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_superuser(
+            username='search_admin',
+            password='testpass123',
+            role='Admin'
+        )
+        self.user.first_name = 'Search'
+        self.user.last_name = 'Admin'
+        self.user.save()
+        self.client.force_authenticate(self.user)
+        self.client_obj = create_client()
+        self.url = reverse('project:auth-project-production-search-view')
+
+    def test_search_prefix_ranked_first(self):
+        """Test prefix matches are returned before substring matches"""
+        create_project(
+            user=self.user,
+            client_obj=self.client_obj,
+            number='X-ABC-1',
+            deadline='2023-09-01',
+            status='Started'
+        )
+        create_project(
+            user=self.user,
+            client_obj=self.client_obj,
+            number='ABC-2',
+            deadline='2023-12-01',
+            status='Started'
+        )
+
+        res = self.client.get(self.url, {'status': 'Active', 'search': 'abc'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [p['number'] for p in res.data],
+            ['ABC-2', 'X-ABC-1']
+        )
+
+    def test_search_short_phrase_prefix_only(self):
+        """Test phrases shorter than a trigram only match prefixes"""
+        create_project(
+            user=self.user,
+            client_obj=self.client_obj,
+            number='AB-1',
+            status='Started'
+        )
+        create_project(
+            user=self.user,
+            client_obj=self.client_obj,
+            number='X-AB-2',
+            status='Started'
+        )
+
+        res = self.client.get(self.url, {'status': 'Active', 'search': 'ab'})
+
+        self.assertEqual([p['number'] for p in res.data], ['AB-1'])
+
+    def test_search_limit(self):
+        """Test search result is limited"""
+        for i in range(5):
+            create_project(
+                user=self.user,
+                client_obj=self.client_obj,
+                number=f'LIM-{i}',
+                status='Started'
+            )
+
+        params = {'status': 'Active', 'search': 'LIM', 'limit': 3}
+        res = self.client.get(self.url, params)
+
+        self.assertEqual(len(res.data), 3)
+
+
+class ProjectArchivePaginationTests(TestCase):
+    """Test cursor pagination of the project archive"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            username='archive_admin',
+            email='archive@example.com',
+            password='testpass123',
+            role='Admin',
+            first_name='Archive',
+            last_name='Admin'
+        )
+        self.client.force_authenticate(self.user)
+        client_obj = create_client()
+        # pairs share a deadline so the id breaks the tie
+        for i in range(25):
+            create_project(
+                user=self.user,
+                client_obj=client_obj,
+                number=f'ARC-{i}',
+                deadline=f'2023-10-{i // 2 + 1:02d}',
+                status='Completed'
+            )
+        self.url = reverse('project:auth-project-production-status-view')
+
+    def get_page(self, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(
+                self.url,
+                {'status': 'Completed', 'page_size': 10, **params}
+            )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data, len(ctx.captured_queries)
+
+    def test_cursor_walks_archive(self):
+        """Test pages follow deadline and id without gaps or repeats"""
+        numbers = []
+        counts = []
+        page, count = self.get_page()
+        while True:
+            numbers += [project['number'] for project in page['data']]
+            counts.append(count)
+            if page['next'] is None:
+                break
+            page, count = self.get_page(cursor=page['next'])
+
+        expected = Project.objects.order_by('deadline', 'id')
+        self.assertEqual(
+            numbers,
+            list(expected.values_list('number', flat=True))
+        )
+        self.assertEqual(counts, [1, 1, 1])
+        self.assertNotIn('totalItems', page)
+
+    def test_total_estimate_opt_in(self):
+        """Test estimated total is returned on request"""
+        page, count = self.get_page(total='estimate')
+
+        self.assertIsInstance(page['totalItems'], int)
+        self.assertEqual(count, 2)
+
+    def test_invalid_cursor(self):
+        """Test malformed cursor is rejected"""
+        res = self.client.get(
+            self.url,
+            {'status': 'Completed', 'cursor': 'not-a-cursor'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cursor_with_wrong_types(self):
+        """Test well formed cursor holding wrong typed keys is rejected"""
+        for values in (['soon', 1], ['2023-10-15', 'abc'], [None, 1]):
+            res = self.client.get(
+                self.url,
+                {'status': 'Completed', 'cursor': encode_cursor(values)}
+            )
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(res.data['cursor'], 'Invalid cursor')
+
+    def test_page_number_kept(self):
+        """Test page_number clients still get offset pages"""
+        page, _ = self.get_page(page_number=3)
+
+        self.assertEqual(page['totalItems'], 25)
+        self.assertEqual(len(page['data']), 5)
@@ -0,0 +1,66 @@
+"""
+Test for project notifications
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.models import Project, Client, NotificationProject, OutboxEvent
+from core.ws_utils import relay_outbox
+
+from project.project_utils import notification_ws
+
+import time
+
+
+NOTIFICATION_RECIPIENTS = 1000
+NOTIFICATION_LATENCY_BUDGET = 2.0
+NOTIFICATION_QUERY_BUDGET = 4
+
+
+@override_settings(CHANNEL_LAYERS={
+    'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}
+})
+class ProjectNotificationFanOutTests(TestCase):
+    """Test project notification fan-out stays within budget"""
+
+    def setUp(self):
+        get_user_model().objects.bulk_create([
+            get_user_model()(
+                username=f'recipient{i}',
+                email=f'recipient{i}@example.com',
+                role='Employee',
+                first_name='Test',
+                last_name=f'Recipient {i}'
+            )
+            for i in range(NOTIFICATION_RECIPIENTS)
+        ])
+        manager = get_user_model().objects.first()
+        self.project = Project.objects.create(
+            manager=manager,
+            client=Client.objects.create(name='Test name client'),
+            start='2023-08-15',
+            deadline='2023-10-15',
+            priority='Normal',
+            number='Test number project'
+        )
+
+    def test_notification_fan_out_budget(self):
+        """Test 1k recipients are notified in constant queries and budget"""
+        start = time.perf_counter()
+        with CaptureQueriesContext(connection) as ctx:
+            notification_ws({'id': self.project.id})
+        relay_outbox()
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(
+            NotificationProject.objects.filter(project=self.project).count(),
+            NOTIFICATION_RECIPIENTS
+        )
+        self.assertLessEqual(
+            len(ctx.captured_queries),
+            NOTIFICATION_QUERY_BUDGET
+        )
+        self.assertLess(elapsed, NOTIFICATION_LATENCY_BUDGET)
+        self.assertFalse(OutboxEvent.objects.exists())
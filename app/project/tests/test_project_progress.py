@@ -0,0 +1,98 @@
+"""
+Test for project progress counters
+"""
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.models import Client, Department, File, Project, QueueLogic
+from project.project_utils import adjust_project_tasks
+
+
+class RepairProjectProgressTests(TestCase):
+    """Test recomputing project task counters"""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            username='admin',
+            email='admin@example.com',
+            password='testpass123',
+            role='Admin'
+        )
+        self.project = Project.objects.create(
+            manager=user,
+            client=Client.objects.create(name='Test client'),
+            start='2023-08-15',
+            deadline='2023-10-15',
+            priority='Normal',
+            number='Test number project'
+        )
+        file = File.objects.create(
+            user=user,
+            project=self.project,
+            name='Test file',
+            destiny='Production',
+            file='uploads/projects/test.pdf'
+        )
+        for order in range(1, 5):
+            QueueLogic.objects.create(
+                file=file,
+                project=self.project,
+                department=Department.objects.create(
+                    name=f'Dep {order}',
+                    order=order
+                ),
+                planned_start_date='2023-08-15T08:00:00Z',
+                planned_end_date='2023-08-16T08:00:00Z',
+                end=order == 1
+            )
+        self.empty_project = Project.objects.create(
+            manager=user,
+            client=self.project.client,
+            start='2023-08-15',
+            deadline='2023-10-15',
+            priority='Normal',
+            number='Empty project',
+            total_tasks=3,
+            done_tasks=1,
+        )
+
+    def test_repair_recounts_counters(self):
+        """Test command rebuilds counters and progress, keeps status"""
+        call_command('repair_project_progress')
+
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.total_tasks, 4)
+        self.assertEqual(self.project.done_tasks, 1)
+        self.assertEqual(self.project.progress, 25)
+        self.assertEqual(self.project.status, 'In design')
+        self.empty_project.refresh_from_db()
+        self.assertEqual(self.empty_project.total_tasks, 0)
+        self.assertEqual(self.empty_project.progress, 0)
+        self.assertEqual(self.empty_project.status, 'In design')
+
+    def test_repair_selected_projects(self):
+        """Test command repairs only given projects"""
+        call_command('repair_project_progress', str(self.project.id))
+
+        self.empty_project.refresh_from_db()
+        self.assertEqual(self.empty_project.total_tasks, 3)
+
+    def test_repair_keeps_status(self):
+        """Test suspended project stays suspended after repair"""
+        Project.objects.filter(id=self.project.id).update(status='Suspended')
+
+        call_command('repair_project_progress')
+
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.progress, 25)
+        self.assertEqual(self.project.status, 'Suspended')
+
+    def test_adjust_drifted_counters(self):
+        """Test counters behind the queue are clamped at zero"""
+        adjust_project_tasks(self.empty_project.id, total=-5, done=-2)
+
+        self.empty_project.refresh_from_db()
+        self.assertEqual(self.empty_project.total_tasks, 0)
+        self.assertEqual(self.empty_project.done_tasks, 0)
+        self.assertEqual(self.empty_project.progress, 0)
@@ -0,0 +1,134 @@
+"""
+Test for streaming ZIP download of project files
+"""
+import io
+import os
+import zipfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import File
+from core.tests.helpers import (
+    TempMediaMixin,
+    create_admin_user,
+    create_client,
+    create_project
+)
+from project.zip_utils import ZIP_BLOCK_SIZE, stream_zip
+
+
+def zip_url(project_id):
+    return reverse('project:auth-project-files-zip', args=[project_id])
+
+
+class ProjectZipApiTests(TempMediaMixin, TestCase):
+    """Test project files are streamed as one archive"""
+
+    def setUp(self):
+        super().setUp()
+        self.admin = create_admin_user()
+        self.employee = get_user_model().objects.create_user(
+            username='employee',
+            email='employee@example.com',
+            password='testpass123',
+            role='Employee'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.employee)
+        self.project = create_project(
+            self.admin,
+            create_client(),
+            number='PRJ/1 2023'
+        )
+
+    def create_file(self, name, content, destiny='Production'):
+        storage_name = f'uploads/projects/{self.project.id}/{name}'
+        path = os.path.join(self.media_root, storage_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as stored:
+            stored.write(content)
+        return File.objects.create(
+            user=self.admin,
+            project=self.project,
+            name=name,
+            destiny=destiny,
+            file=storage_name
+        )
+
+    def download(self, **params):
+        res = self.client.get(zip_url(self.project.id), params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        content = b''.join(res.streaming_content)
+        return res, zipfile.ZipFile(io.BytesIO(content))
+
+    def test_zip_production_files(self):
+        """Test archive holds production files with their content"""
+        self.create_file('drawing.dxf', b'dxf ' * 1000)
+        self.create_file('manual.pdf', b'%PDF body')
+        self.create_file('invoice_s.pdf', b'invoice', destiny='Secretariat')
+
+        res, archive = self.download()
+
+        self.assertEqual(res['Content-Type'], 'application/zip')
+        self.assertIn('PRJ_1_2023.zip', res['Content-Disposition'])
+        self.assertEqual(archive.namelist(), ['drawing.dxf', 'manual.pdf'])
+        self.assertEqual(archive.read('drawing.dxf'), b'dxf ' * 1000)
+        self.assertIsNone(archive.testzip())
+
+    def test_compressed_formats_stored(self):
+        """Test compressed formats are stored, others deflated"""
+        self.create_file('drawing.dxf', b'dxf ' * 1000)
+        self.create_file('movie.mp4', os.urandom(1000))
+
+        _, archive = self.download()
+
+        self.assertEqual(
+            archive.getinfo('drawing.dxf').compress_type,
+            zipfile.ZIP_DEFLATED
+        )
+        self.assertEqual(
+            archive.getinfo('movie.mp4').compress_type,
+            zipfile.ZIP_STORED
+        )
+
+    def test_duplicate_and_missing_files(self):
+        """Test same names are numbered and missing files left out"""
+        self.create_file('a.dxf', b'first')
+        second = self.create_file('b.dxf', b'second')
+        second.name = 'a.dxf'
+        second.save()
+        missing = self.create_file('gone.dxf', b'gone')
+        os.remove(os.path.join(self.media_root, missing.file.name))
+
+        with self.assertLogs('project.zip_utils', 'WARNING'):
+            _, archive = self.download()
+
+        self.assertEqual(archive.namelist(), ['a.dxf', 'a (2).dxf'])
+
+    def test_secretariat_permission(self):
+        """Test only staff can download secretariat files"""
+        self.create_file('invoice_s.pdf', b'invoice', destiny='Secretariat')
+        url = zip_url(self.project.id)
+
+        refused = self.client.get(url, {'destiny': 'Secretariat'})
+        self.client.force_authenticate(self.admin)
+        _, archive = self.download(destiny='Secretariat')
+
+        self.assertEqual(refused.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(archive.namelist(), ['invoice_s.pdf'])
+
+    def test_stream_chunks_bounded(self):
+        """Test chunks stay small whatever the file size"""
+        content = os.urandom(4 * 1024 * 1024)
+        file = self.create_file('movie.mp4', content)
+        entries = [('movie.mp4', file.file.name)]
+
+        chunks = list(stream_zip(entries))
+
+        self.assertLessEqual(max(map(len, chunks)), 2 * ZIP_BLOCK_SIZE)
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+        self.assertEqual(archive.read('movie.mp4'), content)
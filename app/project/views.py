@@ -1,5 +1,6 @@
 import os
-import shutil
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -11,11 +12,20 @@ from .project_utils import (
     filter_secretariat_projects,
     search_secretariat_projects,
     notification_ws,
-    manage_project_ws
+    apply_query_plan
+)
+from core.cache_utils import cached_response
+from core.jobs import enqueue
+from file.blob_utils import release_blobs
+from file.tombstone_utils import bury
+from core.models import (
+    File,
+    Project,
+    CommentProject,
+    NotificationProject
 )
-from core.models import Project, CommentProject, NotificationProject
-from app.settings import MEDIA_ROOT
 from project import serializers
+from project.zip_utils import archive_name, project_entries, stream_zip
 
 
 class ProjectAdminViewSet(
@@ -39,36 +49,32 @@ class ProjectAdminViewSet(
             request.data.update({'progress': 100})
         return super().update(request, *args, **kwargs)
 
+    @transaction.atomic
     def create(self, request, *args, **kwargs):
         if request.data['status'] == 'Completed':
             request.data.update({'progress': 100})
         response = super().create(request, *args, **kwargs)
 
         if response.status_code == status.HTTP_201_CREATED:
-            manage_project_ws(response.data, 'create')
+            enqueue('project.manage_project_ws', response.data, 'create')
             notification_ws(response.data)
         return response
 
+    @transaction.atomic
     def destroy(self, request, *args, **kwargs):
         project = self.get_object()
-        dir_path = os.path.join(
-            MEDIA_ROOT,
-            'uploads',
-            'projects',
-            str(project.id)
-        )
-
-        if os.path.isdir(dir_path):
-            shutil.rmtree(dir_path)
-
+        release_blobs(project.files.all())
+        # legacy files and upload parts go with the directory
+        bury(os.path.join('uploads', 'projects', str(project.id)))
         response = super().destroy(request, *args, **kwargs)
 
         if response.status_code == status.HTTP_204_NO_CONTENT:
-            manage_project_ws(response.data, 'delete')
+            enqueue('project.manage_project_ws', response.data, 'delete')
 
         return response
 
     @action(methods=['GET'], detail=False, url_path='columns')
+    @cached_response('ProjectAdminViewSet.columns')
     def project_admin_columns(self, request):
         columns = ['number', 'order_number', 'name',
                    'client', 'start', 'deadline',
@@ -77,6 +83,7 @@ class ProjectAdminViewSet(
         return Response(columns)
 
     @action(methods=['GET'], detail=False, url_path='columns-secretariat')
+    @cached_response('ProjectAdminViewSet.columns-secretariat')
     def project_secretariat_columns(self, request):
         columns = ['number', 'order_number', 'name',
                    'client', 'start', 'deadline',
@@ -113,6 +120,11 @@ class ProjectAuthViewSet(
             return serializers.ProjectDetailSerializer
         return self.serializer_class
 
+    def get_queryset(self):
+        if self.action == 'retrieve':
+            return apply_query_plan(self.queryset, 'retrieve')
+        return super().get_queryset()
+
     def retrieve(self, request, *args, **kwargs):
         response = super().retrieve(request, *args, **kwargs)
         data = response.data
@@ -135,7 +147,29 @@ class ProjectAuthViewSet(
         data = search_projects(params, user)
         return Response(data)
 
+    @action(methods=['GET'], detail=True, url_path='zip')
+    def project_files_zip(self, request, pk=None):
+        """Stream ZIP of project files, params destiny"""
+        project = self.get_object()
+        destiny = request.query_params.get('destiny', 'Production')
+        if destiny not in File.Destiny.values:
+            info = {'message': 'There is no such file destiny'}
+            return Response(info, status=status.HTTP_404_NOT_FOUND)
+        if destiny == 'Secretariat' and not request.user.is_staff:
+            info = {'message': 'You do not have permission'}
+            return Response(info, status=status.HTTP_403_FORBIDDEN)
+
+        response = StreamingHttpResponse(
+            stream_zip(project_entries(project, destiny)),
+            content_type='application/zip'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{archive_name(project)}"'
+        )
+        return response
+
     @action(methods=['GET'], detail=False, url_path='columns')
+    @cached_response('ProjectAuthViewSet.columns')
     def project_production_columns(self, request):
         columns = ['number', 'order_number', 'name',
                    'client', 'start', 'deadline',
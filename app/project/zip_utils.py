@@ -0,0 +1,111 @@
+"""
+Streaming ZIP archives of project files
+
+The archive is produced by a generator while it is sent, entries are
+copied in blocks and every written chunk is yielded at once, so memory
+use does not depend on the size of the files or the number of them.
+Formats which are compressed already are stored as they are.
+"""
+import logging
+import os
+import re
+import time
+import zipfile
+
+from django.core.files.storage import default_storage
+from core.models import File
+
+
+ZIP_BLOCK_SIZE = 64 * 1024
+STORED_EXTENSIONS = {
+    'zip', 'rar', 'png', 'jpg', 'jpeg', 'mp4', 'mkv',
+    'docx', 'xlsx', 'pdf',
+}
+
+logger = logging.getLogger(__name__)
+
+
+class ChunkBuffer:
+    """Write-only file collecting what zipfile writes until it is taken"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def compress_type(name):
+    extension = os.path.splitext(name)[1].lower().lstrip('.')
+    if extension in STORED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def unique_name(name, used):
+    """Entry name not used in the archive yet"""
+    base, extension = os.path.splitext(name)
+    candidate = name
+    number = 1
+    while candidate in used:
+        number += 1
+        candidate = f'{base} ({number}){extension}'
+    used.add(candidate)
+    return candidate
+
+
+def stream_zip(entries):
+    """
+    Yield ZIP archive of ``(archive name, storage name)`` entries.
+    Files missing in storage are left out.
+    """
+    buffer = ChunkBuffer()
+    used = set()
+    date_time = time.localtime()[:6]
+    with zipfile.ZipFile(buffer, mode='w') as archive:
+        for arcname, storage_name in entries:
+            try:
+                source = default_storage.open(storage_name, 'rb')
+            except FileNotFoundError:
+                logger.warning('Missing file %s left out of zip', storage_name)
+                continue
+            info = zipfile.ZipInfo(unique_name(arcname, used), date_time)
+            info.compress_type = compress_type(arcname)
+            info.external_attr = 0o644 << 16
+            with source, archive.open(info, 'w', force_zip64=True) as dest:
+                for block in iter(lambda: source.read(ZIP_BLOCK_SIZE), b''):
+                    dest.write(block)
+                    data = buffer.take()
+                    if data:
+                        yield data
+            yield buffer.take()
+    yield buffer.take()
+
+
+def archive_name(project):
+    number = re.sub(r'[^\w.-]+', '_', project.number).strip('_')
+    return f'{number or project.id}.zip'
+
+
+def project_entries(project, destiny):
+    """Archive and storage names of project files of the destiny"""
+    files = File.objects.filter(
+        project=project,
+        destiny=destiny
+    ).order_by('name', 'id').values_list('name', 'file')
+    for name, storage_name in files.iterator():
+        yield name or os.path.basename(storage_name), storage_name
@@ -0,0 +1,90 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, Value, CharField, BigIntegerField
+from django.db.models.functions import Concat
+from core.models import (
+    Project,
+    File,
+    CommentProject,
+    CommentFile
+)
+
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def build_search_query(phrase):
+    """Turn user phrase into prefix tsquery, every term has to match"""
+    terms = re.findall(r'[^\W_]+', phrase or '')
+    if not terms:
+        return None
+    raw = ' & '.join(f'{term}:*' for term in terms)
+    return SearchQuery(raw, search_type='raw', config='simple')
+
+
+def ranked(queryset, query, kind, title, project, file):
+    """Shape queryset rows so they can be combined in one union"""
+    return queryset.filter(search_vector=query).annotate(
+        kind=Value(kind, output_field=CharField()),
+        title=title,
+        project_ref=project,
+        file_ref=file,
+        rank=SearchRank(F('search_vector'), query)
+    ).values(
+        'id', 'kind', 'title', 'project_ref', 'file_ref', 'rank'
+    ).order_by()
+
+
+def search_all(query, user):
+    """Return union of projects, files and comments matching query"""
+    no_ref = Value(None, output_field=BigIntegerField())
+    files = File.objects.all()
+    file_comments = CommentFile.objects.all()
+
+    if not user.is_staff:
+        files = files.exclude(destiny='Secretariat')
+        file_comments = file_comments.exclude(file__destiny='Secretariat')
+
+    projects = ranked(
+        Project.objects.all(), query, 'project',
+        Concat('number', Value(' '), 'name'), F('id'), no_ref
+    )
+    files = ranked(
+        files, query, 'file',
+        F('name'), F('project_id'), F('id')
+    )
+    project_comments = ranked(
+        CommentProject.objects.all(), query, 'comment_project',
+        F('text'), F('project_id'), no_ref
+    )
+    file_comments = ranked(
+        file_comments, query, 'comment_file',
+        F('text'), F('file__project_id'), F('file_id')
+    )
+    return projects.union(
+        files, project_comments, file_comments, all=True
+    ).order_by('-rank', 'kind', 'id')
+
+
+def unified_search(params, user):
+    query = build_search_query(params.get('q'))
+    if query is None:
+        return {'data': [], 'totalItems': 0}
+
+    try:
+        page_size = int(params.get('page_size', PAGE_SIZE))
+        page_number = int(params.get('page_number', 1))
+    except (TypeError, ValueError):
+        page_size, page_number = PAGE_SIZE, 1
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    page_number = max(1, page_number)
+
+    queryset = search_all(query, user)
+    offset = (page_number - 1) * page_size
+    data = list(queryset[offset:offset + page_size])
+    return {
+        'data': data,
+        'totalItems': queryset.count()
+    }
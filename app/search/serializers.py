@@ -0,0 +1,14 @@
+"""
+Serializers for search APIs
+"""
+from rest_framework import serializers
+
+
+class SearchResultSerializer(serializers.Serializer):
+    """Serializer for single unified search hit"""
+    id = serializers.IntegerField()
+    kind = serializers.CharField()
+    title = serializers.CharField()
+    project_ref = serializers.IntegerField()
+    file_ref = serializers.IntegerField(allow_null=True)
+    rank = serializers.FloatField()
@@ -0,0 +1,146 @@
+"""
+Test for unified search API
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Client,
+    Project,
+    File,
+    CommentProject,
+    CommentFile
+)
+
+
+SEARCH_URL = reverse('search:search')
+
+
+def create_user(**params):
+    """Create and return a new user"""
+    defaults = {
+        'username': 'search_user',
+        'role': 'Employee',
+        'password': 'testpass123',
+        'first_name': 'Test',
+        'last_name': 'User',
+    }
+    defaults.update(params)
+    return get_user_model().objects.create_user(**defaults)
+
+
+def create_project(user, **params):
+    """Create and return a test project"""
+    client_obj = Client.objects.create(name=f'Client {user.username}')
+    defaults = {
+        'start': '2023-08-15',
+        'deadline': '2023-10-15',
+        'priority': 'Normal',
+        'number': 'Test number project',
+        'name': 'Test name',
+    }
+    defaults.update(params)
+    return Project.objects.create(manager=user, client=client_obj, **defaults)
+
+
+def create_file(user, project, **params):
+    """Create and return a test file row"""
+    defaults = {
+        'name': 'drawing.pdf',
+        'destiny': 'Production',
+        'file': 'uploads/projects/drawing.pdf',
+    }
+    defaults.update(params)
+    return File.objects.create(user=user, project=project, **defaults)
+
+
+class PublicSearchAPITests(TestCase):
+    """Test unauthenticated API request"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        """Test auth is required to call API"""
+        res = self.client.get(SEARCH_URL, {'q': 'test'})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateSearchAPITests(TestCase):
+    """Test authenticated API request"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        self.project = create_project(
+            self.user,
+            number='GEARBOX-12',
+            name='Gearbox housing'
+        )
+
+    def test_search_all_kinds(self):
+        """Test one query returns projects, files and comments"""
+        file = create_file(self.user, self.project, name='gearbox_cover.step')
+        CommentProject.objects.create(
+            user=self.user,
+            project=self.project,
+            text='Gearbox drawing needs review'
+        )
+        CommentFile.objects.create(
+            user=self.user,
+            file=file,
+            text='Check gearbox tolerances'
+        )
+
+        res = self.client.get(SEARCH_URL, {'q': 'gearbox'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['totalItems'], 4)
+        kinds = {hit['kind'] for hit in res.data['data']}
+        self.assertEqual(
+            kinds,
+            {'project', 'file', 'comment_project', 'comment_file'}
+        )
+
+    def test_search_prefix(self):
+        """Test partially typed word matches"""
+        res = self.client.get(SEARCH_URL, {'q': 'gearb'})
+
+        self.assertEqual(res.data['totalItems'], 1)
+        self.assertEqual(res.data['data'][0]['project_ref'], self.project.id)
+
+    def test_search_hides_secretariat_files(self):
+        """Test not admin user does not find secretariat files"""
+        create_file(
+            self.user,
+            self.project,
+            name='gearbox_invoice_s.pdf',
+            destiny='Secretariat'
+        )
+
+        res = self.client.get(SEARCH_URL, {'q': 'invoice'})
+
+        self.assertEqual(res.data['totalItems'], 0)
+
+    def test_search_paginated(self):
+        """Test search results are paginated"""
+        for i in range(5):
+            create_file(self.user, self.project, name=f'gearbox_{i}.pdf')
+
+        params = {'q': 'gearbox', 'page_size': 2, 'page_number': 2}
+        res = self.client.get(SEARCH_URL, params)
+
+        self.assertEqual(res.data['totalItems'], 6)
+        self.assertEqual(len(res.data['data']), 2)
+
+    def test_empty_phrase(self):
+        """Test empty phrase returns nothing"""
+        res = self.client.get(SEARCH_URL, {'q': ' '})
+
+        self.assertEqual(res.data, {'data': [], 'totalItems': 0})
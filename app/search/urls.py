@@ -0,0 +1,17 @@
+"""
+ULR mapping for the search app
+"""
+from django.urls import path
+
+from search import views
+
+
+app_name = 'search'
+
+urlpatterns = [
+    path(
+        '',
+        views.SearchViewSet.as_view({'get': 'list'}),
+        name='search'
+    ),
+]
@@ -0,0 +1,29 @@
+"""
+Views for the search APIs.
+"""
+from rest_framework import viewsets
+from rest_framework.response import Response
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import IsAuthenticated
+from .search_utils import unified_search
+from search import serializers
+
+
+class SearchViewSet(viewsets.GenericViewSet):
+    """
+        Ranked full text search across projects, files and comments.
+        params q, page_size, page_number
+    """
+    serializer_class = serializers.SearchResultSerializer
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request):
+        params = self.request.query_params
+        result = unified_search(params, request.user)
+        serializer = self.get_serializer(result['data'], many=True)
+        data = {
+            'data': serializer.data,
+            'totalItems': result['totalItems']
+        }
+        return Response(data)
@@ -0,0 +1,10 @@
+"""
+Background jobs for the user app
+"""
+from core.jobs import job
+from user import user_utils
+
+
+@job('user.refresh_status')
+def refresh_user_status(user_ids=None):
+    user_utils.refresh_user_status(user_ids)
@@ -12,12 +12,18 @@ from rest_framework import serializers
 from department.serializers import DepartmentSerializer
 
 
+def get_open_tasks(user):
+    """Number of open tasks, annotated by with_open_tasks if available"""
+    open_tasks = getattr(user, 'open_tasks', None)
+    if open_tasks is None:
+        open_tasks = QueueLogic.objects.filter(users=user, end=False).count()
+    return open_tasks
 
 
 class UserBoardSerializer(serializers.ModelSerializer):
     """Serializer for the user list"""
     departments = DepartmentSerializer(many=True)
-    task = serializers.StringRelatedField(source='tasks', many=True)    
+    task = serializers.SerializerMethodField()
 
     class Meta:
         model = get_user_model()
@@ -33,16 +39,13 @@ class UserBoardSerializer(serializers.ModelSerializer):
             'phone_number': {'required': False}
         }
     
-    def to_representation(self, instance):
-        response = super().to_representation(instance)
-        number_of_task = QueueLogic.objects.filter(users__in=[response['id']], end=False).count()
-        response['task'] = number_of_task
-        return response
+    def get_task(self, obj):
+        return get_open_tasks(obj)
 
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for the user object"""
-    task = serializers.StringRelatedField(source='tasks', many=True)
+    task = serializers.SerializerMethodField()
 
     class Meta:
         model = get_user_model()
@@ -72,11 +75,8 @@ class UserSerializer(serializers.ModelSerializer):
 
         return user
 
-    def to_representation(self, instance):
-        response = super().to_representation(instance)
-        number_of_task = QueueLogic.objects.filter(users__in=[response['id']], end=False).count()
-        response['task'] = number_of_task
-        return response
+    def get_task(self, obj):
+        return get_open_tasks(obj)
 
 
 class AuthTokenSerializer(serializers.Serializer):
@@ -0,0 +1,104 @@
+"""
+Test for user board query counts
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Client, Department, File, Project, QueueLogic
+
+
+USER_LIST_URL = reverse('user:-list')
+USER_BOARD_URLS = [
+    USER_LIST_URL,
+    reverse('user:-user-admin-view'),
+    reverse('user:-user-employee-view'),
+    reverse('user:-user-search-view') + '?q=user',
+]
+
+
+class UserBoardQueryTests(TestCase):
+    """Test user endpoints run constant queries"""
+
+    def setUp(self):
+        self.admin = get_user_model().objects.create_user(
+            username='admin',
+            email='admin@example.com',
+            password='testpass123',
+            role='Admin'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.department = Department.objects.create(name='Dep', order=1)
+        project = Project.objects.create(
+            manager=self.admin,
+            client=Client.objects.create(name='Test client'),
+            start='2023-08-15',
+            deadline='2023-10-15',
+            priority='Normal',
+            number='Test number project'
+        )
+        self.file = File.objects.create(
+            user=self.admin,
+            project=project,
+            name='Test file',
+            destiny='Production',
+            file='uploads/projects/test.pdf'
+        )
+        self.count = 0
+
+    def create_users(self, number):
+        for _ in range(number):
+            self.count += 1
+            user = get_user_model().objects.create_user(
+                username=f'user{self.count}',
+                email=f'user{self.count}@example.com',
+                password='testpass123',
+                role='Employee',
+                departments=[self.department]
+            )
+            for end in (False, False, True):
+                task = QueueLogic.objects.create(
+                    file=self.file,
+                    project=self.file.project,
+                    department=self.department,
+                    planned_start_date='2023-08-15T08:00:00Z',
+                    planned_end_date='2023-08-16T08:00:00Z',
+                    end=end
+                )
+                task.users.add(user)
+
+    def query_counts(self):
+        counts = []
+        urls = USER_BOARD_URLS + [
+            reverse('user:-user-employee-assigned-department-view') +
+            f'?dep_id={self.department.id}'
+        ]
+        for url in urls:
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            counts.append(len(ctx.captured_queries))
+        return counts
+
+    def test_constant_queries(self):
+        """Test query count does not depend on headcount"""
+        self.create_users(2)
+        small = self.query_counts()
+        self.create_users(20)
+        large = self.query_counts()
+
+        self.assertEqual(small, large)
+
+    def test_open_task_count(self):
+        """Test task field counts only open tasks"""
+        self.create_users(1)
+
+        res = self.client.get(USER_LIST_URL)
+
+        tasks = {user['username']: user['task'] for user in res.data}
+        self.assertEqual(tasks, {'admin': 0, 'user1': 2})
@@ -0,0 +1,119 @@
+"""
+Test for user Busy/Free status engine
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.models import Client, Department, File, Project, QueueLogic
+from user.user_utils import refresh_user_status
+
+
+def create_user(username, **params):
+    """Create and return a new user"""
+    return get_user_model().objects.create_user(
+        username=username,
+        email=f'{username}@example.com',
+        password='testpass123',
+        role='Employee',
+        **params
+    )
+
+
+class UserStatusTests(TestCase):
+    """Test status engine"""
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.busy = create_user('busy')
+        self.free = create_user('free', status='Busy')
+        self.ended = create_user('ended')
+        project = Project.objects.create(
+            manager=self.busy,
+            client=Client.objects.create(name='Test client'),
+            start='2023-08-15',
+            deadline='2023-10-15',
+            priority='Normal',
+            number='Test number project'
+        )
+        self.file = File.objects.create(
+            user=self.busy,
+            project=project,
+            name='Test file',
+            destiny='Production',
+            file='uploads/projects/test.pdf'
+        )
+        self.department = Department.objects.create(name='Dep', order=1)
+        self.create_task([self.busy], self.now - timedelta(hours=1))
+        self.create_task([self.free], self.now + timedelta(hours=1))
+        self.create_task(
+            [self.ended],
+            self.now - timedelta(hours=1),
+            end=True
+        )
+
+    def create_task(self, users, start, end=False):
+        task = QueueLogic.objects.create(
+            file=self.file,
+            project=self.file.project,
+            department=self.department,
+            planned_start_date=start,
+            planned_end_date=start + timedelta(hours=2),
+            end=end
+        )
+        task.users.set(users)
+
+    def statuses(self):
+        return dict(
+            get_user_model().objects.values_list('username', 'status')
+        )
+
+    def test_refresh_status(self):
+        """Test users with open task planned for now become Busy"""
+        changed = refresh_user_status(now=self.now)
+
+        self.assertEqual(changed, 2)
+        self.assertEqual(
+            self.statuses(),
+            {'busy': 'Busy', 'free': 'Free', 'ended': 'Free'}
+        )
+
+    def test_refresh_writes_only_changed(self):
+        """Test unchanged users are not written"""
+        refresh_user_status(now=self.now)
+
+        with CaptureQueriesContext(connection) as ctx:
+            changed = refresh_user_status(now=self.now)
+
+        self.assertEqual(changed, 0)
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_refresh_constant_queries(self):
+        """Test refresh is one select and one update for many users"""
+        for i in range(30):
+            user = create_user(f'user{i}')
+            self.create_task([user], self.now - timedelta(hours=1))
+
+        with CaptureQueriesContext(connection) as ctx:
+            changed = refresh_user_status(now=self.now)
+
+        self.assertEqual(changed, 32)
+        self.assertLessEqual(len(ctx.captured_queries), 4)
+
+    def test_refresh_selected_users(self):
+        """Test refresh limited to given users"""
+        refresh_user_status([self.busy.id], now=self.now)
+
+        self.assertEqual(self.statuses()['free'], 'Busy')
+        self.assertEqual(self.statuses()['busy'], 'Busy')
+
+    def test_refresh_command(self):
+        """Test command refreshes status once"""
+        call_command('refresh_user_status', once=True)
+
+        self.assertEqual(self.statuses()['busy'], 'Busy')
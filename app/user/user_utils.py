@@ -0,0 +1,60 @@
+from django.db.models import (
+    Case,
+    When,
+    Value,
+    Exists,
+    OuterRef,
+    F,
+    Q,
+    Count
+)
+from django.utils import timezone
+from core.models import QueueLogic, User
+
+
+def with_open_tasks(queryset):
+    """Annotate number of open tasks and prefetch departments"""
+    return queryset.annotate(
+        open_tasks=Count(
+            'tasks',
+            filter=Q(tasks__end=False),
+            distinct=True
+        )
+    ).prefetch_related('departments')
+
+
+def user_status_query(now):
+    """Status every user should have at the given time"""
+    busy = QueueLogic.objects.filter(
+        users=OuterRef('pk'),
+        end=False,
+        planned_start_date__lte=now,
+        planned_end_date__gte=now
+    )
+    return Case(
+        When(Exists(busy), then=Value('Busy')),
+        default=Value('Free')
+    )
+
+
+def refresh_user_status(user_ids=None, now=None):
+    """
+    Set Busy for users with an open task planned for now, Free otherwise.
+    Only users whose status changes are written. Return their number.
+    """
+    if now is None:
+        now = timezone.now()
+    users = User.objects.all()
+    if user_ids is not None:
+        users = users.filter(id__in=user_ids)
+
+    changed = list(
+        users.order_by()
+        .annotate(new_status=user_status_query(now))
+        .exclude(status=F('new_status'))
+        .only('id', 'status')
+    )
+    for user in changed:
+        user.status = user.new_status
+    User.objects.bulk_update(changed, ['status'])
+    return len(changed)
@@ -11,6 +11,7 @@ from rest_framework import (
     viewsets,
     mixins,
 )
+from core.cache_utils import cached_response
 from core.models import User
 from user.serializers import (
     UserSerializer,
@@ -18,7 +19,7 @@ from user.serializers import (
     AuthTokenSerializer,
     UserBoardSerializer
 )
-from file.file_utils import check_all_user_status
+from user.user_utils import with_open_tasks
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -51,6 +52,10 @@ class UserViewSet(mixins.ListModelMixin,
     authentication_classes = [authentication.TokenAuthentication]
     permission_classes = [permissions.IsAdminUser]
 
+    def get_queryset(self):
+        """Users with open task count and departments loaded"""
+        return with_open_tasks(super().get_queryset())
+
     def get_serializer_class(self):
         """Return the serializer class for request."""
         if self.action == 'list':
@@ -61,23 +66,25 @@ class UserViewSet(mixins.ListModelMixin,
     @action(methods=['GET'], detail=False, url_path='admin')
     def user_admin_view(self, request):
         """Return admin users"""
-        queryset = self.queryset.filter(role='Admin')
+        queryset = self.get_queryset().filter(role='Admin')
         serializer = UserSerializer(queryset, many=True)
         return Response(serializer.data)
 
     @action(methods=['GET'], detail=False, url_path='not-admin')
     def user_employee_view(self, request):
         """Return employee users"""
-        queryset = self.queryset.filter(role='Employee')
+        queryset = self.get_queryset().filter(role='Employee')
         serializer = UserSerializer(queryset, many=True)
         return Response(serializer.data)
     
     @action(methods=['GET'], detail=False, url_path='assigned')
     def user_employee_assigned_department_view(self, request):
         """Return employee users assigned to department"""
-        check_all_user_status()
         dep_id = self.request.query_params.get('dep_id')
-        queryset = self.queryset.filter(role='Employee', departments__in=dep_id)
+        queryset = self.get_queryset().filter(
+            role='Employee',
+            departments__in=dep_id
+        )
         serializer = UserSerializer(queryset, many=True)
         return Response(serializer.data)
 
@@ -85,7 +92,7 @@ class UserViewSet(mixins.ListModelMixin,
     def user_search_view(self, request):
         """Search users using q param"""
         query = self.request.query_params.get('q')
-        queryset = self.queryset.filter(
+        queryset = self.get_queryset().filter(
             Q(username__icontains=query) |
             Q(email__icontains=query) |
             Q(first_name__icontains=query) |
@@ -95,6 +102,7 @@ class UserViewSet(mixins.ListModelMixin,
         return Response(serializer.data)
 
     @action(methods=['GET'], detail=False, url_path='columns')
+    @cached_response('UserViewSet.columns')
     def user_columns_view(self, request):
         """Return columns users"""
         data = ['last_name', 'status', 'username', 'email', 'role', 'address', 'departments', 'options']